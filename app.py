@@ -1,13 +1,23 @@
 import streamlit as st
-import networkx as nx
-import matplotlib.pyplot as plt
-import random
-import time
-from groq import Groq
 import io
 from datetime import datetime
-import traceback
+import glob
+import json
+import os
 import re
+import uuid
+import zipfile
+
+from polibot import CATALOG, MODEL, ActionLog, COUNTRY_PROFILES, SCENARIO_DETAILS, MemoryCache, SimulationEngine, initial_metrics, network_summary, transcript_text
+from polibot.backends import DEFAULT_LOCAL_URL, LOCAL_MODEL, create_client
+from polibot.events import EventStore, run_status
+from polibot.export import ResultExporter
+from polibot.replay import recording_from_result
+from polibot.broker import QueueClient, job_spec, open_broker, spec_engine
+from polibot.jobs import JobManager
+from polibot.scheduler import RequestScheduler
+from polibot.render import NetworkRenderer, format_log_entry_html
+from polibot.timing import NULL_TIMER, Tracer
 
 st.set_page_config(
     page_title="🌐 PoliBot: Crisis Simulation",
@@ -64,350 +74,73 @@ st.markdown("""
 
 try:
     groq_api_key = st.secrets.get("GROQ_API_KEY", None)
-    if not groq_api_key:
-        st.error("Groq API Key not found in Streamlit secrets (GROQ_API_KEY). Please add it.", icon="🚨")
-        st.stop()
-
-    groq_client = Groq(api_key=groq_api_key)
-    groq_client.models.list()
-except Exception as e:
-    st.error(f"Failed to initialize Groq client: {e}. Check API Key and network connection.", icon="🚨")
-    st.stop()
-
-MODEL = "llama3-70b-8192"
-
-COUNTRY_PROFILES = {
-    "USA": {
-        "strengths": ["Military", "Economy", "Technology", "Diplomatic Influence"],
-        "weaknesses": ["Political Polarization", "National Debt", "Infrastructure Gaps"],
-        "interests": ["Global Stability", "Free Trade", "Democracy Promotion", "Counter-terrorism"],
-        "color": "#0033A0"
-    },
-    "China": {
-        "strengths": ["Manufacturing", "Infrastructure", "Population", "Economic Growth Rate"],
-        "weaknesses": ["Aging Population", "Environmental Issues", "Regional Tensions"],
-        "interests": ["Regional Dominance", "Technological Supremacy", "Economic Partnerships", "One China Policy"],
-        "color": "#DE2910"
-    },
-    "India": {
-        "strengths": ["Large Workforce", "IT Sector", "Strategic Location", "Democratic System"],
-        "weaknesses": ["Infrastructure Deficits", "Poverty & Inequality", "Bureaucracy"],
-        "interests": ["Economic Development", "Regional Security", "Climate Action", "Non-alignment"],
-        "color": "#FF9933"
-    },
-    "Russia": {
-        "strengths": ["Vast Natural Resources", "Military Power", "Cyber Capabilities", "UN Security Council Veto"],
-        "weaknesses": ["Economic Sanctions", "Demographic Decline", "Technological Lag (non-military)"],
-        "interests": ["Regional Sphere of Influence", "Energy Markets", "National Security", "Multipolar World Order"],
-        "color": "#0039A6"
-    },
-    "Germany": {
-        "strengths": ["Strong Industry", "Engineering Excellence", "EU Leadership", "Export Economy"],
-        "weaknesses": ["Energy Dependence", "Aging Population", "Military Underfunding (historical)"],
-        "interests": ["EU Stability & Integration", "Climate Policy Leadership", "International Trade", "Human Rights"],
-        "color": "#FFCC00"
-    },
-    "Brazil": {
-        "strengths": ["Agriculture Powerhouse", "Natural Resources", "Regional Influence (LatAm)", "Biodiversity"],
-        "weaknesses": ["Political Instability", "Infrastructure Bottlenecks", "Deforestation"],
-        "interests": ["Economic Growth", "South American Integration", "Environmental Sustainability", "Social Equality"],
-        "color": "#009B3A"
-    },
-     "South Africa": {
-        "strengths": ["Mineral Wealth", "Developed Infrastructure (regional context)", "Constitutional Democracy", "Regional Hub"],
-        "weaknesses": ["High Unemployment", "Inequality", "Energy Crisis (Eskom)", "Corruption"],
-        "interests": ["African Development", "Regional Stability", "Trade Partnerships (BRICS, etc.)", "Addressing Inequality"],
-        "color": "#007A4D"
-    },
-    "Pakistan": {
-        "strengths": ["Strategic Location", "Nuclear Capability", "Large Population", "Military Experience"],
-        "weaknesses": ["Economic Volatility", "Political Instability", "Water Scarcity", "Regional Security Challenges"],
-        "interests": ["National Security", "Economic Stability", "Kashmir Issue", "Regional Influence", "Counter-terrorism"],
-        "color": "#006600"
-    },
-    "EU": {
-        "strengths": ["Large Single Market", "Regulatory Power", "Diplomatic Network", "Economic Aid"],
-        "weaknesses": ["Internal Divisions", "Bureaucracy", "Military Dependence (on members/NATO)", "Demographic Challenges"],
-        "interests": ["European Integration", "Economic Prosperity", "Climate Action", "Rule of Law", "Neighborhood Stability"],
-        "color": "#003399"
-    }
-}
-
-SCENARIO_DETAILS = {
-    "🌪️ Climate Collapse": {
-        "description": "Rapid sea-level rise, extreme weather events (heatwaves, floods, storms), and failing agricultural yields threaten global stability and resource access.",
-        "key_issues": ["Coastal city inundation", "Food security crisis", "Mass climate migration", "Water resource conflicts", "Carbon reduction targets"],
-        "historical": "Amplified effects seen in events like the 1930s Dust Bowl, Hurricane Katrina, or recent global heatwaves, but occurring simultaneously and globally."
-    },
-    "🦠 Global Pandemic MkII": {
-        "description": "A novel airborne pathogen emerges with high transmissibility, significant morbidity/mortality across age groups, and resistance to initial treatments.",
-        "key_issues": ["Healthcare system collapse", "Global supply chain disruption", "Vaccine development & equitable distribution", "Border closures & travel restrictions", "Economic recession"],
-        "historical": "Combines lessons from COVID-19 (global spread, economic impact) and historical plagues (higher mortality potential), plus potential for faster mutation."
-    },
-    "⚡ Gridlock Energy Crisis": {
-        "description": "Simultaneous disruption of major fossil fuel supplies (geopolitics, infrastructure failure) and slow renewable rollout leads to critical global energy shortages.",
-        "key_issues": ["Skyrocketing fuel prices", "Industrial production halts", "Energy rationing", "Renewable transition acceleration pressures", "Geopolitical tensions over remaining resources"],
-        "historical": "Severity exceeding the 1970s oil crises due to higher global energy dependence and interconnectedness, coupled with transition challenges."
-    },
-    "🚰 Multi-Regional Water Wars": {
-        "description": "Severe droughts exacerbated by climate change and poor management lead to critical freshwater shortages in multiple densely populated/agricultural regions simultaneously.",
-        "key_issues": ["Agricultural collapse & famine risk", "Cross-border water disputes escalating to conflict", "Urban water supply failure", "Investment in desalination/water tech", "Hydro-diplomacy needs"],
-        "historical": "Scaling up regional crises like those seen around the Nile, Jordan River, or Indus basins, or Cape Town's 'Day Zero' threat, to multiple global hotspots at once."
-    },
-    "🛂 Cascading Refugee Crisis": {
-        "description": "A confluence of conflict, economic collapse, and climate disasters triggers unprecedented mass displacement across several continents.",
-        "key_issues": ["Overwhelmed border security", "Humanitarian aid funding gaps", "Host country integration challenges", "Political destabilization in receiving nations", "Addressing root causes of displacement"],
-        "historical": "Magnitude significantly larger than the 2015 European migrant crisis or Syrian refugee crisis, involving more diverse origins and destinations."
-    },
-    "🤖 AI Cold War": {
-        "description": "Rapid, unregulated advances in Artificial General Intelligence (AGI) research by competing blocs triggers intense geopolitical rivalry, mistrust, and fears of autonomous weapons or societal control.",
-        "key_issues": ["AI arms race (autonomous weapons)", "Economic disruption (job displacement)", "AI safety and ethics agreements", "Control over critical AI infrastructure/data", "Risk of accidental escalation"],
-        "historical": "Analogous to the Nuclear Cold War, but focused on AI dominance, with faster development cycles and potentially more unpredictable outcomes."
-     }
+except Exception:
+    # No secrets file at all; the app still runs with a local or offline backend.
+    groq_api_key = None
+groq_api_key = groq_api_key or os.environ.get("GROQ_API_KEY")
+
+RUNS_DIR = "runs"
+TABLES_DIR = os.path.join(RUNS_DIR, "tables")
+LIVE_LOG_SIZE = 15
+LIVE_AGREEMENTS = 5
+LOG_PAGE_SIZE = 20
+# Seconds between dashboard refreshes while this session's simulation is running.
+POLL_INTERVAL = 1.0
+MAX_JOBS = int(os.environ.get("POLIBOT_MAX_JOBS", "8"))
+# When set, runs go to a shared job queue served by `python -m polibot.worker` processes
+# instead of this server's own pool, so any app replica can start or display them.
+BROKER_URL = os.environ.get("POLIBOT_BROKER")
+FAST_MODEL = "llama3-8b-8192"
+BACKEND_LABELS = {
+    "groq": "Groq API",
+    "openai": "Local server (OpenAI-compatible)",
+    "llamacpp": "Local llama.cpp model file",
+    "fake": "Offline demo (canned responses)",
 }
 
-class CountryAgent:
-    def __init__(self, name, profile, groq_client):
-        self.name = name
-        self.profile = profile
-        self.groq = groq_client
-        self.memory = []
-
-    def remember(self, log_entry):
-        self.memory.append(log_entry)
-        if len(self.memory) > 10:
-            self.memory.pop(0)
-
-    def act(self, scenario, scenario_details, turn, all_nations):
-        memory_log = '\n'.join(self.memory[-5:]) if self.memory else "No recent memory."
-
-        other_nations = [n for n in all_nations if n != self.name]
-        target_options = ", ".join(other_nations) + ", GLOBAL"
-
-        prompt = f"""
-You are the official diplomatic representative (AI agent) of the country *{self.name}*.
-
-Your job is to *negotiate, strategize, and act in the best interest of your country* during an international crisis simulation. You must be proactive, thoughtful, and aligned with national objectives.
-
----
-
-## 🌍 Current Global Crisis:
-*{scenario}*
-- Description: {scenario_details['description']}
-- Key Issues: {', '.join(scenario_details['key_issues'])}
-- Historical Precedents: {scenario_details['historical']}
-
----
-
-## 🏧 Your Country Profile ({self.name}):
-- Strengths: {', '.join(self.profile.get('strengths', ['N/A']))}
-- Weaknesses: {', '.join(self.profile.get('weaknesses', ['N/A']))}
-- National Interests: {', '.join(self.profile.get('interests', ['N/A']))}
 
----
+@st.cache_resource(show_spinner="Connecting to the model backend...")
+def create_llm_client(backend, base_url=None, model_path=None, api_key=None):
+    # Created once per backend configuration and shared across reruns and sessions, so a
+    # GGUF model is loaded once and the Groq connection pool is reused. Failures are not
+    # cached. Retries, backoff and rate limits are handled by the per-run RequestScheduler.
+    client = create_client(backend, api_key=api_key, base_url=base_url, model_path=model_path)
+    if backend in ("groq", "openai"):
+        client.models.list()
+    return client
 
-## 🎯 Your Current Strategic Mission (as of Turn {turn}):
-Analyze recent events and interactions. Based on your memory and position, choose your next diplomatic action.
 
-Your options for [Intent]:
-1. Propose a deal (Offer a specific exchange or agreement)
-2. Respond (React to a previous proposal or action directed at you - check memory)
-3. Comment (Make a statement about the crisis or another nation's actions)
-4. Build alliances (Suggest cooperation or partnership)
-5. Request assistance (Ask for specific aid or support)
-6. Raise a global concern (Highlight a major issue needing collective attention)
-7. Decline to act (Pass the turn if no strategic move is beneficial)
+@st.cache_resource
+def get_job_manager():
+    # One pool (or queue client) per server process, shared by every session. Runs beyond
+    # MAX_JOBS queue.
+    if BROKER_URL:
+        return QueueClient(open_broker(BROKER_URL))
+    return JobManager(max_workers=MAX_JOBS)
 
-Your options for [Target]:
-- Choose one specific country from: {target_options}
-- Choose 'GLOBAL' for general statements or concerns.
 
----
+def current_job():
+    job_id = st.session_state.get('job_id')
+    return get_job_manager().get(job_id) if job_id else None
 
-## 🧠 Recent Memory (Relevant events from last 5 turns):
-{memory_log}
 
----
+@st.cache_data(show_spinner=False)
+def cached_run_status(path, modified, size):
+    # Keyed on the file's mtime and size, so a run log is only re-parsed after it changes.
+    return run_status(path)
 
-## 🗣 Output Format (MUST follow this structure EXACTLY):
 
-[Intent]: (Choose ONE from the 7 options above)
-[Target]: (Choose ONE from the target options list)
-[Message]: (Your diplomatic message - 2-4 concise sentences. Be specific, reflect your interests, and relate to the crisis or memory.)
+# The catalog revision is part of the cache key, so edited catalog files show up on the next rerun.
+@st.cache_data(show_spinner=False)
+def scenario_details_markdown(scenario, catalog_revision):
+    details = SCENARIO_DETAILS[scenario]
+    return (f"**Description:** {details['description']}\n\n"
+            f"**Key Issues:** {', '.join(details['key_issues'])}\n\n"
+            f"**Historical Context:** {details['historical']}")
 
 
----
-Example Output:
-[Intent]: Propose a deal
-[Target]: USA
-[Message]: We propose a joint investment in climate-resilient agriculture technology. This aligns with our shared food security interests given the current crisis.
-
----
-
-Remember:
-- Reflect your national agenda ({', '.join(self.profile.get('interests', ['N/A']))}).
-- Consider other countries' likely priorities based on the crisis.
-- Act decisively to advance your interests or manage the crisis.
-- Respond ONLY with the specified format. Do not add explanations or greetings.
-"""
-
-        try:
-            completion = self.groq.chat.completions.create(
-                model=MODEL,
-                messages=[{"role": "system", "content": prompt}],
-                temperature=0.75,
-                max_tokens=250,
-                stop=None
-            )
-            action_text = completion.choices[0].message.content.strip()
-            if "[Intent]:" in action_text and "[Target]:" in action_text and "[Message]:" in action_text:
-                return action_text
-            else:
-                print(f"Warning: Malformed response from {self.name}: {action_text}")
-                return f"[Intent]: Decline to act\n[Target]: GLOBAL\n[Message]: (Agent decided to observe this turn due to unclear instructions or malformed response template)"
-
-        except Exception as e:
-            print(f"Error during API call for {self.name}: {e}")
-            traceback.print_exc()
-            return f"[Intent]: Decline to act\n[Target]: GLOBAL\n[Message]: (Technical difficulties prevented action: {e})"
-
-
-def parse_action(action_text):
-    intent, target, message = None, None, None
-    try:
-        intent_match = re.search(r"\[Intent\]:\s*(.*)", action_text, re.IGNORECASE)
-        target_match = re.search(r"\[Target\]:\s*(.*)", action_text, re.IGNORECASE)
-        message_match = re.search(r"\[Message\]:\s*(.*)", action_text, re.IGNORECASE | re.DOTALL)
-
-        if intent_match:
-            intent = intent_match.group(1).strip()
-        if target_match:
-            target = target_match.group(1).strip()
-        if message_match:
-            message = message_match.group(1).strip()
-
-        valid_intents = ["Propose a deal", "Respond", "Comment", "Build alliances",
-                         "Request assistance", "Raise a global concern", "Decline to act"]
-        if intent not in valid_intents:
-             print(f"Warning: Invalid intent parsed: '{intent}'")
-
-        return intent, target, message
-
-    except Exception as e:
-        print(f"Error parsing action text: {e}\nRaw text: {action_text}")
-        return None, None, None
-
-
-def determine_action_impact(agent_name, intent, target, message, metrics, all_nations):
-    impact_description = "Action noted."
-    relationship_change = 0.0
-    target_for_relation_change = None
-
-    peace_index = metrics.get("Peace Index", 0.5)
-    severity_factor = st.session_state.get('crisis_severity', 5) / 10.0
-    peace_change = 0
-
-    if target and target != "GLOBAL" and target in all_nations:
-        target_for_relation_change = target
-
-    if intent == "Propose a deal":
-        impact_description = f"{agent_name} proposed a deal to {target}."
-        peace_change = random.uniform(0.005, 0.015) * (1.1 - peace_index)
-        if target_for_relation_change:
-            relationship_change = random.uniform(0.05, 0.15)
-            impact_description += " Potential for mutual benefit."
-        else:
-             impact_description += " Global cooperation suggested."
-
-    elif intent == "Respond":
-        impact_description = f"{agent_name} responded regarding {target}."
-        peace_change = random.uniform(-0.01, 0.01)
-        if target_for_relation_change:
-            relationship_change = random.uniform(-0.05, 0.05)
-            impact_description += " Dialogue continues."
-
-    elif intent == "Comment":
-        impact_description = f"{agent_name} commented on the situation regarding {target}."
-        peace_change = random.uniform(-0.005, 0.005)
-
-    elif intent == "Build alliances":
-        impact_description = f"{agent_name} seeks to build an alliance with {target}."
-        peace_change = random.uniform(0.01, 0.02) * (1.1 - peace_index)
-        if target_for_relation_change:
-            relationship_change = random.uniform(0.1, 0.2)
-            impact_description += " Strengthening ties."
-        else:
-             impact_description += " Promoting general cooperation."
-
-
-    elif intent == "Request assistance":
-        impact_description = f"{agent_name} requested assistance from {target}."
-        peace_change = random.uniform(-0.015, -0.005) * (1 + severity_factor)
-        if target_for_relation_change:
-             relationship_change = random.uniform(-0.05, 0.02)
-             impact_description += " Seeking support."
-        else:
-             impact_description += " Highlighting global need."
-
-
-    elif intent == "Raise a global concern":
-        impact_description = f"{agent_name} raised a global concern."
-        peace_change = random.uniform(-0.02, 0.005) * (1 + severity_factor)
-
-    elif intent == "Decline to act":
-        impact_description = f"{agent_name} chose to observe this turn."
-        peace_change = 0
-        relationship_change = 0
-
-    else:
-        impact_description = f"{agent_name} took an unrecognized action ({intent})."
-        peace_change = random.uniform(-0.01, 0.01)
-
-    metrics["Peace Index"] = max(0.05, min(0.95, peace_index + peace_change))
-
-    current_peace = metrics["Peace Index"]
-
-    if "Climate" in st.session_state.selected_scenario and "Carbon Emissions (Gt)" in metrics:
-        emission_change = random.uniform(-0.05, 0.3) + (0.55 - current_peace) * 0.3
-        if intent in ["Propose a deal", "Build alliances"]: emission_change -= 0.05
-        if intent in ["Raise a global concern", "Request assistance"]: emission_change += 0.05
-        metrics["Carbon Emissions (Gt)"] = max(10, metrics.get("Carbon Emissions (Gt)", 35.0) + emission_change)
-
-    elif "Energy" in st.session_state.selected_scenario and "Energy Stability Index" in metrics:
-        stability_change = (current_peace - 0.5) * 0.04 + random.uniform(-0.02, 0.02)
-        if intent in ["Propose a deal", "Build alliances"]: stability_change += 0.02
-        if intent in ["Raise a global concern", "Request assistance"]: stability_change -= 0.02
-        metrics["Energy Stability Index"] = max(0.1, min(0.9, metrics.get("Energy Stability Index", 0.6) + stability_change))
-
-    elif "Refugee" in st.session_state.selected_scenario and "Refugee Migration (M)" in metrics:
-         if intent in ["Propose a deal", "Build alliances"]:
-             decrease = random.randint(0, 2) * (1 + int(current_peace > 0.6))
-             metrics["Refugee Migration (M)"] = max(0, metrics.get("Refugee Migration (M)", 20) - decrease)
-         elif intent in ["Raise a global concern", "Request assistance"]:
-             increase = random.randint(0, 1) * (1 + int(current_peace < 0.4))
-             metrics["Refugee Migration (M)"] = max(0, metrics.get("Refugee Migration (M)", 20) + increase)
-         else:
-              metrics["Refugee Migration (M)"] = max(0, metrics.get("Refugee Migration (M)", 20) + random.randint(-1, 1))
-
-
-    if "Economic Growth (%)" in metrics:
-        base_growth_factor = (current_peace - 0.55) * 0.25 - severity_factor * 0.1
-        intent_impact = 0
-        if intent in ["Propose a deal", "Build alliances"]: intent_impact = 0.05
-        if intent in ["Raise a global concern", "Request assistance"]: intent_impact = -0.03
-        random_fluct = random.uniform(-0.08, 0.08)
-        current_growth = metrics.get("Economic Growth (%)", 2.5)
-        metrics["Economic Growth (%)"] = round(max(-15.0, current_growth + base_growth_factor + intent_impact + random_fluct), 1)
-
-    metrics.setdefault("Carbon Emissions (Gt)", 35.0)
-    metrics.setdefault("Refugee Migration (M)", 20)
-    metrics.setdefault("Energy Stability Index", 0.6)
-    metrics.setdefault("Economic Growth (%)", 2.5)
-
-    return impact_description, relationship_change, target_for_relation_change
-
-
-def generate_country_card(country):
+@st.cache_data(show_spinner=False)
+def generate_country_card(country, catalog_revision):
     profile = COUNTRY_PROFILES.get(country)
     if not profile:
         return "<p><em>Profile not available.</em></p>"
@@ -431,7 +164,39 @@ col_main, col_sidebar = st.columns([3, 1])
 with col_sidebar:
     st.header("🛠️ Simulation Configuration")
 
-    if 'selected_scenario' not in st.session_state:
+    if BROKER_URL:
+        st.info("Runs are sent to the shared job queue; the LLM backend is configured on the workers.", icon="🗄️")
+        llm_backend, default_model = None, None
+    else:
+        if 'llm_backend' not in st.session_state: st.session_state.llm_backend = "groq" if groq_api_key else "fake"
+        if 'local_base_url' not in st.session_state: st.session_state.local_base_url = DEFAULT_LOCAL_URL
+        if 'local_model' not in st.session_state: st.session_state.local_model = LOCAL_MODEL
+        if 'local_model_path' not in st.session_state: st.session_state.local_model_path = ""
+        st.session_state.llm_backend = st.selectbox(
+            "🤖 Model Backend",
+            options=list(BACKEND_LABELS),
+            format_func=BACKEND_LABELS.get,
+            index=list(BACKEND_LABELS).index(st.session_state.llm_backend),
+            key="backend_select"
+        )
+        llm_backend = st.session_state.llm_backend
+        if llm_backend == "groq" and not groq_api_key:
+            st.warning("Groq API Key not found in Streamlit secrets (GROQ_API_KEY). Add it, or choose a local or offline backend.", icon="🔑")
+        elif llm_backend == "openai":
+            st.session_state.local_base_url = st.text_input("🔌 Server URL", value=st.session_state.local_base_url, key="base_url_input",
+                                                            help="e.g. llama.cpp's llama-server, Ollama (http://localhost:11434/v1), vLLM or LM Studio.")
+            st.session_state.local_model = st.text_input("🧠 Model Name", value=st.session_state.local_model, key="local_model_input")
+        elif llm_backend == "llamacpp":
+            st.session_state.local_model_path = st.text_input("📦 GGUF Model Path", value=st.session_state.local_model_path, key="model_path_input",
+                                                              help="Runs in-process on the CPU; requires llama-cpp-python.")
+        default_model = MODEL if llm_backend == "groq" else st.session_state.local_model if llm_backend == "openai" else LOCAL_MODEL
+
+    # Picks up added, edited or removed catalog files without restarting the server.
+    CATALOG.refresh()
+    for path, error in CATALOG.errors.items():
+        st.warning(f"Catalog file {os.path.basename(path)} was not loaded: {error}", icon="📚")
+
+    if st.session_state.get('selected_scenario') not in SCENARIO_DETAILS:
         st.session_state.selected_scenario = list(SCENARIO_DETAILS.keys())[0]
     st.session_state.selected_scenario = st.selectbox(
         "🌍 Crisis Scenario",
@@ -442,14 +207,16 @@ with col_sidebar:
     scenario = st.session_state.selected_scenario
 
     with st.expander("Scenario Details", expanded=False):
-        details = SCENARIO_DETAILS[scenario]
-        st.write(f"**Description:** {details['description']}")
-        st.write(f"**Key Issues:** {', '.join(details['key_issues'])}")
-        st.write(f"**Historical Context:** {details['historical']}")
+        st.markdown(scenario_details_markdown(scenario, CATALOG.revision))
 
-    available_nations = sorted(list(COUNTRY_PROFILES.keys()))
     if 'selected_nations' not in st.session_state:
         st.session_state.selected_nations = ["USA", "China", "India", "EU", "Pakistan"]
+    st.session_state.selected_nations = [n for n in st.session_state.selected_nations if n in COUNTRY_PROFILES]
+    with st.expander("🗺️ Filter Nations by Region or Bloc", expanded=False):
+        region_filter = st.multiselect("Region", options=sorted(CATALOG.by_region), key="region_filter")
+        bloc_filter = st.multiselect("Bloc", options=sorted(CATALOG.by_bloc), key="bloc_filter")
+    # Already selected nations stay available so narrowing the filter never drops them.
+    available_nations = sorted(set(CATALOG.nations(region_filter, bloc_filter)) | set(st.session_state.selected_nations))
     st.session_state.selected_nations = st.multiselect(
         "🌎 Participating Nations",
         options=available_nations,
@@ -499,52 +266,241 @@ with col_sidebar:
     if 'advanced_options_checked' not in st.session_state: st.session_state.advanced_options_checked = False
     if 'crisis_severity' not in st.session_state: st.session_state.crisis_severity = 5
     if 'initial_peace' not in st.session_state: st.session_state.initial_peace = 0.5
+    if 'concurrent_turns' not in st.session_state: st.session_state.concurrent_turns = False
+    if 'max_concurrency' not in st.session_state: st.session_state.max_concurrency = 4
+    if 'request_timeout' not in st.session_state: st.session_state.request_timeout = 30.0
+    if 'requests_per_minute' not in st.session_state: st.session_state.requests_per_minute = 0
+    if 'sim_seed' not in st.session_state: st.session_state.sim_seed = 0
+    if 'graph_frame_interval' not in st.session_state: st.session_state.graph_frame_interval = 0
+    if 'stream_responses' not in st.session_state: st.session_state.stream_responses = True
+    if 'json_mode' not in st.session_state: st.session_state.json_mode = False
+    if 'fast_model_nations' not in st.session_state: st.session_state.fast_model_nations = []
+    if 'fast_model' not in st.session_state: st.session_state.fast_model = FAST_MODEL
+    if 'use_response_cache' not in st.session_state: st.session_state.use_response_cache = False
+    if 'record_events' not in st.session_state: st.session_state.record_events = True
+    if 'export_tables' not in st.session_state: st.session_state.export_tables = False
+    if 'profile_stages' not in st.session_state: st.session_state.profile_stages = False
+    if 'response_cache' not in st.session_state: st.session_state.response_cache = MemoryCache()
 
     st.session_state.advanced_options_checked = st.checkbox("Show Advanced Options", value=st.session_state.advanced_options_checked, key="advanced_checkbox")
     if st.session_state.advanced_options_checked:
         st.session_state.crisis_severity = st.slider("🔥 Crisis Severity", 1, 10, st.session_state.crisis_severity, key="severity_slider")
         st.session_state.initial_peace = st.slider("🕊️ Initial Peace Index", 0.1, 0.9, st.session_state.initial_peace, 0.05, key="peace_slider")
-
-    start_simulation = st.button("🚀 Start Simulation", type="primary", use_container_width=True, key="start_button")
+        st.session_state.concurrent_turns = st.checkbox(
+            "⚡ Concurrent Agent Calls",
+            value=st.session_state.concurrent_turns,
+            key="concurrent_checkbox",
+            help="Send every agent's prompt for a turn at once. Actions are still applied in the turn's random order."
+        )
+        if st.session_state.concurrent_turns:
+            st.session_state.max_concurrency = st.number_input("🔀 Max Concurrent Requests", min_value=1, max_value=9, value=st.session_state.max_concurrency, step=1, key="concurrency_input")
+        st.session_state.request_timeout = st.slider("⌛ Request Timeout (s)", 5.0, 120.0, float(st.session_state.request_timeout), 5.0, key="timeout_slider")
+        st.session_state.requests_per_minute = st.number_input(
+            "🚦 Requests per Minute (0 = unlimited)", min_value=0, max_value=1000, value=st.session_state.requests_per_minute, step=5,
+            key="rpm_input", help="Pace LLM calls to stay under your Groq rate limit. Throttled calls are retried either way."
+        )
+        st.session_state.use_response_cache = st.checkbox(
+            "💾 Cache Agent Responses",
+            value=st.session_state.use_response_cache,
+            key="cache_checkbox",
+            help="Reuse completions for identical prompts, e.g. when re-running with the same seed."
+        )
+        st.session_state.record_events = st.checkbox(
+            "📝 Record Event Log",
+            value=st.session_state.record_events,
+            key="events_checkbox",
+            help=f"Append every action to a JSONL file under {RUNS_DIR}/ so an interrupted run can be resumed."
+        )
+        st.session_state.export_tables = st.checkbox(
+            "🗃️ Export Result Tables",
+            value=st.session_state.export_tables,
+            key="export_tables_checkbox",
+            disabled=bool(BROKER_URL),
+            help=f"Write actions, metric snapshots, relationship snapshots and agreements as Parquet (or CSV) tables under {TABLES_DIR}/ as the run goes."
+        )
+        st.session_state.stream_responses = st.checkbox(
+            "📡 Stream Agent Responses",
+            value=st.session_state.stream_responses,
+            key="stream_checkbox",
+            help="Show each message as it is generated and retry early when a response is clearly malformed."
+        )
+        st.session_state.json_mode = st.checkbox(
+            "🧾 JSON Responses",
+            value=st.session_state.json_mode,
+            key="json_mode_checkbox",
+            help="Ask the model for a JSON object instead of the bracketed text format, so fewer responses are discarded as malformed."
+        )
+        st.session_state.fast_model_nations = st.multiselect(
+            "🐇 Use a Smaller Model For",
+            options=nations,
+            default=[n for n in st.session_state.fast_model_nations if n in nations],
+            key="fast_model_nations_select",
+            help="Nations whose actions are low-stakes for this scenario can use a faster, cheaper model."
+        )
+        if st.session_state.fast_model_nations:
+            st.session_state.fast_model = st.text_input("🐇 Smaller Model", value=st.session_state.fast_model, key="fast_model_input")
+        st.session_state.graph_frame_interval = st.number_input(
+            "🖼️ Redraw Graph Every N Actions (0 = once per turn)",
+            min_value=0, max_value=50, value=st.session_state.graph_frame_interval, step=1, key="frame_interval_input"
+        )
+        st.session_state.profile_stages = st.checkbox(
+            "⏱️ Profile Simulation Stages",
+            value=st.session_state.profile_stages,
+            key="profile_checkbox",
+            help="Time every stage of each action and turn (LLM call, parsing, impact, rendering) and show a live timing panel."
+        )
+        st.session_state.sim_seed = st.number_input("🎲 Random Seed (0 = random)", min_value=0, value=st.session_state.sim_seed, step=1, key="seed_input")
+
+    concurrent_turns = st.session_state.advanced_options_checked and st.session_state.concurrent_turns
+    max_concurrency = st.session_state.max_concurrency
+    request_timeout = st.session_state.request_timeout if st.session_state.advanced_options_checked else None
+    requests_per_minute = (st.session_state.requests_per_minute or None) if st.session_state.advanced_options_checked else None
+    crisis_severity = st.session_state.crisis_severity if st.session_state.advanced_options_checked else 5
+    sim_seed = (st.session_state.sim_seed or None) if st.session_state.advanced_options_checked else None
+    stream_responses = st.session_state.stream_responses if st.session_state.advanced_options_checked else True
+    graph_frame_interval = st.session_state.graph_frame_interval if st.session_state.advanced_options_checked else 0
+    response_cache = st.session_state.response_cache if st.session_state.advanced_options_checked and st.session_state.use_response_cache else None
+    record_events = st.session_state.record_events if st.session_state.advanced_options_checked else True
+    export_tables = st.session_state.advanced_options_checked and st.session_state.export_tables and not BROKER_URL
+    profile_stages = st.session_state.advanced_options_checked and st.session_state.profile_stages
+    response_format = "json" if st.session_state.advanced_options_checked and st.session_state.json_mode else "text"
+    agent_models = ({n: st.session_state.fast_model for n in st.session_state.fast_model_nations if n in nations}
+                    if st.session_state.advanced_options_checked else {})
+
+    start_simulation = st.button("🚀 Start Simulation", type="primary", use_container_width=True, key="start_button",
+                                 help="Runs in the background; starting a new run cancels this session's current one.")
+    job_counts = get_job_manager().stats()
+    if BROKER_URL:
+        runtime = f", {job_counts['runtime_mean_s']:.0f}s per run on average" if job_counts["runtime_mean_s"] else ""
+        st.caption(f"Shared queue: {job_counts['busy_workers']} workers busy, {job_counts['queue_depth']} runs queued{runtime}.")
+    elif job_counts.get("running") or job_counts.get("queued") or job_counts.get("paused"):
+        st.caption(f"Server load: {job_counts.get('running', 0) + job_counts.get('paused', 0)} of {MAX_JOBS} workers busy, "
+                   f"{job_counts.get('queued', 0)} runs queued.")
+
+    resume_simulation = False
+    run_files = []
+    # Queued runs are resumed by the workers themselves. Runs still executing in the
+    # background are not offered for resuming.
+    if not BROKER_URL:
+        active_paths = {job.engine.event_store.path for job in get_job_manager().jobs()
+                        if not job.done and job.engine.event_store is not None}
+        run_files = [(p, os.stat(p)) for p in sorted(glob.glob(os.path.join(RUNS_DIR, "*.jsonl")), reverse=True) if p not in active_paths]
+    interrupted_runs = [status for status in (cached_run_status(p, s.st_mtime_ns, s.st_size) for p, s in run_files)
+                        if status and not status["finished"]]
+    if interrupted_runs:
+        with st.expander(f"⏯️ Interrupted Runs ({len(interrupted_runs)})", expanded=False):
+            resume_status = st.selectbox(
+                "Run",
+                options=interrupted_runs,
+                format_func=lambda s: f"{s['scenario']} • turn {s['completed_turns']}/{s['num_turns']} • {os.path.basename(s['path'])}",
+                key="resume_select"
+            )
+            resume_simulation = st.button("⏯️ Resume Run", use_container_width=True, key="resume_button")
 
     st.markdown("---")
     st.markdown("### Selected Country Profiles")
     if nations:
         for country in sorted(nations):
-            st.markdown(generate_country_card(country), unsafe_allow_html=True)
+            st.markdown(generate_country_card(country, CATALOG.revision), unsafe_allow_html=True)
     else:
         st.warning("Please select at least two nations.")
 
 
+if 'session_owner' not in st.session_state: st.session_state.session_owner = uuid.uuid4().hex
+if 'simulation_log' not in st.session_state: st.session_state.simulation_log = ActionLog()
+if 'simulation_agreements' not in st.session_state: st.session_state.simulation_agreements = []
+if 'simulation_relations' not in st.session_state: st.session_state.simulation_relations = None
+if 'agents' not in st.session_state: st.session_state.agents = {}
+if 'metrics_initial' not in st.session_state:
+    st.session_state.metrics_initial = initial_metrics(st.session_state.initial_peace if st.session_state.advanced_options_checked else 0.5)
+    st.session_state.metrics = st.session_state.metrics_initial.copy()
+
+# The simulation itself runs on the shared JobManager pool. This script only builds the
+# engine and submits it, so reruns from widget interactions never interrupt a run and
+# one server process can serve many concurrent simulations.
+if start_simulation or resume_simulation:
+    if start_simulation and len(nations) < 2:
+        with col_main:
+            st.error("❌ Please select at least two nations to run the simulation.")
+    else:
+        init_peace = st.session_state.initial_peace if st.session_state.advanced_options_checked else 0.5
+        if BROKER_URL:
+            spec = job_spec(
+                scenario, nations, num_turns=num_turns, severity=crisis_severity, initial_peace=init_peace, seed=sim_seed,
+                response_format=response_format, agent_models=agent_models, delay=speed, concurrent=concurrent_turns,
+                max_concurrency=max_concurrency, request_timeout=request_timeout, stream=stream_responses
+            )
+            try:
+                spec_engine(spec, None)
+            except ValueError as e:
+                with col_main:
+                    st.error(f"Could not start the simulation: {e}", icon="🔥")
+                st.stop()
+        else:
+            try:
+                llm_client = create_llm_client(llm_backend, st.session_state.local_base_url, st.session_state.local_model_path,
+                                               groq_api_key if llm_backend == "groq" else None)
+            except Exception as e:
+                with col_main:
+                    st.error(f"Failed to initialize the {BACKEND_LABELS[llm_backend]} backend ({e}). Check the API key or server and the network connection.", icon="🚨")
+                st.stop()
+
+            tracer = Tracer() if profile_stages else NULL_TIMER
+            engine_options = dict(
+                scheduler=RequestScheduler(requests_per_minute, max_in_flight=max_concurrency), timer=tracer,
+                concurrent=concurrent_turns, max_concurrency=max_concurrency, request_timeout=request_timeout,
+                cache=response_cache, stream=stream_responses
+            )
+            slug = re.sub(r"\W+", "-", scenario).strip("-")
+            run_name = (os.path.splitext(os.path.basename(resume_status["path"]))[0] if resume_simulation
+                        else f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{slug}")
+            try:
+                if export_tables:
+                    engine_options["exporter"] = ResultExporter(TABLES_DIR, run_id=run_name)
+                if resume_simulation:
+                    engine = SimulationEngine.resume(resume_status["path"], llm_client, **engine_options)
+                else:
+                    event_store = None
+                    if record_events:
+                        event_store = EventStore(os.path.join(RUNS_DIR, f"{run_name}.jsonl"))
+                    engine = SimulationEngine(
+                        llm_client, scenario, nations,
+                        num_turns=num_turns, severity=crisis_severity,
+                        initial_peace=init_peace, seed=sim_seed,
+                        response_format=response_format, model=default_model, agent_models=agent_models,
+                        event_store=event_store, **engine_options
+                    )
+            except (ValueError, OSError) as e:
+                with col_main:
+                    st.error(f"Could not start the simulation: {e}", icon="🔥")
+                st.stop()
+
+        previous_job = current_job()
+        if previous_job is not None and not previous_job.done:
+            previous_job.cancel()
+        if BROKER_URL:
+            job = get_job_manager().enqueue(spec, owner=st.session_state.session_owner)
+        else:
+            job = get_job_manager().submit(engine, owner=st.session_state.session_owner, delay=speed)
+        engine = job.engine
+        st.session_state.job_id = job.id
+        st.session_state.metrics_initial = engine.metrics_initial
+        st.session_state.metrics = engine.metrics
+        st.session_state.simulation_log = job.log
+        st.session_state.simulation_agreements = engine.agreements
+        st.session_state.metric_series = engine.metric_series
+        st.session_state.simulation_relations = engine.relations
+        st.session_state.agents = engine.agents
+        st.session_state.graph_renderer = NetworkRenderer(frame_interval=graph_frame_interval)
+        st.session_state.graph_frame = None
+        st.session_state.graph_key = None
+
+
 with col_main:
     st.markdown("---")
     st.subheader("📊 Global Metrics Dashboard")
 
-    if 'metrics' not in st.session_state or start_simulation:
-        init_peace = st.session_state.initial_peace if st.session_state.advanced_options_checked else 0.5
-        st.session_state.metrics_initial = {
-            "Peace Index": init_peace, "Carbon Emissions (Gt)": 35.0,
-            "Refugee Migration (M)": 20, "Energy Stability Index": 0.6,
-            "Economic Growth (%)": 2.5
-        }
-        st.session_state.metrics = st.session_state.metrics_initial.copy()
-
-    metrics_container = st.container()
-    metric_keys = list(st.session_state.get('metrics', {}).keys())
-    metrics_placeholders = {}
-    num_metrics = len(metric_keys)
-    cols_per_row = 4
-    num_rows = (num_metrics + cols_per_row - 1) // cols_per_row
-
-    with metrics_container:
-        placeholder_rows = [st.columns(cols_per_row) for _ in range(num_rows)]
-        for i, key in enumerate(metric_keys):
-            row_index = i // cols_per_row
-            col_index = i % cols_per_row
-            metrics_placeholders[key] = placeholder_rows[row_index][col_index].empty()
-
-    def display_metrics(metrics_data):
-        initial_metrics = st.session_state.get('metrics_initial', metrics_data)
+    def display_metrics(metrics_data, initial_metrics):
         def get_metric_values(key, current_data, initial_data, default=0):
             current_val = current_data.get(key, default)
             initial_val = initial_data.get(key, default)
@@ -552,6 +508,11 @@ with col_main:
             except (ValueError, TypeError): delta = 0
             return current_val, delta
 
+        metric_keys = list(metrics_data.keys())
+        cols_per_row = 4
+        placeholder_rows = [st.columns(cols_per_row) for _ in range((len(metric_keys) + cols_per_row - 1) // cols_per_row)]
+        metrics_placeholders = {key: placeholder_rows[i // cols_per_row][i % cols_per_row] for i, key in enumerate(metric_keys)}
+
         if "Peace Index" in metrics_placeholders:
              val, delta = get_metric_values("Peace Index", metrics_data, initial_metrics, 0.5)
              metrics_placeholders["Peace Index"].metric("🕊️ Peace Index", f"{val:.2f}", f"{delta:+.2f}", delta_color="normal" if delta >= -0.001 else "inverse")
@@ -568,267 +529,324 @@ with col_main:
             val, delta = get_metric_values("Economic Growth (%)", metrics_data, initial_metrics, 2.5)
             metrics_placeholders["Economic Growth (%)"].metric("📈 Econ Growth (%)", f"{val:.1f}%", f"{delta:+.1f}%", delta_color="normal" if delta >= -0.001 else "inverse")
 
-    display_metrics(st.session_state.get('metrics', {}))
-
-    progress_bar_placeholder = st.empty()
-    status_text_placeholder = st.empty()
-
-    st.markdown("---")
-    st.subheader("🗣️ Agent Action Log")
-    negotiation_log_container = st.container(height=400)
-    negotiation_log_container.markdown("_(Simulation log will appear here...)_", unsafe_allow_html=True)
-
-    st.markdown("---")
-    st.subheader("📜 Significant Agreements & Actions")
-    treaty_container = st.container(height=250)
-    treaty_container.markdown("_(Notable agreements or alliance formations will appear here...)_", unsafe_allow_html=True)
-
-    st.markdown("---")
-    st.subheader("🌐 Diplomatic Network")
-    graph_placeholder = st.empty()
-    graph_placeholder.markdown("_(Diplomatic network graph will appear here...)_", unsafe_allow_html=True)
-
-    st.markdown("---")
-    st.subheader("📄 Simulation Analytics")
-    report_placeholder = st.container()
-    report_placeholder.markdown("_(Summary report will appear here after simulation...)_")
-
-    if 'simulation_log' not in st.session_state: st.session_state.simulation_log = []
-    if 'simulation_agreements' not in st.session_state: st.session_state.simulation_agreements = []
-    if 'simulation_relationships' not in st.session_state: st.session_state.simulation_relationships = {}
-    if 'simulation_graph' not in st.session_state: st.session_state.simulation_graph = nx.Graph()
-    if 'agents' not in st.session_state: st.session_state.agents = {}
-
-
-if start_simulation:
-    if len(nations) < 2:
-        st.error("❌ Please select at least two nations to run the simulation.")
-    else:
-        st.session_state.simulation_log = []
-        st.session_state.simulation_agreements = []
-        st.session_state.metrics = st.session_state.metrics_initial.copy()
-        display_metrics(st.session_state.metrics)
-
-        negotiation_log_container.empty().markdown("_(Simulation running...)_", unsafe_allow_html=True)
-        treaty_container.empty().markdown("_(Simulation running...)_", unsafe_allow_html=True)
-        graph_placeholder.empty().markdown("_(Simulation running...)_", unsafe_allow_html=True)
-        report_placeholder.empty().markdown("_(Simulation running...)_")
-        status_text_placeholder.empty()
-
-        agents = {name: CountryAgent(name, COUNTRY_PROFILES[name], groq_client) for name in nations}
-        st.session_state.agents = agents
-
-        G = nx.Graph()
-        G.add_nodes_from(nations)
-        st.session_state.simulation_graph = G
-        relationships = {n: {m: 0.0 for m in nations if m != n} for n in nations}
-        st.session_state.simulation_relationships = relationships
-
-        progress_bar = progress_bar_placeholder.progress(0, text="Simulation Starting...")
-        status_text = status_text_placeholder.text("Initializing Simulation...")
-
-        try:
-            metrics = st.session_state.metrics
-
-            for turn in range(1, num_turns + 1):
-                status_text.text(f"Processing Turn {turn}/{num_turns}...")
-                progress = int((turn / num_turns) * 100)
-                progress_bar.progress(progress, text=f"Simulation Progress: Turn {turn}/{num_turns}")
-
-                agent_order = random.sample(list(agents.keys()), len(agents))
-
-                turn_actions = []
-
-                for agent_name in agent_order:
-                    agent = agents[agent_name]
-                    status_text.text(f"Turn {turn}/{num_turns} - {agent_name}'s Action...")
-
-                    action_raw = agent.act(scenario, SCENARIO_DETAILS[scenario], turn, nations)
-
-                    intent, target, message = parse_action(action_raw)
-
-                    if not intent or not target or not message:
-                         intent, target, message = "Decline to act", "GLOBAL", "(Parsing Error)"
-
-                    impact_desc, rel_change, rel_target = determine_action_impact(
-                        agent_name, intent, target, message, metrics, nations
-                    )
-
-                    st.session_state.metrics = metrics
-                    display_metrics(metrics)
-
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    intent_class = f"intent-{intent.lower().replace(' ', '-')}"
-                    log_entry_html = f"""
-                    <div class="log-entry {intent_class}">
-                        <strong>Turn {turn} • {timestamp} • {agent_name}</strong><br>
-                        <strong>Intent:</strong> {intent} | <strong>Target:</strong> {target}<br>
-                        <strong>Message:</strong> "{message}"<br>
-                        <em>Impact: {impact_desc}</em>
-                    </div>
-                    """
-                    st.session_state.simulation_log.insert(0, log_entry_html)
-                    plain_log_for_memory = f"Turn {turn}: {agent_name} - Intent: {intent}, Target: {target}, Msg: '{message}', Impact: {impact_desc}"
-                    turn_actions.append((agent_name, plain_log_for_memory))
-
-                    if rel_target and rel_target != agent_name:
-                        current_weight = G.get_edge_data(agent_name, rel_target, default={'weight': 0.0})['weight']
-                        new_weight = max(-1.0, min(1.0, current_weight + rel_change))
-                        G.add_edge(agent_name, rel_target, weight=new_weight)
-                        st.session_state.simulation_relationships[agent_name][rel_target] = new_weight
-                        st.session_state.simulation_relationships[rel_target][agent_name] = new_weight
-
-
-                    if intent in ["Propose a deal", "Build alliances"] and rel_target:
-                        agreement_log = (agent_name, rel_target, turn, intent, message)
-                        st.session_state.simulation_agreements.insert(0, agreement_log)
-
-                    with negotiation_log_container:
-                        negotiation_log_container.empty()
-                        log_display_html = "".join(st.session_state.simulation_log[:15])
-                        st.markdown(log_display_html, unsafe_allow_html=True)
-
-                    with treaty_container:
-                        treaty_container.empty()
-                        if st.session_state.simulation_agreements:
-                            st.markdown("##### Recent Agreements/Overtures")
-                            for agmt in st.session_state.simulation_agreements[:5]:
-                                st.info(f"""
-**{agmt[0]} → {agmt[1]}** (Turn {agmt[2]})
-Intent: **{agmt[3]}**
-Message: "{agmt[4]}"
-""")
-                        else:
-                            st.markdown("<em>No significant agreements logged yet.</em>", unsafe_allow_html=True)
-
-
-                    if G.number_of_nodes() > 0:
-                        plt.style.use('seaborn-v0_8-whitegrid')
-                        plt.figure(figsize=(10, 7))
-                        try: pos = nx.kamada_kawai_layout(G, weight='weight', scale=1.0)
-                        except Exception: pos = nx.spring_layout(G, seed=42, k=0.9, iterations=50)
-
-                        node_colors = [COUNTRY_PROFILES.get(n, {}).get("color", "#cccccc") for n in G.nodes()]
-                        node_sizes = [1200 + G.degree(n) * 250 for n in G.nodes()]
-
-                        edge_weights = [G[u][v].get('weight', 0) for u, v in G.edges()]
-                        max_abs_w = max(abs(w) for w in edge_weights) if edge_weights else 1.0
-                        max_abs_w = max(max_abs_w, 0.1)
-
-                        edge_widths = [1 + (abs(w) / max_abs_w * 4) for w in edge_weights]
-                        edge_colors = ['#2ca02c' if w > 0.1 else '#d62728' if w < -0.1 else '#aaaaaa' for w in edge_weights]
-                        edge_alphas = [0.4 + (abs(w) / max_abs_w * 0.5) for w in edge_weights]
-
-                        nx.draw_networkx_nodes(G, pos, node_size=node_sizes, node_color=node_colors, alpha=0.9, linewidths=1.0, edgecolors='grey')
-                        nx.draw_networkx_edges(G, pos, width=edge_widths, edge_color=edge_colors, alpha=edge_alphas, connectionstyle='arc3,rad=0.05')
-                        nx.draw_networkx_labels(G, pos, font_size=9, font_weight="bold", font_color='black')
-
-                        plt.title(f"Diplomatic Network (End of Turn {turn})", fontsize=16)
-                        plt.axis("off")
-                        plt.tight_layout()
-                        buf = io.BytesIO()
-                        plt.savefig(buf, format="png", dpi=130, bbox_inches='tight')
-                        graph_placeholder.image(buf)
-                        plt.close()
-                    else:
-                        graph_placeholder.markdown("_(Graph requires nodes)_")
-
-                    if speed > 0:
-                        time.sleep(speed)
-
-                for acting_agent_name, log_for_memory in turn_actions:
-                     if acting_agent_name in agents:
-                         agents[acting_agent_name].remember(log_for_memory)
-                     parsed_target = re.search(r"Target:\s*(\S+)", log_for_memory)
-                     if parsed_target:
-                         target_name = parsed_target.group(1)
-                         if target_name in agents and target_name != acting_agent_name:
-                             memory_for_target = f"Turn {turn}: Received from {acting_agent_name} - Intent: {re.search(r'Intent:\s*(.*?),', log_for_memory).group(1)}, Msg: '{re.search(r'Msg:\s*\'(.*?)\'', log_for_memory).group(1)}'"
-                             agents[target_name].remember(memory_for_target)
-
-
-            status_text.text("Simulation Complete.")
-            progress_bar.progress(100, text="Simulation Complete.")
+    def show_metrics_chart(series):
+        # Percent change from the starting value, so indices and absolute figures share
+        # one axis. The series is capped in size, so a redraw costs the same in long runs;
+        # a raw Vega-Lite spec is used because st.line_chart rebuilds an Altair chart
+        # (~150 ms) on every call.
+        columns = series.columns()
+        initial = st.session_state.get('metrics_initial', {})
+        chart_data = {"Action": columns["step"]}
+        for name in series.names:
+            start = initial.get(name) or 1.0
+            chart_data[name] = (columns[name] / start - 1.0) * 100.0
+        st.vega_lite_chart(chart_data, {
+            "height": 280,
+            "transform": [{"fold": series.names, "as": ["Metric", "Change"]}],
+            "mark": {"type": "line", "interpolate": "step-after"},
+            "encoding": {
+                "x": {"field": "Action", "type": "quantitative"},
+                "y": {"field": "Change", "type": "quantitative", "title": "% change from start"},
+                "color": {"field": "Metric", "type": "nominal", "legend": {"orient": "bottom"}},
+            },
+        }, use_container_width=True)
+
+    def show_timing_panel(tracer):
+        with st.expander("⏱️ Stage Timings", expanded=True):
+            rows = [{"Stage": name, "Calls": s["count"], "Total (ms)": round(s["total_ms"], 1),
+                     "Mean (ms)": round(s["mean_ms"], 2), "p95 (ms)": round(s["p95_ms"], 2)}
+                    for name, s in sorted(tracer.summary().items(), key=lambda item: -item[1]["total_ms"])]
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+            if tracer.counters:
+                st.caption(" | ".join(f"{name}: {value:,}" for name, value in tracer.counters.items()))
+
+    def show_job_status(job):
+        engine = job.engine
+        turns_done = engine.completed_turns
+        if job.status == "queued":
+            st.info(f"⏳ Waiting for a free worker (position {get_job_manager().queue_position(job)} in the queue)...")
+        elif not job.done:
+            progress = min(1.0, (turns_done + len(engine.log) % max(1, len(engine.agents)) / max(1, len(engine.agents))) / engine.num_turns)
+            if job.cancel_requested:
+                label = "Cancelling..."
+            elif job.status == "paused":
+                label = f"Paused at Turn {job.turn}/{engine.num_turns}"
+            elif job.pause_requested:
+                label = f"Pausing after the current action (Turn {job.turn}/{engine.num_turns})..."
+            else:
+                label = f"Simulation Progress: Turn {job.turn}/{engine.num_turns}"
+            st.progress(progress, text=label)
+        elif job.status == "completed":
             st.success("✅ Simulation Complete!")
+        elif job.status == "cancelled":
+            st.warning(f"⏹️ Simulation cancelled after turn {turns_done}/{engine.num_turns}."
+                       + (" It can be resumed from Interrupted Runs." if isinstance(engine.event_store, EventStore) else ""))
+        else:
+            st.error(f"An error occurred during the simulation: {job.error}", icon="🔥")
 
-            final_metrics = st.session_state.metrics
-            initial_metrics = st.session_state.metrics_initial
-            final_G = st.session_state.simulation_graph
-
-            most_active, least_active, strongest_pair_text = "N/A", "N/A", "N/A"
-            final_density, num_components = 0.0, 0
-
-            if final_G.number_of_nodes() > 0:
-                degrees = list(final_G.degree())
-                if degrees:
-                    most_active = max(degrees, key=lambda x: x[1])[0]
-                    least_active = min(degrees, key=lambda x: x[1])[0]
-                final_density = nx.density(final_G)
-                if final_G.number_of_edges() > 0: num_components = nx.number_connected_components(final_G)
-                else: num_components = final_G.number_of_nodes()
-
-            strongest_pair_text = "N/A (No positive relationships)"
-            if final_G.number_of_edges() > 0:
-                edge_weights = [((u, v), final_G[u][v].get('weight', 0)) for u, v in final_G.edges()]
-                positive_weights = [(pair, w) for pair, w in edge_weights if w > 0.1]
-                if positive_weights:
-                    strongest_data = max(positive_weights, key=lambda x: x[1])
-                    strongest_pair_text = f"{strongest_data[0][0]} ↔ {strongest_data[0][1]} (Weight: {strongest_data[1]:.2f})"
-
-            with report_placeholder:
-                st.subheader("Simulation Summary Report")
-                st.markdown(f"**Scenario:** {scenario}")
-                st.markdown(f"**Duration:** {num_turns} turns ({len(nations)} agent actions per turn)")
-                st.markdown(f"**Agreements Logged:** {len(st.session_state.get('simulation_agreements', []))}")
-                st.markdown(f"**Network Density:** {final_density:.3f} | **Components:** {num_components}")
-
-                st.markdown("##### Key Observations")
-                st.markdown(f"* Most active nation (highest degree): **{most_active}**")
-                st.markdown(f"* Strongest positive relationship (highest edge weight > 0.1): **{strongest_pair_text}**")
-                st.markdown(f"* Nation with lowest degree: **{least_active}**")
-
-                st.markdown("##### Final Metrics (vs Initial)")
-                fm_peace = final_metrics.get('Peace Index', 0); im_peace = initial_metrics.get('Peace Index', 0)
-                st.markdown(f"* 🕊️ Peace Index: **{fm_peace:.2f}** ({fm_peace - im_peace:+.2f})")
-                fm_co2 = final_metrics.get('Carbon Emissions (Gt)', 0); im_co2 = initial_metrics.get('Carbon Emissions (Gt)', 0)
-                st.markdown(f"* 💨 CO₂ Emissions (Gt): **{fm_co2:.1f}** ({fm_co2 - im_co2:+.1f})")
-                fm_ref = final_metrics.get('Refugee Migration (M)', 0); im_ref = initial_metrics.get('Refugee Migration (M)', 0)
-                st.markdown(f"* 🚶 Refugees (M): **{int(fm_ref):,}** ({int(fm_ref - im_ref):+,})")
-                fm_energy = final_metrics.get('Energy Stability Index', 0); im_energy = initial_metrics.get('Energy Stability Index', 0)
-                st.markdown(f"* ⚡ Energy Stability: **{fm_energy:.2f}** ({fm_energy - im_energy:+.2f})")
-                fm_econ = final_metrics.get('Economic Growth (%)', 0); im_econ = initial_metrics.get('Economic Growth (%)', 0)
-                st.markdown(f"* 📈 Econ Growth (%): **{fm_econ:.1f}%** ({fm_econ - im_econ:+.1f}%)")
-
-            st.markdown("---")
-            st.subheader("📥 Download Results")
-
-            transcript_data = f"PoliBot Agents Simulation Transcript\nScenario: {scenario}\nTurns: {num_turns}\nNations: {', '.join(nations)}\nDate: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n---\n\nAGENT ACTION LOG (Newest First):\n\n"
-            plain_log_entries = []
-            for entry in st.session_state.simulation_log:
-                if isinstance(entry, str):
-                    text_entry = re.sub(r'<[^>]+>', '', entry)
-                    text_entry = text_entry.replace('&nbsp;', ' ')
-                    text_entry = "\n".join([line.strip() for line in text_entry.splitlines() if line.strip()])
-                    plain_log_entries.append(text_entry)
-            transcript_data += "\n\n---\n\n".join(plain_log_entries)
+        if not job.done:
+            # Callbacks run before the rerun they trigger, so the new state shows right away.
+            col_pause, col_cancel = st.columns(2)
+            if job.pause_requested:
+                col_pause.button("▶️ Resume", use_container_width=True, key="job_resume_button", on_click=job.resume, disabled=job.cancel_requested)
+            else:
+                col_pause.button("⏸️ Pause", use_container_width=True, key="job_pause_button", on_click=job.pause, disabled=job.cancel_requested)
+            col_cancel.button("⏹️ Cancel", use_container_width=True, key="job_cancel_button", on_click=job.cancel, disabled=job.cancel_requested)
+
+    def show_graph(job):
+        relations = st.session_state.simulation_relations
+        renderer = st.session_state.get('graph_renderer')
+        if relations is None or renderer is None or len(relations) == 0:
+            st.markdown("_(Diplomatic network graph will appear here...)_", unsafe_allow_html=True)
+            return
+        # Redrawn at most once per refresh: after each turn, or every N actions when the
+        # frame interval is set, and once more when the run ends.
+        if job is None or job.done:
+            frame_key = "final"
+        elif renderer.frame_interval:
+            frame_key = len(job.log) // renderer.frame_interval
+        else:
+            frame_key = job.engine.completed_turns
+        if frame_key != st.session_state.get('graph_key'):
+            tracer = job.engine.timer if job is not None else NULL_TIMER
+            turn = job.engine.completed_turns if job is not None else 0
+            # A frame drawn every N actions can fall in the middle of the next turn.
+            mid_turn = job is not None and len(job.log) > 0 and job.log.entries[-1].turn > turn
+            with tracer.stage("graph_render"):
+                frame = renderer.render(relations, turn + 1 if mid_turn else turn, turn_end=not mid_turn)
+            st.session_state.graph_key = frame_key
+            if frame is not None:
+                st.session_state.graph_frame = frame.getvalue()
+        if st.session_state.get('graph_frame') is not None:
+            st.image(st.session_state.graph_frame)
+        else:
+            st.markdown("_(Diplomatic network graph will appear here...)_", unsafe_allow_html=True)
+
+    # The live views only ever draw a fixed number of entries, so a refresh costs the same
+    # on turn 1 and turn 30. The full log is browsed a page at a time further down.
+    def show_dashboard():
+        job = current_job()
+        if job is not None and job.done and st.session_state.get('job_reported') != job.id:
+            # The run finished between refreshes: rerun the whole page to stop polling and
+            # show the report.
+            st.rerun()
+        if job is not None:
+            # A queued run's engine is rebuilt from its records as they arrive, so the
+            # views are re-pointed on every refresh.
+            st.session_state.simulation_log = job.log
+            st.session_state.simulation_agreements = job.engine.agreements
+            st.session_state.metric_series = job.engine.metric_series
+            st.session_state.simulation_relations = job.engine.relations
+        metrics = job.engine.metrics if job is not None else st.session_state.get('metrics', {})
+        display_metrics(metrics, st.session_state.get('metrics_initial', metrics))
+
+        with st.expander("📈 Metrics Over Time", expanded=True):
+            series = st.session_state.get('metric_series')
+            if series is not None and len(series) > 1:
+                show_metrics_chart(series)
+            else:
+                st.markdown("_(Metric history will appear here...)_")
+
+        if job is not None:
+            show_job_status(job)
+            if isinstance(job.engine.timer, Tracer):
+                show_timing_panel(job.engine.timer)
+
+        st.markdown("---")
+        st.subheader("🗣️ Agent Action Log")
+        if job is not None and job.typing and not job.done:
+            turn, agent_name, fields = job.typing
+            st.markdown(f"""
+            <div class="log-entry">
+                <strong>Turn {turn} • {agent_name} (typing...)</strong><br>
+                <strong>Intent:</strong> {fields.get('intent', '…')} | <strong>Target:</strong> {fields.get('target', '…')}<br>
+                <strong>Message:</strong> "{fields.get('message', '…')}"
+            </div>
+            """, unsafe_allow_html=True)
+        action_log = st.session_state.simulation_log
+        with st.container(height=400):
+            if action_log:
+                st.markdown("".join(format_log_entry_html(entry) for entry in reversed(action_log.entries[-LIVE_LOG_SIZE:])), unsafe_allow_html=True)
+            elif job is not None and not job.done:
+                st.markdown("_(Simulation running...)_", unsafe_allow_html=True)
+            else:
+                st.markdown("_(Simulation log will appear here...)_", unsafe_allow_html=True)
+
+        st.markdown("---")
+        st.subheader("📜 Significant Agreements & Actions")
+        with st.container(height=250):
+            agreements = st.session_state.simulation_agreements
+            if agreements:
+                st.markdown("##### Recent Agreements/Overtures")
+                for agmt in reversed(agreements[-LIVE_AGREEMENTS:]):
+                    st.info(f"""
+**{agmt.agent} → {agmt.target}** (Turn {agmt.turn})
+Intent: **{agmt.intent}**
+Message: "{agmt.message}"
+""")
+            elif action_log:
+                st.markdown("<em>No significant agreements logged yet.</em>", unsafe_allow_html=True)
+            else:
+                st.markdown("_(Notable agreements or alliance formations will appear here...)_", unsafe_allow_html=True)
+
+        st.markdown("---")
+        st.subheader("🌐 Diplomatic Network")
+        show_graph(job)
+
+    def show_log_viewer(action_log):
+        with st.expander(f"🔎 Browse Full Log ({len(action_log)} actions)", expanded=False):
+            col_nation, col_intent, col_turns = st.columns(3)
+            nation_filter = col_nation.multiselect("Nation (sender or target)", options=sorted(action_log.by_nation), key="log_filter_nations")
+            intent_filter = col_intent.multiselect("Intent", options=sorted(action_log.by_intent), key="log_filter_intents")
+            first_turn, last_turn = min(action_log.by_turn), max(action_log.by_turn)
+            turn_filter = None
+            if last_turn > first_turn:
+                low, high = col_turns.slider("Turns", first_turn, last_turn, (first_turn, last_turn), key="log_filter_turns")
+                if (low, high) != (first_turn, last_turn):
+                    turn_filter = range(low, high + 1)
+            col_search, col_page = st.columns([3, 1])
+            search_text = col_search.text_input("Search messages", key="log_filter_text")
+            positions = action_log.select(nation_filter, intent_filter, turn_filter, search_text)
+            requested_page = col_page.number_input("Page", min_value=1, value=1, step=1, key="log_page")
+            entries, page, pages = action_log.page(positions, requested_page, LOG_PAGE_SIZE)
+            st.caption(f"{len(positions)} matching actions • page {page} of {pages} • newest first")
+            st.markdown("".join(format_log_entry_html(entry) for entry in entries), unsafe_allow_html=True)
+
+    def show_report(job):
+        engine, result = job.engine, job.result
+        scenario, num_turns, nations = engine.scenario, engine.num_turns, engine.nations
+        final_metrics = result["metrics"]
+        initial_metrics = result["metrics_initial"]
+        summary = network_summary(result["relations"])
+
+        st.subheader("Simulation Summary Report")
+        st.markdown(f"**Scenario:** {scenario}")
+        st.markdown(f"**Duration:** {num_turns} turns ({len(nations)} agent actions per turn)")
+        st.markdown(f"**Agreements Logged:** {len(result['agreements'])}")
+        st.markdown(f"**Network Density:** {summary['density']:.3f} | **Components:** {summary['components']}")
+        if engine.scheduler is not None:
+            llm_stats = engine.scheduler.summary()
+            st.markdown(f"**LLM Calls:** {llm_stats['requests']} requests, {llm_stats['retries']} retries, "
+                        f"{llm_stats['throttled']} rate-limited, {llm_stats['failed']} failed")
+        if engine.cache is not None:
+            cache_stats = engine.cache.stats()
+            st.markdown(f"**Response Cache:** {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['entries']} entries)")
+
+        st.markdown("##### Key Observations")
+        st.markdown(f"* Most active nation (highest degree): **{summary['most_active']}**")
+        st.markdown(f"* Strongest positive relationship (highest edge weight > 0.1): **{summary['strongest_pair']}**")
+        st.markdown(f"* Nation with lowest degree: **{summary['least_active']}**")
+
+        st.markdown("##### Final Metrics (vs Initial)")
+        fm_peace = final_metrics.get('Peace Index', 0); im_peace = initial_metrics.get('Peace Index', 0)
+        st.markdown(f"* 🕊️ Peace Index: **{fm_peace:.2f}** ({fm_peace - im_peace:+.2f})")
+        fm_co2 = final_metrics.get('Carbon Emissions (Gt)', 0); im_co2 = initial_metrics.get('Carbon Emissions (Gt)', 0)
+        st.markdown(f"* 💨 CO₂ Emissions (Gt): **{fm_co2:.1f}** ({fm_co2 - im_co2:+.1f})")
+        fm_ref = final_metrics.get('Refugee Migration (M)', 0); im_ref = initial_metrics.get('Refugee Migration (M)', 0)
+        st.markdown(f"* 🚶 Refugees (M): **{int(fm_ref):,}** ({int(fm_ref - im_ref):+,})")
+        fm_energy = final_metrics.get('Energy Stability Index', 0); im_energy = initial_metrics.get('Energy Stability Index', 0)
+        st.markdown(f"* ⚡ Energy Stability: **{fm_energy:.2f}** ({fm_energy - im_energy:+.2f})")
+        fm_econ = final_metrics.get('Economic Growth (%)', 0); im_econ = initial_metrics.get('Economic Growth (%)', 0)
+        st.markdown(f"* 📈 Econ Growth (%): **{fm_econ:.1f}%** ({fm_econ - im_econ:+.1f}%)")
+
+        st.markdown("---")
+        st.subheader("📥 Download Results")
+
+        st.download_button(
+            label="📄 Download Full Action Log (.txt)",
+            data=transcript_text(result),
+            file_name=f"PoliBot_AgentLog_{scenario.split(' ')[0]}_{datetime.now().strftime('%Y%m%d')}.txt",
+            mime="text/plain",
+            use_container_width=True,
+            key="dl_transcript"
+        )
+        st.download_button(
+            label="🎞️ Download Run Recording (.json)",
+            data=json.dumps(recording_from_result(result), ensure_ascii=False),
+            file_name=f"PoliBot_Recording_{scenario.split(' ')[0]}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+            mime="application/json",
+            use_container_width=True,
+            key="dl_recording"
+        )
+
+        metrics_file = f"PoliBot_Metrics_{scenario.split(' ')[0]}_{datetime.now().strftime('%Y%m%d')}"
+        csv_buffer = io.StringIO()
+        engine.metric_series.to_csv(csv_buffer)
+        col_csv, col_parquet = st.columns(2)
+        col_csv.download_button(
+            label="📈 Download Metric History (.csv)",
+            data=csv_buffer.getvalue(),
+            file_name=f"{metrics_file}.csv",
+            mime="text/csv",
+            use_container_width=True,
+            key="dl_metrics_csv"
+        )
+        parquet_buffer = io.BytesIO()
+        try:
+            engine.metric_series.to_parquet(parquet_buffer)
+        except RuntimeError as e:
+            col_parquet.caption(str(e))
+        else:
+            col_parquet.download_button(
+                label="📈 Download Metric History (.parquet)",
+                data=parquet_buffer.getvalue(),
+                file_name=f"{metrics_file}.parquet",
+                mime="application/octet-stream",
+                use_container_width=True,
+                key="dl_metrics_parquet"
+            )
 
+        exporter = getattr(engine, "exporter", None)
+        if exporter is not None and exporter.tables:
+            zip_buffer = io.BytesIO()
+            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+                for table, writer in exporter.tables.items():
+                    for path in sorted(glob.glob(os.path.join(exporter.directory, table, f"{exporter.run_id}-*"))):
+                        archive.write(path, os.path.join(table, os.path.basename(path)))
             st.download_button(
-                label="📄 Download Full Action Log (.txt)",
-                data=transcript_data,
-                file_name=f"PoliBot_AgentLog_{scenario.split(' ')[0]}_{datetime.now().strftime('%Y%m%d')}.txt",
-                mime="text/plain",
+                label=f"🗃️ Download Result Tables ({exporter.format}, .zip)",
+                data=zip_buffer.getvalue(),
+                file_name=f"PoliBot_Tables_{exporter.run_id}.zip",
+                mime="application/zip",
                 use_container_width=True,
-                key="dl_transcript"
+                key="dl_tables"
             )
 
-        except Exception as sim_e:
-             st.error(f"An error occurred during the simulation: {sim_e}", icon="🔥")
-             print("--- Simulation Error Traceback ---")
-             traceback.print_exc()
-             print("---------------------------------")
-             st.exception(sim_e)
-        finally:
-             progress_bar_placeholder.empty()
-             status_text_placeholder.empty()
+        if isinstance(engine.timer, Tracer):
+            tracer = engine.timer
+            col_trace, col_timings = st.columns(2)
+            col_trace.download_button(
+                label="🧭 Download Chrome Trace (.json)",
+                data=json.dumps(tracer.chrome_trace()),
+                file_name=f"PoliBot_Trace_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True,
+                key="dl_trace"
+            )
+            col_timings.download_button(
+                label="⏱️ Download Stage Timings (.json)",
+                data=json.dumps(tracer.to_json(), indent=2),
+                file_name=f"PoliBot_Timings_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True,
+                key="dl_timings"
+            )
+
+    job = current_job()
+    running = job is not None and not job.done
+    if job is not None and job.done:
+        st.session_state.job_reported = job.id
+    st.fragment(run_every=POLL_INTERVAL if running else None)(show_dashboard)()
 
+    if st.session_state.simulation_log and not running:
+        st.markdown("---")
+        show_log_viewer(st.session_state.simulation_log)
 
+    st.markdown("---")
+    st.subheader("📄 Simulation Analytics")
+    if job is not None and job.status == "completed":
+        show_report(job)
+    elif running:
+        st.markdown("_(Simulation running...)_")
+    else:
+        st.markdown("_(Summary report will appear here after simulation...)_")
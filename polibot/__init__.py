@@ -0,0 +1,11 @@
+from .actions import Action, ActionLog, ActionRecord
+from .agents import MODEL, CountryAgent, collect_turn_actions
+from .broker import QueueClient, RedisBroker, RemoteJob, SQLiteBroker, open_broker
+from .cache import CachedClient, CacheMiss, MemoryCache, SQLiteCache, TieredCache
+from .catalog import CATALOG, COUNTRY_PROFILES, SCENARIO_DETAILS, Catalog
+from .engine import SimulationEngine, initial_metrics, network_summary, transcript_text
+from .export import ResultExporter
+from .impact import IMPACT_MODEL, ImpactModel, determine_action_impact, parse_action
+from .jobs import JobManager, SimulationJob
+from .scheduler import RequestScheduler, ScheduledClient, TokenBucket
+from .series import MetricSeries
@@ -0,0 +1,90 @@
+class Action:
+    # One parsed model response. Fields stay None when the response did not provide them.
+    __slots__ = ("intent", "target", "message")
+
+    def __init__(self, intent=None, target=None, message=None):
+        self.intent = intent
+        self.target = target
+        self.message = message
+
+    def is_complete(self):
+        return bool(self.intent and self.target and self.message)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__)})"
+
+
+class ActionRecord(Action):
+    # An applied action as it appears in the simulation log, agent memories and the
+    # agreement list. as_dict() / from_dict() convert to and from the JSON form used by
+    # event logs and result files.
+    __slots__ = ("turn", "timestamp", "agent", "impact", "prompt_tokens")
+    FIELDS = ("turn", "timestamp", "agent", "intent", "target", "message", "impact", "prompt_tokens")
+
+    def __init__(self, turn, timestamp, agent, intent, target, message, impact, prompt_tokens=None):
+        super().__init__(intent, target, message)
+        self.turn = turn
+        self.timestamp = timestamp
+        self.agent = agent
+        self.impact = impact
+        self.prompt_tokens = prompt_tokens
+
+    def __repr__(self):
+        return f"ActionRecord({', '.join(f'{k}={getattr(self, k)!r}' for k in self.FIELDS)})"
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: data.get(k) for k in cls.FIELDS})
+
+
+class ActionLog:
+    # Append-only log of ActionRecords. Each append also files the record's position
+    # under its nations (sender and target), intent and turn, so filtered views are
+    # built from the indexes and only the requested page is ever materialised.
+    def __init__(self, entries=()):
+        self.entries = []
+        self.by_nation = {}
+        self.by_intent = {}
+        self.by_turn = {}
+        for entry in entries:
+            self.append(entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, entry):
+        position = len(self.entries)
+        self.entries.append(entry)
+        for nation in {entry.agent, entry.target}:
+            self.by_nation.setdefault(nation, []).append(position)
+        self.by_intent.setdefault(entry.intent, []).append(position)
+        self.by_turn.setdefault(entry.turn, []).append(position)
+        return position
+
+    def select(self, nations=None, intents=None, turns=None, text=None, newest_first=True):
+        # Empty or None filters match everything. Returns positions, not records.
+        positions = None
+        for index, keys in ((self.by_nation, nations), (self.by_intent, intents), (self.by_turn, turns)):
+            if not keys:
+                continue
+            matched = set()
+            for key in keys:
+                matched.update(index.get(key, ()))
+            positions = matched if positions is None else positions & matched
+        positions = list(range(len(self.entries))) if positions is None else sorted(positions)
+        if text:
+            text = text.lower()
+            positions = [p for p in positions if text in (self.entries[p].message or "").lower()]
+        if newest_first:
+            positions.reverse()
+        return positions
+
+    def page(self, positions, page, page_size=20):
+        # Pages are 1-based; out-of-range page numbers are clamped.
+        pages = max(1, -(-len(positions) // page_size))
+        page = min(max(page, 1), pages)
+        start = (page - 1) * page_size
+        return [self.entries[p] for p in positions[start:start + page_size]], page, pages
@@ -0,0 +1,219 @@
+import re
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .impact import parse_json_action
+from .memory import AgentMemory
+from .prompts import PromptBuilder
+from .timing import NULL_TIMER
+
+MODEL = "llama3-70b-8192"
+TEMPERATURE = 0.75
+MAX_TOKENS = 250
+
+HEADER_MARKERS = ["[Intent]:", "[Target]:", "[Message]:"]
+MALFORMED_ACTION = "[Intent]: Decline to act\n[Target]: GLOBAL\n[Message]: (Agent decided to observe this turn due to unclear instructions or malformed response template)"
+
+
+class MalformedStreamError(ValueError):
+    pass
+
+
+class StreamingActionParser:
+    # Accumulates streamed completion text and exposes the header fields parsed so far.
+    # is_malformed() only fires on clearly broken output, so a response is never
+    # rejected here that parse_action would have accepted from its first lines. In
+    # JSON mode the fields are read from the partial object instead of the headers.
+    def __init__(self, json_mode=False):
+        self.text = ""
+        self.json_mode = json_mode
+
+    def feed(self, chunk):
+        self.text += chunk or ""
+
+    def complete_lines(self):
+        return [line.strip() for line in self.text.split("\n")[:-1] if line.strip()]
+
+    def fields(self):
+        found = {}
+        if self.json_mode:
+            for key, value in re.findall(r'"(intent|target|message)"\s*:\s*"((?:[^"\\]|\\.)*)', self.text, re.IGNORECASE):
+                found[key.lower()] = value.strip()
+            return found
+        for key, pattern in (("intent", r"\[Intent\]:[ \t]*(.*)"), ("target", r"\[Target\]:[ \t]*(.*)"),
+                             ("message", r"\[Message\]:\s*(.*)")):
+            match = re.search(pattern, self.text, re.IGNORECASE | (re.DOTALL if key == "message" else 0))
+            if match:
+                found[key] = match.group(1).strip()
+        return found
+
+    def is_malformed(self):
+        if self.json_mode:
+            start = self.text.lstrip()[:1]
+            return bool(start) and start not in "{`"
+        lines = [line.lower() for line in self.complete_lines()]
+        intent_line = next((i for i, line in enumerate(lines) if line.startswith("[intent]:")), None)
+        if intent_line is None:
+            return len(lines) >= 2
+        after_intent = lines[intent_line + 1:intent_line + 3]
+        return len(after_intent) == 2 and not any(line.startswith("[target]:") for line in after_intent)
+
+    def is_complete(self):
+        if self.json_mode:
+            return is_well_formed(self.text, json_mode=True)
+        return all(marker in self.text for marker in HEADER_MARKERS)
+
+
+def is_well_formed(action_text, json_mode=False):
+    if json_mode:
+        action = parse_json_action(action_text)
+        return action is not None and action.is_complete()
+    return all(marker in action_text for marker in HEADER_MARKERS)
+
+
+def failed_action(error):
+    return f"[Intent]: Decline to act\n[Target]: GLOBAL\n[Message]: (Technical difficulties prevented action: {error})"
+
+
+class CountryAgent:
+    def __init__(self, name, profile, groq_client, memory_tokens=400, model=MODEL):
+        self.name = name
+        self.profile = profile
+        self.groq = groq_client
+        self.model = model
+        self.memory = AgentMemory(name, token_budget=memory_tokens)
+        self.timer = NULL_TIMER
+        self.json_mode = False
+        self.last_prompt_tokens = None
+        self._prompt_builder = None
+        self._prompt_key = None
+
+    def remember(self, entry, received=False):
+        self.memory.record(entry, received)
+
+    def act(self, scenario, scenario_details, turn, all_nations, timeout=None, stream=False, on_token=None, max_attempts=2):
+        with self.timer.stage("prompt", turn=turn, agent=self.name):
+            messages, self.last_prompt_tokens = self.build_messages(scenario, scenario_details, turn, all_nations)
+
+        try:
+            with self.timer.stage("llm", turn=turn, agent=self.name, stream=stream):
+                if stream:
+                    return self._act_streaming(messages, timeout, on_token, max_attempts)
+
+                completion = self.groq.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=MAX_TOKENS,
+                    stop=None,
+                    timeout=timeout,
+                    **self.request_options()
+                )
+            self.record_usage(getattr(completion, "usage", None))
+            action_text = self.accept_response(completion.choices[0].message.content)
+            if action_text is MALFORMED_ACTION:
+                self.reject_response(messages)
+            return action_text
+
+        except Exception as e:
+            print(f"Error during API call for {self.name}: {e}", file=sys.stderr)
+            traceback.print_exc()
+            return failed_action(e)
+
+    def accept_response(self, action_text):
+        action_text = action_text.strip()
+        if is_well_formed(action_text, self.json_mode):
+            return action_text
+        print(f"Warning: Malformed response from {self.name}: {action_text}", file=sys.stderr)
+        return MALFORMED_ACTION
+
+    def reject_response(self, messages):
+        # A cached client would otherwise serve the rejected completion again.
+        forget = getattr(self.groq, "forget", None)
+        if forget:
+            forget(model=self.model, messages=messages, temperature=TEMPERATURE, max_tokens=MAX_TOKENS)
+
+    def batch_request(self, scenario, scenario_details, turn, all_nations):
+        # Body of one chat completion request for an offline batch job, with the same
+        # prompt and sampling settings act() uses.
+        messages, self.last_prompt_tokens = self.build_messages(scenario, scenario_details, turn, all_nations)
+        return {"model": self.model, "messages": messages, "temperature": TEMPERATURE, "max_tokens": MAX_TOKENS,
+                **self.request_options()}
+
+    def build_messages(self, scenario, scenario_details, turn, all_nations):
+        key = (scenario, tuple(all_nations), self.json_mode)
+        if self._prompt_key != key:
+            self._prompt_builder = PromptBuilder(self.name, self.profile, scenario, scenario_details, all_nations, self.json_mode)
+            self._prompt_key = key
+        return self._prompt_builder.messages(turn, self.memory.lines())
+
+    def request_options(self):
+        # Groq's JSON mode guarantees a syntactically valid object, so no response
+        # has to fall back to "Decline to act" because its headers were mangled.
+        return {"response_format": {"type": "json_object"}} if self.json_mode else {}
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        if getattr(usage, "prompt_tokens", None):
+            self.last_prompt_tokens = usage.prompt_tokens
+        self.timer.count("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0, agent=self.name)
+        self.timer.count("completion_tokens", getattr(usage, "completion_tokens", 0) or 0, agent=self.name)
+
+    def _act_streaming(self, messages, timeout, on_token, max_attempts):
+        for attempt in range(1, max_attempts + 1):
+            if attempt > 1:
+                self.timer.count("retries", agent=self.name)
+            parser = StreamingActionParser(self.json_mode)
+            response = self.groq.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS,
+                stop=None,
+                timeout=timeout,
+                stream=True,
+                **self.request_options()
+            )
+            try:
+                for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    # Groq reports usage on the final chunk under x_groq.
+                    x_groq = getattr(chunk, "x_groq", None)
+                    if x_groq is not None:
+                        self.record_usage(getattr(x_groq, "usage", None))
+                    parser.feed(chunk.choices[0].delta.content)
+                    if parser.is_malformed():
+                        raise MalformedStreamError(parser.text)
+                    if on_token:
+                        on_token(self.name, parser.fields())
+            except MalformedStreamError:
+                print(f"Warning: Aborted malformed stream from {self.name} (attempt {attempt}/{max_attempts}): {parser.text!r}", file=sys.stderr)
+                self.reject_response(messages)
+                continue
+            finally:
+                close = getattr(response, "close", None)
+                if close:
+                    close()
+
+            action_text = parser.text.strip()
+            if parser.is_complete():
+                return action_text
+            print(f"Warning: Malformed response from {self.name}: {action_text}", file=sys.stderr)
+            self.reject_response(messages)
+        return MALFORMED_ACTION
+
+
+def collect_turn_actions(agents, agent_order, scenario, scenario_details, turn, all_nations, max_workers=4, timeout=None, stream=False):
+    # All agents see the same memory snapshot within a turn, so their prompts are
+    # independent and can be sent at once. Results are keyed by agent name and the
+    # caller applies them in agent_order, keeping the random stream unchanged.
+    max_workers = max(1, min(int(max_workers), len(agent_order)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="polibot-agent") as executor:
+        futures = {
+            name: executor.submit(agents[name].act, scenario, scenario_details, turn, all_nations, timeout, stream)
+            for name in agent_order
+        }
+        return {name: future.result() for name, future in futures.items()}
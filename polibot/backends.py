@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+from .fake import FakeGroqClient
+
+BACKENDS = ["groq", "openai", "llamacpp", "fake"]
+DEFAULT_LOCAL_URL = "http://localhost:8080/v1"
+# llama-server serves whatever model it was started with and ignores the name.
+LOCAL_MODEL = "local"
+
+
+def to_namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: to_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [to_namespace(v) for v in value]
+    return value
+
+
+class BackendHTTPError(Exception):
+    # Carries status_code and response.headers like the groq SDK errors, so the
+    # RequestScheduler can retry 429s and 5xx responses and honour Retry-After.
+    def __init__(self, status_code, message, headers=None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={k.lower(): v for k, v in (headers or {}).items()})
+
+
+def create_groq_client(api_key=None, max_retries=0):
+    # Retries are left to the RequestScheduler, so the SDK's own retry loop is off.
+    from groq import Groq
+
+    api_key = api_key or os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY is not set.")
+    return Groq(api_key=api_key, max_retries=max_retries)
+
+
+class SSEStream:
+    def __init__(self, response):
+        self._response = response
+
+    def __iter__(self):
+        try:
+            for raw in self._response:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                for choice in chunk.get("choices") or []:
+                    choice.setdefault("delta", {}).setdefault("content", None)
+                yield to_namespace(chunk)
+        finally:
+            self.close()
+
+    def close(self):
+        self._response.close()
+
+
+class OpenAICompatibleClient:
+    # Minimal standard-library client for local OpenAI-compatible servers (llama.cpp's
+    # llama-server, Ollama, vLLM, LM Studio). It mirrors the parts of the groq client the
+    # agents use: chat.completions.create (plain and streaming) and models.list.
+    def __init__(self, base_url=DEFAULT_LOCAL_URL, api_key=None, timeout=120.0):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.chat = self
+        self.completions = self
+        self.models = SimpleNamespace(list=self.list_models)
+
+    def _request(self, path, payload=None, timeout=None):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers,
+                                         method="POST" if payload is not None else "GET")
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            raise BackendHTTPError(e.code, e.read().decode("utf-8", "replace")[:200], dict(e.headers)) from e
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"Cannot reach {self.base_url}: {e.reason}") from e
+
+    def list_models(self):
+        with self._request("/models") as response:
+            return to_namespace(json.load(response)).data
+
+    def create(self, model, messages, stream=False, timeout=None, **kwargs):
+        payload = {"model": model, "messages": messages, "stream": stream,
+                   **{k: v for k, v in kwargs.items() if v is not None}}
+        response = self._request("/chat/completions", payload, timeout)
+        if stream:
+            return SSEStream(response)
+        with response:
+            return to_namespace(json.load(response))
+
+
+class LlamaCppClient:
+    # In-process CPU inference through the optional llama-cpp-python package. Calls are
+    # serialised because a Llama instance is not thread-safe; a streaming request is
+    # generated in full and returned as a single chunk.
+    def __init__(self, model_path, n_ctx=4096, n_threads=None, **llama_options):
+        try:
+            from llama_cpp import Llama
+        except ImportError as e:
+            raise RuntimeError("The llamacpp backend requires llama-cpp-python (pip install llama-cpp-python).") from e
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False, **llama_options)
+        self.model_name = os.path.basename(model_path)
+        self._lock = threading.Lock()
+        self.chat = self
+        self.completions = self
+        self.models = SimpleNamespace(list=lambda: [SimpleNamespace(id=self.model_name)])
+
+    def create(self, model, messages, stream=False, timeout=None, stop=None, response_format=None, **kwargs):
+        options = {k: kwargs[k] for k in ("temperature", "max_tokens") if kwargs.get(k) is not None}
+        with self._lock:
+            data = self.llm.create_chat_completion(messages=messages, stop=stop or [], response_format=response_format, **options)
+        completion = to_namespace(data)
+        if not stream:
+            return completion
+        delta = SimpleNamespace(content=completion.choices[0].message.content)
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason="stop")])])
+
+
+def create_client(backend="groq", api_key=None, base_url=None, model_path=None):
+    if backend == "groq":
+        return create_groq_client(api_key)
+    if backend == "openai":
+        return OpenAICompatibleClient(base_url or os.environ.get("POLIBOT_LOCAL_URL", DEFAULT_LOCAL_URL), api_key=api_key)
+    if backend == "llamacpp":
+        model_path = model_path or os.environ.get("POLIBOT_MODEL_PATH")
+        if not model_path:
+            raise ValueError("The llamacpp backend needs a GGUF model path (--model-path or POLIBOT_MODEL_PATH).")
+        return LlamaCppClient(model_path)
+    if backend == "fake":
+        return FakeGroqClient()
+    raise ValueError(f"Unknown backend '{backend}'; choose one of: {', '.join(BACKENDS)}")
@@ -0,0 +1,231 @@
+import argparse
+import itertools
+import multiprocessing
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from .agents import MODEL
+from .backends import BACKENDS, LOCAL_MODEL, create_client, create_groq_client
+from .cache import SQLiteCache
+from .catalog import SCENARIO_DETAILS
+from .cli import resolve_scenario, write_output
+from .engine import SimulationEngine
+from .export import EXPORT_FORMATS, ResultExporter
+from .scheduler import RequestScheduler
+from .timing import percentile
+
+OUTCOME_METRICS = ["Peace Index", "Carbon Emissions (Gt)", "Refugee Migration (M)",
+                   "Energy Stability Index", "Economic Growth (%)"]
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+class SharedRateLimiter:
+    # Spaces LLM requests evenly across every worker process. The next free slot
+    # lives in a Manager value so all processes reserve slots from the same clock.
+    def __init__(self, requests_per_minute, manager):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = manager.Value('d', 0.0)
+        self._lock = manager.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class RateLimitedClient:
+    # Exposes the client.chat.completions.create shape CountryAgent expects.
+    def __init__(self, client, limiter):
+        self._client = client
+        self._limiter = limiter
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        if self._limiter:
+            self._limiter.acquire()
+        return self._client.chat.completions.create(**kwargs)
+
+
+_worker_limiter = None
+_worker_client_factory = None
+_worker_cache = None
+_worker_scheduler = None
+_worker_export = None
+
+
+def _init_worker(limiter, client_factory, cache, export=None):
+    global _worker_limiter, _worker_client_factory, _worker_cache, _worker_scheduler, _worker_export
+    _worker_limiter = limiter
+    _worker_client_factory = client_factory
+    _worker_cache = cache
+    _worker_export = export
+    # The shared limiter paces requests across processes; the per-process scheduler
+    # only retries throttled or failed calls.
+    _worker_scheduler = RequestScheduler(max_in_flight=None)
+
+
+def job_run_id(job):
+    slug = re.sub(r"\W+", "-", job["scenario"]).strip("-")
+    return f"{slug}_{'-'.join(job['nations'])}_seed{job['seed']}"
+
+
+def run_single(job):
+    client = RateLimitedClient(_worker_client_factory(), _worker_limiter)
+    # Every run writes its own part files, so worker processes never share a file.
+    exporter = ResultExporter(*_worker_export, run_id=job_run_id(job)) if _worker_export else None
+    engine = SimulationEngine(
+        client, job["scenario"], job["nations"],
+        num_turns=job["num_turns"], severity=job["severity"],
+        initial_peace=job["initial_peace"], seed=job["seed"], model=job.get("model", MODEL), cache=_worker_cache,
+        scheduler=_worker_scheduler, exporter=exporter,
+    )
+    return run_outcome(job, engine.run())
+
+
+def run_outcome(job, result):
+    return {
+        "scenario": job["scenario"],
+        "nations": job["nations"],
+        "seed": job["seed"],
+        "metrics": result["metrics"],
+        "intents": dict(Counter(entry.intent for entry in result["log"])),
+        "agreements": len(result["agreements"]),
+    }
+
+
+class OutcomeAggregator:
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, outcome):
+        key = (outcome["scenario"], tuple(outcome["nations"]))
+        group = self.groups.setdefault(key, {"runs": 0, "metrics": {m: [] for m in OUTCOME_METRICS},
+                                             "intents": Counter(), "agreements": 0})
+        group["runs"] += 1
+        for m in OUTCOME_METRICS:
+            if m in outcome["metrics"]:
+                group["metrics"][m].append(outcome["metrics"][m])
+        group["intents"].update(outcome["intents"])
+        group["agreements"] += outcome["agreements"]
+
+    def summary(self):
+        summaries = []
+        for (scenario, nations), group in self.groups.items():
+            metric_stats = {}
+            for m, values in group["metrics"].items():
+                if not values:
+                    continue
+                ordered = sorted(values)
+                stats = {"mean": sum(ordered) / len(ordered)}
+                for pct in PERCENTILES:
+                    stats[f"p{pct}"] = percentile(ordered, pct)
+                metric_stats[m] = stats
+            total_actions = sum(group["intents"].values())
+            summaries.append({
+                "scenario": scenario,
+                "nations": list(nations),
+                "runs": group["runs"],
+                "metrics": metric_stats,
+                "intent_frequencies": {i: c / total_actions for i, c in group["intents"].most_common()} if total_actions else {},
+                "mean_agreements": group["agreements"] / group["runs"],
+            })
+        return summaries
+
+
+def build_jobs(scenarios, nation_sets, seeds, num_turns=10, severity=5, initial_peace=0.5, model=MODEL):
+    return [
+        {"scenario": scenario, "nations": list(nations), "seed": seed,
+         "num_turns": num_turns, "severity": severity, "initial_peace": initial_peace, "model": model}
+        for scenario, nations, seed in itertools.product(scenarios, nation_sets, seeds)
+    ]
+
+
+def run_batch(jobs, max_workers=None, requests_per_minute=None, client_factory=create_groq_client, cache=None, on_progress=None,
+              export_dir=None, export_format="parquet"):
+    aggregator = OutcomeAggregator()
+    failures = []
+    with multiprocessing.Manager() as manager:
+        limiter = SharedRateLimiter(requests_per_minute, manager) if requests_per_minute else None
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(limiter, client_factory, cache, (export_dir, export_format) if export_dir else None)) as executor:
+            futures = {executor.submit(run_single, job): job for job in jobs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                job = futures[future]
+                try:
+                    aggregator.add(future.result())
+                except Exception as e:
+                    print(f"Error in batch run {job['scenario']} / {job['nations']} / seed {job['seed']}: {e}", file=sys.stderr)
+                    failures.append({**job, "error": str(e)})
+                if on_progress:
+                    on_progress(done, len(jobs), aggregator)
+    return {"summary": aggregator.summary(), "failures": failures}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="polibot.batch", description="Run Monte Carlo batches of PoliBot simulations across a process pool.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIO_DETAILS),
+                        help="Scenario names or unique substrings. Defaults to every scenario.")
+    parser.add_argument("--nation-set", action="append", dest="nation_sets", metavar="NATIONS",
+                        help="Comma-separated nation set, e.g. 'USA,China,EU'. Repeat for several sets.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of seeds per scenario and nation set.")
+    parser.add_argument("--seed-start", type=int, default=0)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--severity", type=int, default=5, choices=range(1, 11), metavar="1-10")
+    parser.add_argument("--initial-peace", type=float, default=0.5)
+    parser.add_argument("--backend", choices=BACKENDS, default="groq", help="LLM backend used by every worker process.")
+    parser.add_argument("--base-url", default=None, help="Server URL for --backend openai.")
+    parser.add_argument("--model-path", default=None, help="GGUF model file for --backend llamacpp (loaded once per worker).")
+    parser.add_argument("--model", default=None, help=f"Model name (defaults to {MODEL} on Groq, '{LOCAL_MODEL}' otherwise).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to the CPU count).")
+    parser.add_argument("--rpm", type=float, default=30.0, help="Shared LLM requests-per-minute limit across all workers (0 disables).")
+    parser.add_argument("--cache", default=None, metavar="PATH", help="SQLite file shared by all workers to cache agent completions.")
+    parser.add_argument("--export", default=None, metavar="DIR",
+                        help="Write every run's actions, metric snapshots, relationship snapshots and agreements as tables under DIR.")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, default="parquet",
+                        help="Table format for --export; Parquet needs pyarrow and falls back to CSV without it.")
+    parser.add_argument("--output", "-o", default="-", help="Path for the JSON summary ('-' for stdout).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        scenarios = [resolve_scenario(s) for s in args.scenarios]
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    nation_sets = [[n.strip() for n in s.split(",") if n.strip()] for s in (args.nation_sets or ["USA,China,India,EU,Pakistan"])]
+    seeds = range(args.seed_start, args.seed_start + args.runs)
+    model = args.model or (LOCAL_MODEL if args.backend != "groq" else MODEL)
+    jobs = build_jobs(scenarios, nation_sets, seeds, args.turns, args.severity, args.initial_peace, model)
+    # A partial of a module-level function pickles, so each worker process builds its own client.
+    client_factory = partial(create_client, args.backend, base_url=args.base_url, model_path=args.model_path)
+
+    def report(done, total, aggregator):
+        parts = []
+        for group in aggregator.summary():
+            peace = group["metrics"].get("Peace Index")
+            if peace:
+                parts.append(f"{group['scenario']} [{', '.join(group['nations'])}] n={group['runs']} peace mean={peace['mean']:.3f} p50={peace['p50']:.3f}")
+        print(f"[{done}/{total}] " + " | ".join(parts), file=sys.stderr)
+
+    cache = SQLiteCache(args.cache) if args.cache else None
+    data = run_batch(jobs, max_workers=args.workers, requests_per_minute=args.rpm or None, client_factory=client_factory,
+                     cache=cache, on_progress=report,
+                     export_dir=args.export, export_format=args.export_format)
+    write_output(data, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from .catalog import COUNTRY_PROFILES, SCENARIO_DETAILS
+from .cli import resolve_scenario
+from .engine import SimulationEngine
+from .fake import FakeGroqClient
+from .render import NetworkRenderer, format_log_entry_html
+from .timing import StageTimer, percentile
+
+STAGES = ["prompt", "llm", "parse", "impact", "memory", "log_render", "graph_render"]
+DEFAULT_NATION_COUNTS = [2, 5, 9]
+DEFAULT_TURN_COUNTS = [3, 10, 30]
+
+
+def run_benchmark(num_nations, num_turns, scenario=None, latency=0.0, frame_interval=0, render_graph=True, seed=0):
+    # Runs one simulation against FakeGroqClient and times every stage of the hot loop,
+    # including the log HTML and graph rendering the Streamlit app performs per action.
+    scenario = scenario or list(SCENARIO_DETAILS)[0]
+    nations = sorted(COUNTRY_PROFILES)[:num_nations]
+    timer = StageTimer()
+    renderer = NetworkRenderer(frame_interval=frame_interval) if render_graph else None
+    rendered_log = []
+
+    def timed_frame(render, *args):
+        # Only frames that were actually drawn count towards graph_render.
+        start = time.perf_counter()
+        if render(*args) is not None:
+            timer.record("graph_render", time.perf_counter() - start)
+
+    def on_action(engine, entry):
+        with timer.stage("log_render"):
+            rendered_log.insert(0, format_log_entry_html(entry))
+            "".join(rendered_log[:15])
+        if renderer:
+            timed_frame(renderer.action_frame, engine.relations, entry.turn)
+
+    def on_turn_end(engine, turn):
+        if renderer:
+            timed_frame(renderer.turn_frame, engine.relations, turn)
+
+    engine = SimulationEngine(
+        FakeGroqClient(latency=latency, seed=seed), scenario, nations, num_turns=num_turns, seed=seed,
+        timer=timer, on_action=on_action, on_turn_end=on_turn_end
+    )
+    start = time.perf_counter()
+    engine.run()
+    elapsed = time.perf_counter() - start
+
+    actions = len(engine.log)
+    stages = {}
+    for stage in STAGES:
+        values = sorted(timer.durations.get(stage, []))
+        if values:
+            stages[stage] = {
+                "count": len(values),
+                "total_ms": sum(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+            }
+    return {
+        "nations": num_nations,
+        "turns": num_turns,
+        "actions": actions,
+        "elapsed_s": elapsed,
+        "actions_per_s": actions / elapsed if elapsed else float("inf"),
+        "stages": stages,
+    }
+
+
+def measure_peak_memory(num_nations, num_turns, **kwargs):
+    # Separate pass because tracemalloc slows allocation-heavy code considerably.
+    tracemalloc.start()
+    try:
+        run_benchmark(num_nations, num_turns, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def format_report(results):
+    lines = []
+    for r in results:
+        header = f"{r['nations']} nations x {r['turns']} turns: {r['actions']} actions in {r['elapsed_s']:.3f}s ({r['actions_per_s']:.1f} actions/s)"
+        if "peak_memory_mb" in r:
+            header += f", peak memory {r['peak_memory_mb']:.1f} MB"
+        lines.append(header)
+        for stage, s in r["stages"].items():
+            lines.append(f"    {stage:<13} n={s['count']:<5} total={s['total_ms']:9.2f}ms  p50={s['p50_ms']:8.3f}ms  p95={s['p95_ms']:8.3f}ms")
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="polibot.bench", description="Benchmark the simulation loop against a local fake Groq client.")
+    parser.add_argument("--nations", type=int, nargs="+", default=DEFAULT_NATION_COUNTS, help="Nation counts to benchmark (2-9).")
+    parser.add_argument("--turns", type=int, nargs="+", default=DEFAULT_TURN_COUNTS, help="Turn counts to benchmark.")
+    parser.add_argument("--scenario", default=None, help="Scenario name or a unique substring of it (defaults to the first scenario).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated per-request latency in seconds.")
+    parser.add_argument("--frame-interval", type=int, default=0, help="Graph frame interval, as in the app (0 = once per turn).")
+    parser.add_argument("--no-graph", action="store_true", help="Skip graph rendering.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass.")
+    parser.add_argument("--json", default=None, metavar="PATH", help="Also write the raw results as JSON.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if any(n < 2 or n > len(COUNTRY_PROFILES) for n in args.nations):
+            raise ValueError(f"nation counts must be between 2 and {len(COUNTRY_PROFILES)}.")
+        scenario = resolve_scenario(args.scenario) if args.scenario else None
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    options = dict(scenario=scenario, latency=args.latency, frame_interval=args.frame_interval, render_graph=not args.no_graph)
+
+    results = []
+    for num_nations in args.nations:
+        for num_turns in args.turns:
+            result = run_benchmark(num_nations, num_turns, **options)
+            if not args.no_memory:
+                result["peak_memory_mb"] = measure_peak_memory(num_nations, num_turns, **options) / (1024 * 1024)
+            results.append(result)
+            print(format_report([result]), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from .actions import ActionLog
+from .engine import SimulationEngine
+from .timing import percentile
+
+JOB_STATES = ("queued", "running", "paused", "completed", "cancelled", "failed")
+FINISHED_STATES = ("completed", "cancelled", "failed")
+DEFAULT_LEASE = 120.0
+# Appends a job's event record only while `worker` still holds the job.
+REDIS_APPEND_EVENT = """
+if redis.call('HGET', KEYS[1], 'worker') ~= ARGV[1] then return -1 end
+local status = redis.call('HGET', KEYS[1], 'status')
+if status ~= 'running' and status ~= 'paused' then return -1 end
+return redis.call('RPUSH', KEYS[2], ARGV[2])
+"""
+
+
+class JobLost(Exception):
+    pass
+
+
+def job_spec(scenario, nations, num_turns=10, severity=5, initial_peace=0.5, seed=None, response_format="text",
+             model=None, agent_models=None, delay=0.0, **settings):
+    # Everything a worker needs to start a run. `settings` are the engine options that
+    # are not recorded in the run header (concurrent, max_concurrency, request_timeout,
+    # stream, memory_tokens), so they are passed again when a run is resumed.
+    spec = {"scenario": scenario, "nations": list(nations), "num_turns": num_turns, "severity": severity,
+            "initial_peace": initial_peace, "seed": seed, "response_format": response_format,
+            "agent_models": dict(agent_models or {}), "delay": delay, "settings": settings}
+    if model:
+        spec["model"] = model
+    return spec
+
+
+def spec_engine(spec, groq_client, **options):
+    kwargs = {k: spec[k] for k in ("num_turns", "severity", "initial_peace", "seed", "response_format", "agent_models")}
+    if spec.get("model"):
+        kwargs["model"] = spec["model"]
+    return SimulationEngine(groq_client, spec["scenario"], spec["nations"], **kwargs, **spec["settings"], **options)
+
+
+def job_stats(jobs, lease=DEFAULT_LEASE, now=None):
+    # Queue metrics over job records: counts per state, queue depth, live workers and
+    # wait / run times (seconds) of finished jobs.
+    now = now or time.time()
+    counts = {state: 0 for state in JOB_STATES}
+    workers = set()
+    waits, runtimes = [], []
+    for job in jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+        if job["status"] in ("running", "paused") and job["heartbeat_at"] and now - job["heartbeat_at"] < lease:
+            workers.add(job["worker"])
+        if job["started_at"]:
+            waits.append(job["started_at"] - job["enqueued_at"])
+        if job["status"] in FINISHED_STATES and job["started_at"] and job["finished_at"]:
+            runtimes.append(job["finished_at"] - job["started_at"])
+    stats = {**counts, "queue_depth": counts["queued"], "busy_workers": len(workers)}
+    for name, values in (("wait", sorted(waits)), ("runtime", sorted(runtimes))):
+        stats[f"{name}_mean_s"] = sum(values) / len(values) if values else None
+        stats[f"{name}_p95_s"] = percentile(values, 95)
+    return stats
+
+
+class SQLiteBroker:
+    # Job queue, event records and results in one SQLite database, for workers and app
+    # replicas on one host. SQLiteBroker(":memory:") is a private queue for tests only.
+    # Like SQLiteCache, the connection is opened lazily and dropped on pickling.
+    # A running job holds a lease renewed by its worker's heartbeat; when the lease
+    # runs out, the next claim() hands the job to another worker, which resumes it
+    # from its event records.
+    def __init__(self, path, lease=DEFAULT_LEASE):
+        self.path = path
+        self.lease = lease
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, spec TEXT NOT NULL, owner TEXT, status TEXT NOT NULL, "
+                "control TEXT, worker TEXT, turn INTEGER NOT NULL DEFAULT 0, error TEXT, result TEXT, "
+                "enqueued_at REAL NOT NULL, started_at REAL, heartbeat_at REAL, finished_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, enqueued_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events (seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, "
+                "record TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq)")
+            self._conn.commit()
+        return self._conn
+
+    def _record(self, row):
+        job = {k: row[k] for k in row.keys() if k != "result"}
+        job["spec"] = json.loads(job["spec"])
+        return job
+
+    def enqueue(self, spec, owner=None):
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT INTO jobs (id, spec, owner, status, enqueued_at) VALUES (?, ?, ?, 'queued', ?)",
+                         (job_id, json.dumps(spec, ensure_ascii=False), owner, time.time()))
+            conn.commit()
+        return job_id
+
+    def claim(self, worker):
+        # Atomically takes the oldest queued job, or a running job whose lease expired.
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' OR (status IN ('running', 'paused') AND heartbeat_at < ?) "
+                "ORDER BY enqueued_at LIMIT 1", (now - self.lease,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', worker = ?, started_at = COALESCE(started_at, ?), "
+                             "heartbeat_at = ? WHERE id = ?", (worker, now, now, row["id"]))
+            conn.commit()
+        return self.get(row["id"]) if row is not None else None
+
+    def heartbeat(self, job_id, worker, turn=None, status=None):
+        # Renews the lease and returns the pending control request ("pause", "cancel" or
+        # None), or "lost" when the job has been handed to another worker.
+        with self._lock:
+            conn = self._connection()
+            updated = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ?, turn = COALESCE(?, turn), status = COALESCE(?, status) "
+                "WHERE id = ? AND worker = ? AND status IN ('running', 'paused')", (time.time(), turn, status, job_id, worker)
+            ).rowcount
+            conn.commit()
+            if not updated:
+                return "lost"
+            return conn.execute("SELECT control FROM jobs WHERE id = ?", (job_id,)).fetchone()["control"]
+
+    def finish(self, job_id, worker, status, result=None, error=None):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, control = NULL "
+                "WHERE id = ? AND worker = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(), job_id, worker)
+            )
+            conn.commit()
+
+    def control(self, job_id, request):
+        # request is "pause", "cancel" or None (resume). A queued job is cancelled at once.
+        with self._lock:
+            conn = self._connection()
+            if request == "cancel":
+                conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                             (time.time(), job_id))
+            conn.execute("UPDATE jobs SET control = ? WHERE id = ? AND status NOT IN ('completed', 'cancelled', 'failed')",
+                         (request, job_id))
+            conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def jobs(self, owner=None, limit=1000):
+        # Newest first.
+        query, params = "SELECT * FROM jobs", ()
+        if owner is not None:
+            query, params = query + " WHERE owner = ?", (owner,)
+        with self._lock:
+            rows = self._connection().execute(query + " ORDER BY enqueued_at DESC LIMIT ?", (*params, limit)).fetchall()
+        return [self._record(row) for row in rows]
+
+    def result(self, job_id):
+        with self._lock:
+            row = self._connection().execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["result"]) if row is not None and row["result"] else None
+
+    def queue_position(self, job_id):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND enqueued_at <= "
+                "(SELECT enqueued_at FROM jobs WHERE id = ? AND status = 'queued')", (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def append_event(self, job_id, worker, record):
+        # Raises JobLost once the job has been handed to another worker, so a worker whose
+        # lease expired cannot interleave records with the run that replaced it.
+        with self._lock:
+            conn = self._connection()
+            inserted = conn.execute(
+                "INSERT INTO job_events (job_id, record) SELECT ?, ? WHERE EXISTS "
+                "(SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status IN ('running', 'paused'))",
+                (job_id, json.dumps(record, ensure_ascii=False), job_id, worker)
+            ).rowcount
+            conn.commit()
+        if not inserted:
+            raise JobLost(job_id)
+
+    def event_count(self, job_id):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM job_events WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+    def events(self, job_id, since=0):
+        # Records in append order, skipping the first `since`.
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT record FROM job_events WHERE job_id = ? ORDER BY seq LIMIT -1 OFFSET ?", (job_id, since)
+            ).fetchall()
+        return [json.loads(row["record"]) for row in rows]
+
+    def stats(self):
+        return job_stats(self.jobs(), self.lease)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class RedisBroker:
+    # The same queue on Redis (or any server speaking its protocol, e.g. Valkey, KeyDB),
+    # so workers and app replicas on different hosts can share it. Needs the redis
+    # package unless a client is passed in. Job records are hashes, the queue is a list
+    # and running jobs sit in a sorted set scored by their last heartbeat.
+    def __init__(self, url=None, client=None, prefix="polibot", lease=DEFAULT_LEASE):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("The Redis broker requires the redis package (pip install redis).") from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.lease = lease
+
+    def _key(self, *parts):
+        return ":".join((self.prefix, *parts))
+
+    def _record(self, data):
+        job = {"id": data["id"], "spec": json.loads(data["spec"]), "owner": data.get("owner") or None,
+               "status": data["status"], "control": data.get("control") or None, "worker": data.get("worker") or None,
+               "turn": int(data.get("turn") or 0), "error": data.get("error") or None}
+        for field in ("enqueued_at", "started_at", "heartbeat_at", "finished_at"):
+            job[field] = float(data[field]) if data.get(field) else None
+        return job
+
+    def enqueue(self, spec, owner=None):
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        self.client.hset(self._key("job", job_id), mapping={
+            "id": job_id, "spec": json.dumps(spec, ensure_ascii=False), "owner": owner or "",
+            "status": "queued", "turn": 0, "enqueued_at": now,
+        })
+        self.client.zadd(self._key("jobs"), {job_id: now})
+        self.client.lpush(self._key("queue"), job_id)
+        return job_id
+
+    def claim(self, worker):
+        now = time.time()
+        # Only the caller whose ZREM succeeds requeues an expired job.
+        for job_id in self.client.zrangebyscore(self._key("active"), 0, now - self.lease):
+            if self.client.zrem(self._key("active"), job_id):
+                self.client.hset(self._key("job", job_id), "status", "queued")
+                self.client.rpush(self._key("queue"), job_id)
+        while True:
+            job_id = self.client.rpop(self._key("queue"))
+            if job_id is None:
+                return None
+            key = self._key("job", job_id)
+            if self.client.hget(key, "status") != "queued":
+                continue
+            self.client.hset(key, mapping={"status": "running", "worker": worker, "heartbeat_at": now})
+            self.client.hsetnx(key, "started_at", now)
+            self.client.zadd(self._key("active"), {job_id: now})
+            return self.get(job_id)
+
+    def heartbeat(self, job_id, worker, turn=None, status=None):
+        key = self._key("job", job_id)
+        current_worker, current_status, control = self.client.hmget(key, "worker", "status", "control")
+        if current_worker != worker or current_status not in ("running", "paused"):
+            return "lost"
+        now = time.time()
+        fields = {"heartbeat_at": now}
+        if turn is not None:
+            fields["turn"] = turn
+        if status is not None:
+            fields["status"] = status
+        self.client.hset(key, mapping=fields)
+        self.client.zadd(self._key("active"), {job_id: now})
+        return control or None
+
+    def finish(self, job_id, worker, status, result=None, error=None):
+        key = self._key("job", job_id)
+        if self.client.hget(key, "worker") != worker:
+            return
+        self.client.hset(key, mapping={"status": status, "error": error or "", "finished_at": time.time(), "control": ""})
+        if result is not None:
+            self.client.set(self._key("result", job_id), json.dumps(result, ensure_ascii=False))
+        self.client.zrem(self._key("active"), job_id)
+
+    def control(self, job_id, request):
+        key = self._key("job", job_id)
+        status = self.client.hget(key, "status")
+        if status is None or status in FINISHED_STATES:
+            return
+        if request == "cancel" and status == "queued":
+            self.client.hset(key, mapping={"status": "cancelled", "finished_at": time.time()})
+        self.client.hset(key, "control", request or "")
+
+    def get(self, job_id):
+        data = self.client.hgetall(self._key("job", job_id))
+        return self._record(data) if data else None
+
+    def jobs(self, owner=None, limit=1000):
+        records = [self.get(job_id) for job_id in self.client.zrevrange(self._key("jobs"), 0, limit - 1)]
+        return [job for job in records if job is not None and (owner is None or job["owner"] == owner)]
+
+    def result(self, job_id):
+        data = self.client.get(self._key("result", job_id))
+        return json.loads(data) if data else None
+
+    def queue_position(self, job_id):
+        queue = self.client.lrange(self._key("queue"), 0, -1)
+        # The queue is consumed from the right.
+        return len(queue) - queue.index(job_id) if job_id in queue else 0
+
+    def append_event(self, job_id, worker, record):
+        appended = self.client.eval(REDIS_APPEND_EVENT, 2, self._key("job", job_id), self._key("events", job_id),
+                                    worker, json.dumps(record, ensure_ascii=False))
+        if appended == -1:
+            raise JobLost(job_id)
+
+    def event_count(self, job_id):
+        return self.client.llen(self._key("events", job_id))
+
+    def events(self, job_id, since=0):
+        return [json.loads(record) for record in self.client.lrange(self._key("events", job_id), since, -1)]
+
+    def stats(self):
+        return job_stats(self.jobs(), self.lease)
+
+    def close(self):
+        self.client.close()
+
+
+def open_broker(url, lease=DEFAULT_LEASE):
+    # "sqlite:///path/to/queue.db" (or a bare .db path) or "redis://host:6379/0".
+    # Nothing else can reach an in-memory queue, so no worker would ever run its jobs.
+    if url.startswith("sqlite:///"):
+        # sqlite:///relative.db or sqlite:////absolute.db
+        return SQLiteBroker(url[len("sqlite:///"):], lease=lease)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url, lease=lease)
+    if url.endswith(".db"):
+        return SQLiteBroker(url, lease=lease)
+    raise ValueError(f"Unsupported broker URL '{url}'; use sqlite:///path.db or redis://host:port/db.")
+
+
+class BrokerEventStore:
+    # EventStore interface over a job's event records in the broker, so the engine's
+    # run header, actions and turn ends land in the shared store as they happen.
+    # Appends raise JobLost once `worker` no longer holds the job.
+    def __init__(self, broker, job_id, worker):
+        self.broker = broker
+        self.path = job_id
+        self.worker = worker
+
+    def append(self, record):
+        self.broker.append_event(self.path, self.worker, record)
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+    def exists(self):
+        return self.broker.event_count(self.path) > 0
+
+    def records(self):
+        return self.broker.events(self.path)
+
+
+class EventSnapshot:
+    # Read-only event records for rebuilding an engine view; appends are dropped.
+    def __init__(self, path, records):
+        self.path = path
+        self._records = records
+
+    def append(self, record):
+        pass
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+    def exists(self):
+        return bool(self._records)
+
+    def records(self):
+        return self._records
+
+
+class RemoteJob:
+    # Read side of a queued job with the attributes UIs use on a local SimulationJob.
+    # refresh() reloads the job record and fetches only the event records added since
+    # the last call. Actions are held until their turn_end arrives and then folded into
+    # the engine (built once, without an LLM client), so the live view advances once
+    # per completed turn at a cost proportional to the new records.
+    typing = None
+
+    def __init__(self, broker, job_id):
+        self.broker = broker
+        self.id = job_id
+        self.engine = None
+        self.log = None
+        self.result = None
+        self._events = 0
+        self._pending = {}
+        self.refresh()
+
+    def refresh(self):
+        job = self.broker.get(self.id)
+        if job is None:
+            raise KeyError(self.id)
+        self.record = job
+        self.status = job["status"]
+        self.turn = job["turn"]
+        self.error = job["error"]
+        if self.engine is None:
+            self.engine = spec_engine(job["spec"], None)
+            self.log = ActionLog()
+        records = self.broker.events(self.id, since=self._events)
+        if records:
+            if not self._events:
+                # The run header carries the settings a resumed run was started with.
+                self.engine = SimulationEngine.resume(self.id, None, event_store=EventSnapshot(self.id, records[:1]))
+            self._fold(records)
+            self._events += len(records)
+        if self.status == "completed" and self.result is None:
+            self.result = self.engine.result()
+        return self
+
+    def _fold(self, records):
+        # Same rules as events.load_run: a resumed turn re-appends its actions, so the
+        # latest record per (turn, agent) wins.
+        for record in records:
+            kind = record.get("type")
+            if kind == "action":
+                key = (record["turn"], record["agent"])
+                self._pending.pop(key, None)
+                self._pending[key] = record
+            elif kind == "turn_end":
+                turn = record["turn"]
+                if turn <= self.engine.completed_turns:
+                    continue
+                for entry in self.engine.restore_turn(turn, [r for (t, _), r in self._pending.items() if t == turn]):
+                    self.log.append(entry)
+                self._pending = {k: r for k, r in self._pending.items() if k[0] > turn}
+                self.engine.completed_turns = turn
+                self.engine.metrics = dict(record["metrics"])
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def pause_requested(self):
+        return self.record["control"] == "pause"
+
+    @property
+    def cancel_requested(self):
+        return self.record["control"] == "cancel"
+
+    def pause(self):
+        self.broker.control(self.id, "pause")
+        self.refresh()
+
+    def resume(self):
+        self.broker.control(self.id, None)
+        self.refresh()
+
+    def cancel(self):
+        self.broker.control(self.id, "cancel")
+        self.refresh()
+
+
+class QueueClient:
+    # JobManager-style front end for a broker, used by app replicas: get() returns
+    # RemoteJobs, cached per id and refreshed on each call.
+    def __init__(self, broker):
+        self.broker = broker
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, spec, owner=None):
+        return self.get(self.broker.enqueue(spec, owner))
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            try:
+                if job is None:
+                    job = self._jobs[job_id] = RemoteJob(self.broker, job_id)
+                else:
+                    job.refresh()
+            except KeyError:
+                return None
+        return job
+
+    def queue_position(self, job):
+        return self.broker.queue_position(job.id)
+
+    def stats(self):
+        return self.broker.stats()
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+
+class CacheMiss(KeyError):
+    pass
+
+
+def completion_cache_key(model, messages, temperature=None, max_tokens=None):
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._data)}
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    # Connections are opened lazily and dropped on pickling, so one cache object
+    # can be handed to worker processes that share the same database file.
+    def __init__(self, path, max_entries=100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, accessed) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM completions WHERE key IN (SELECT key FROM completions ORDER BY accessed LIMIT ?)",
+                    (excess,)
+                )
+            conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def __len__(self):
+        return self.stats()["entries"]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class TieredCache:
+    # Memory LRU in front of a persistent backend; disk hits are promoted.
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def stats(self):
+        memory, disk = self.memory.stats(), self.disk.stats()
+        return {"hits": memory["hits"] + disk["hits"], "misses": disk["misses"],
+                "entries": disk["entries"], "memory": memory, "disk": disk}
+
+
+def cached_completion(content):
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None, cached=True)
+
+
+def cached_stream(content):
+    delta = SimpleNamespace(role="assistant", content=content)
+    yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason="stop")], cached=True)
+
+
+def recording_stream(response, cache, key):
+    # Passes chunks through and stores the text only if the stream ran to the end,
+    # so completions aborted early by the caller are never cached.
+    parts = []
+    try:
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+    finally:
+        close = getattr(response, "close", None)
+        if close:
+            close()
+    cache.set(key, "".join(parts))
+
+
+class CachedClient:
+    # Drop-in for client.chat.completions.create. With client=None every call must
+    # be served from the cache, which turns a recorded cache into an offline stand-in.
+    # Completions are stored unchecked; a caller that rejects one calls forget() with
+    # the same arguments, so a retry (or a later run) asks the model again.
+    def __init__(self, client, cache):
+        self._client = client
+        self.cache = cache
+        self.chat = self
+        self.completions = self
+
+    def create(self, model, messages, temperature=None, max_tokens=None, stream=False, **kwargs):
+        key = completion_cache_key(model, messages, temperature, max_tokens)
+        content = self.cache.get(key)
+        if content is not None:
+            return cached_stream(content) if stream else cached_completion(content)
+        if self._client is None:
+            raise CacheMiss(key)
+        if stream:
+            response = self._client.chat.completions.create(
+                model=model, messages=messages, temperature=temperature, max_tokens=max_tokens, stream=True, **kwargs
+            )
+            return recording_stream(response, self.cache, key)
+        completion = self._client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+        )
+        self.cache.set(key, completion.choices[0].message.content)
+        return completion
+
+    def forget(self, model, messages, temperature=None, max_tokens=None, **kwargs):
+        self.cache.delete(completion_cache_key(model, messages, temperature, max_tokens))
@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import sys
+
+CATALOG_VERSION = 1
+DEFAULT_CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog")
+CATALOG_EXTENSIONS = (".json", ".yaml", ".yml")
+COUNTRY_FIELDS = {"region": str, "blocs": list, "strengths": list, "weaknesses": list, "interests": list, "color": str}
+SCENARIO_FIELDS = {"description": str, "key_issues": list, "historical": str}
+
+
+def validate_entry(kind, name, entry, fields):
+    if not isinstance(entry, dict):
+        raise ValueError(f"{kind} '{name}' must be a mapping.")
+    for field, field_type in fields.items():
+        value = entry.get(field)
+        if not isinstance(value, field_type) or (field_type is list and not all(isinstance(v, str) for v in value)):
+            expected = "list of strings" if field_type is list else "string"
+            raise ValueError(f"{kind} '{name}': '{field}' must be a {expected}.")
+    if "color" in fields and not re.fullmatch(r"#[0-9A-Fa-f]{6}", entry["color"]):
+        raise ValueError(f"{kind} '{name}': color must look like '#1a2b3c'.")
+
+
+def parse_catalog_file(path):
+    # A catalog file is a mapping with a schema "version" and optional "countries" and
+    # "scenarios" mappings of name -> entry. Returns (countries, scenarios).
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+        else:
+            try:
+                import yaml
+            except ImportError as e:
+                raise ValueError("YAML catalog files require PyYAML (pip install pyyaml).") from e
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(str(e)) from e
+    if not isinstance(data, dict):
+        raise ValueError("Catalog file must contain a mapping.")
+    if data.get("version") != CATALOG_VERSION:
+        raise ValueError(f"Unsupported catalog version {data.get('version')!r} (expected {CATALOG_VERSION}).")
+    countries = data.get("countries") or {}
+    scenarios = data.get("scenarios") or {}
+    for name, entry in countries.items():
+        validate_entry("Country", name, entry, COUNTRY_FIELDS)
+    for name, entry in scenarios.items():
+        validate_entry("Scenario", name, entry, SCENARIO_FIELDS)
+    return countries, scenarios
+
+
+class Catalog:
+    # Countries and scenarios loaded from a directory of JSON (or YAML) files, merged in
+    # file-name order so later files can add or override entries. refresh() stats the
+    # files and re-parses only those whose mtime or size changed, so it is cheap enough
+    # to call on every UI rerun and its cost stays flat as the catalog grows. A file that
+    # fails validation is reported and its last good version is kept.
+    # `countries` and `scenarios` are updated in place, so the module-level
+    # COUNTRY_PROFILES / SCENARIO_DETAILS aliases always show the current catalog.
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("POLIBOT_CATALOG") or DEFAULT_CATALOG_DIR
+        self.countries = {}
+        self.scenarios = {}
+        self.by_region = {}
+        self.by_bloc = {}
+        self.errors = {}
+        self.revision = 0
+        self._files = {}
+        self.refresh()
+
+    def _catalog_files(self):
+        try:
+            names = sorted(n for n in os.listdir(self.path) if n.endswith(CATALOG_EXTENSIONS))
+        except OSError as e:
+            raise ValueError(f"Cannot read catalog directory {self.path}: {e}") from e
+        return [os.path.join(self.path, n) for n in names]
+
+    def refresh(self):
+        # Returns True when the catalog changed.
+        files = {}
+        changed = False
+        for path in self._catalog_files():
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            cached = self._files.get(path)
+            if cached and cached[0] == signature:
+                files[path] = cached
+                continue
+            changed = True
+            try:
+                files[path] = (signature, *parse_catalog_file(path))
+                self.errors.pop(path, None)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Skipping catalog file {path}: {e}", file=sys.stderr)
+                self.errors[path] = str(e)
+                files[path] = (signature, *cached[1:]) if cached else (signature, {}, {})
+        if files.keys() != self._files.keys():
+            changed = True
+        self._files = files
+        if changed:
+            self._rebuild()
+        return changed
+
+    def _rebuild(self):
+        countries, scenarios = {}, {}
+        for _, file_countries, file_scenarios in self._files.values():
+            countries.update(file_countries)
+            scenarios.update(file_scenarios)
+        if not countries or not scenarios:
+            message = f"Catalog {self.path} defines no {'countries' if not countries else 'scenarios'}."
+            if not self.revision:
+                raise ValueError(message)
+            print(f"Warning: {message} Keeping the previous catalog.", file=sys.stderr)
+            return
+        by_region, by_bloc = {}, {}
+        for name, profile in countries.items():
+            by_region.setdefault(profile["region"], []).append(name)
+            for bloc in profile["blocs"]:
+                by_bloc.setdefault(bloc, []).append(name)
+        for target, source in ((self.countries, countries), (self.scenarios, scenarios)):
+            target.clear()
+            target.update(source)
+        self.by_region, self.by_bloc = by_region, by_bloc
+        self.revision += 1
+
+    def nations(self, regions=None, blocs=None):
+        # Sorted nation names in any of `regions` and any of `blocs`; empty filters match all.
+        names = set(self.countries)
+        if regions:
+            names &= {n for region in regions for n in self.by_region.get(region, ())}
+        if blocs:
+            names &= {n for bloc in blocs for n in self.by_bloc.get(bloc, ())}
+        return sorted(names)
+
+
+CATALOG = Catalog()
+COUNTRY_PROFILES = CATALOG.countries
+SCENARIO_DETAILS = CATALOG.scenarios
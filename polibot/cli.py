@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from .agents import MODEL
+from .backends import BACKENDS, DEFAULT_LOCAL_URL, LOCAL_MODEL, create_client
+from .broker import FINISHED_STATES, job_spec, open_broker, spec_engine
+from .cache import SQLiteCache
+from .catalog import COUNTRY_PROFILES, SCENARIO_DETAILS
+from .engine import SimulationEngine, network_summary
+from .events import EventStore
+from .export import EXPORT_FORMATS, ResultExporter
+from .scheduler import RequestScheduler
+from .timing import Tracer
+
+
+def resolve_scenario(name):
+    if name in SCENARIO_DETAILS:
+        return name
+    matches = [s for s in SCENARIO_DETAILS if name.lower() in s.lower()]
+    if len(matches) != 1:
+        raise ValueError(f"Scenario '{name}' matches {len(matches)} scenarios; choose one of: {', '.join(SCENARIO_DETAILS)}")
+    return matches[0]
+
+
+def parse_agent_model(spec):
+    nation, sep, model = spec.partition("=")
+    if not sep or not nation.strip() or not model.strip():
+        raise ValueError(f"--agent-model expects NATION=MODEL, got '{spec}'.")
+    return nation.strip(), model.strip()
+
+
+def result_to_json(result):
+    data = {k: v for k, v in result.items() if k not in ("relations", "metric_series")}
+    data["metrics_history"] = result["metric_series"].as_records()
+    data["log"] = [entry.as_dict() for entry in result["log"]]
+    data["agreements"] = [entry.as_dict() for entry in result["agreements"]]
+    data["edges"] = [
+        {"source": u, "target": v, "weight": w}
+        for u, v, w in result["relations"].edges()
+    ]
+    data["summary"] = network_summary(result["relations"])
+    return data
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="polibot", description="Run a PoliBot crisis simulation without the Streamlit UI.")
+    parser.add_argument("--scenario", help="Scenario name or a unique substring of it, e.g. 'Climate'.")
+    parser.add_argument("--nations", nargs="+", default=["USA", "China", "India", "EU", "Pakistan"],
+                        help=f"Participating nations. Available: {', '.join(sorted(COUNTRY_PROFILES))}")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--severity", type=int, default=5, choices=range(1, 11), metavar="1-10")
+    parser.add_argument("--initial-peace", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--backend", choices=BACKENDS, default="groq",
+                        help="'groq' (GROQ_API_KEY), 'openai' for a local OpenAI-compatible server such as llama.cpp's llama-server or Ollama, "
+                             "'llamacpp' for in-process llama-cpp-python, or 'fake' for canned offline responses.")
+    parser.add_argument("--base-url", default=None, help=f"Server URL for --backend openai (default {DEFAULT_LOCAL_URL}).")
+    parser.add_argument("--model-path", default=None, help="GGUF model file for --backend llamacpp.")
+    parser.add_argument("--model", default=None, help=f"Model name (defaults to {MODEL} on Groq, '{LOCAL_MODEL}' otherwise).")
+    parser.add_argument("--agent-model", action="append", default=[], metavar="NATION=MODEL",
+                        help="Use a different model for one nation, e.g. 'Pakistan=llama3-8b-8192'. Repeatable.")
+    parser.add_argument("--concurrent", action="store_true", help="Send all agent prompts for a turn at once.")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="Stream completions and abort malformed responses early.")
+    parser.add_argument("--memory-tokens", type=int, default=400, help="Token budget for each agent's memory block in the prompt.")
+    parser.add_argument("--json-mode", action="store_true", help="Ask the model for JSON actions instead of the bracketed text format.")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute limit for LLM calls.")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens-per-minute limit for LLM calls (prompt estimate plus max_tokens).")
+    parser.add_argument("--max-retries", type=int, default=4, help="Retries for rate-limited, timed-out or failed LLM calls.")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-request timeout in seconds.")
+    parser.add_argument("--cache", default=None, metavar="PATH", help="SQLite file used to cache and replay agent completions.")
+    parser.add_argument("--offline", action="store_true", help="Serve every completion from --cache without calling Groq.")
+    parser.add_argument("--events", default=None, metavar="PATH", help="Append every action to this JSONL event log.")
+    parser.add_argument("--resume", default=None, metavar="PATH", help="Resume an interrupted run from its event log.")
+    parser.add_argument("--trace", default=None, metavar="PATH", help="Write per-stage timings as a Chrome trace (chrome://tracing, Perfetto).")
+    parser.add_argument("--export", default=None, metavar="DIR",
+                        help="Write actions, metric snapshots, relationship snapshots and agreements as tables under DIR while the run goes.")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, default="parquet",
+                        help="Table format for --export; Parquet needs pyarrow and falls back to CSV without it.")
+    parser.add_argument("--metrics-out", default=None, metavar="PATH",
+                        help="Write the per-action and per-turn metrics series as CSV, or Parquet if PATH ends in .parquet.")
+    parser.add_argument("--broker", default=None, metavar="URL",
+                        help="Enqueue the run on a shared job queue (sqlite:///path.db, redis://host:6379/0) and wait for a "
+                             "polibot.worker to run it. The worker's backend, cache and rate limits apply.")
+    parser.add_argument("--output", "-o", default="-", help="Path for the JSON result ('-' for stdout).")
+    return parser
+
+
+def submit_job(args):
+    local_only = [flag for flag, value in (("--resume", args.resume), ("--events", args.events), ("--trace", args.trace),
+                                           ("--cache", args.cache), ("--metrics-out", args.metrics_out),
+                                           ("--export", args.export)) if value]
+    if local_only:
+        raise ValueError(f"{', '.join(local_only)} cannot be combined with --broker.")
+    if not args.scenario:
+        raise ValueError("--scenario is required.")
+    agent_models = dict(parse_agent_model(spec) for spec in args.agent_model)
+    spec = job_spec(
+        resolve_scenario(args.scenario), args.nations, num_turns=args.turns, severity=args.severity,
+        initial_peace=args.initial_peace, seed=args.seed, response_format="json" if args.json_mode else "text",
+        model=args.model, agent_models=agent_models, concurrent=args.concurrent, max_concurrency=args.max_concurrency,
+        request_timeout=args.timeout, stream=args.stream, memory_tokens=args.memory_tokens,
+    )
+    # Builds the engine once so bad scenario or nation names fail here, not on a worker.
+    spec_engine(spec, None)
+    broker = open_broker(args.broker)
+    job_id = broker.enqueue(spec)
+    print(f"Queued job {job_id}.", file=sys.stderr)
+    return broker, job_id
+
+
+def wait_for_job(broker, job_id, poll_interval=1.0):
+    turn = 0
+    job = broker.get(job_id)
+    while job["status"] not in FINISHED_STATES:
+        if job["turn"] != turn:
+            turn = job["turn"]
+            print(f"Turn {turn}/{job['spec']['num_turns']} running on {job['worker']}.", file=sys.stderr)
+        time.sleep(poll_interval)
+        job = broker.get(job_id)
+    if job["status"] != "completed":
+        print(f"Error: Job {job_id} {job['status']}{': ' + job['error'] if job['error'] else ''}.", file=sys.stderr)
+        return None
+    return broker.result(job_id)
+
+
+def write_output(data, path):
+    if path == "-":
+        json.dump(data, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.broker:
+        try:
+            broker, job_id = submit_job(args)
+        except (ValueError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        data = wait_for_job(broker, job_id)
+        if data is None:
+            return 1
+        write_output(data, args.output)
+        return 0
+
+    try:
+        if args.offline and not args.cache:
+            raise ValueError("--offline requires --cache.")
+        cache = SQLiteCache(args.cache) if args.cache else None
+        client = None if args.offline else create_client(args.backend, base_url=args.base_url, model_path=args.model_path)
+        agent_models = dict(parse_agent_model(spec) for spec in args.agent_model)
+        tracer = Tracer() if args.trace else None
+        scheduler = RequestScheduler(args.rpm, args.tpm, max_in_flight=args.max_concurrency, max_retries=args.max_retries)
+        options = dict(
+            timer=tracer, concurrent=args.concurrent, max_concurrency=args.max_concurrency,
+            request_timeout=args.timeout, cache=cache, scheduler=scheduler, stream=args.stream,
+            memory_tokens=args.memory_tokens,
+            on_turn_end=lambda engine, turn: print(f"Turn {turn}/{engine.num_turns} complete.", file=sys.stderr),
+        )
+        if args.export:
+            # A resumed run keeps the run id of its event log, so its tables join the earlier parts.
+            log_path = args.resume or args.events
+            run_id = os.path.splitext(os.path.basename(log_path))[0] if log_path else None
+            options["exporter"] = ResultExporter(args.export, args.export_format, run_id=run_id)
+        if args.json_mode:
+            options["response_format"] = "json"
+        if args.model or args.backend != "groq":
+            options["model"] = args.model or LOCAL_MODEL
+        if agent_models:
+            options["agent_models"] = agent_models
+        if args.resume:
+            engine = SimulationEngine.resume(args.resume, client, **options)
+        else:
+            if not args.scenario:
+                raise ValueError("--scenario is required unless --resume is given.")
+            engine = SimulationEngine(
+                client, resolve_scenario(args.scenario), args.nations,
+                num_turns=args.turns, severity=args.severity, initial_peace=args.initial_peace, seed=args.seed,
+                event_store=EventStore(args.events) if args.events else None, **options
+            )
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    result = engine.run()
+    data = result_to_json(result)
+    if args.metrics_out:
+        try:
+            if args.metrics_out.endswith(".parquet"):
+                result["metric_series"].to_parquet(args.metrics_out)
+            else:
+                result["metric_series"].to_csv(args.metrics_out)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+    if tracer is not None:
+        tracer.write_chrome_trace(args.trace)
+        for stage, s in tracer.summary().items():
+            print(f"{stage:<10} n={s['count']:<5} total={s['total_ms']:9.1f}ms  p50={s['p50_ms']:8.2f}ms  p95={s['p95_ms']:8.2f}ms", file=sys.stderr)
+        print(f"Counters: {tracer.counters}", file=sys.stderr)
+    print(f"LLM calls: {scheduler.summary()}", file=sys.stderr)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}", file=sys.stderr)
+        cache.close()
+    write_output(data, args.output)
+    return 0
@@ -0,0 +1,368 @@
+import random
+from datetime import datetime
+from itertools import groupby
+
+import numpy as np
+
+from .actions import Action, ActionRecord
+from .agents import MODEL, CountryAgent, collect_turn_actions
+from .cache import CachedClient
+from .catalog import COUNTRY_PROFILES, SCENARIO_DETAILS
+from .events import EventStore, load_run
+from .impact import IMPACT_MODEL, determine_action_impact, parse_action
+from .relations import RelationshipMatrix
+from .scheduler import ScheduledClient
+from .series import MetricSeries
+from .timing import NULL_TIMER
+
+AGREEMENT_INTENTS = ["Propose a deal", "Build alliances"]
+
+
+def initial_metrics(initial_peace=0.5):
+    return {
+        "Peace Index": initial_peace, "Carbon Emissions (Gt)": 35.0,
+        "Refugee Migration (M)": 20, "Energy Stability Index": 0.6,
+        "Economic Growth (%)": 2.5
+    }
+
+
+class SimulationEngine:
+    # Runs the turn loop without any Streamlit dependency. UIs observe progress
+    # through the on_turn_start / on_action / on_turn_end callbacks.
+    def __init__(self, groq_client, scenario, nations, num_turns=10, severity=5, initial_peace=0.5, seed=None,
+                 concurrent=False, max_concurrency=4, request_timeout=None, cache=None, scheduler=None, stream=False,
+                 memory_tokens=400, metrics_capacity=1024, impact_model=None,
+                 response_format="text", model=MODEL, agent_models=None,
+                 event_store=None, exporter=None,
+                 timer=None, on_turn_start=None, on_action=None, on_turn_end=None, on_token=None):
+        if scenario not in SCENARIO_DETAILS:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        unknown = [n for n in nations if n not in COUNTRY_PROFILES]
+        if unknown:
+            raise ValueError(f"Unknown nations: {', '.join(unknown)}")
+        if len(nations) < 2:
+            raise ValueError("At least two nations are required to run a simulation.")
+        unknown = [n for n in (agent_models or {}) if n not in nations]
+        if unknown:
+            raise ValueError(f"Model overrides for nations not in the simulation: {', '.join(unknown)}")
+        if response_format not in ("text", "json"):
+            raise ValueError(f"Unknown response format: {response_format}")
+
+        self.scenario = scenario
+        self.scenario_details = SCENARIO_DETAILS[scenario]
+        self.nations = list(nations)
+        self.num_turns = num_turns
+        self.severity = severity
+        self.seed = seed
+        self.concurrent = concurrent
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.stream = stream
+        self.memory_tokens = memory_tokens
+        self.response_format = response_format
+        self.model = model
+        self.agent_models = dict(agent_models or {})
+        self.on_turn_start = on_turn_start
+        self.on_action = on_action
+        self.on_turn_end = on_turn_end
+        self.on_token = on_token
+        self.event_store = event_store
+        self.exporter = exporter
+        self.timer = timer or NULL_TIMER
+        self.completed_turns = 0
+        self.prerecorded_actions = {}
+
+        self.scheduler = scheduler
+        if scheduler is not None and groq_client is not None:
+            groq_client = ScheduledClient(groq_client, scheduler)
+        self.cache = cache
+        if cache is not None:
+            groq_client = CachedClient(groq_client, cache)
+
+        # Agent order and action impacts draw from separate streams, so the impact of the
+        # n-th action depends only on the seed and the actions before it.
+        self.rng = random.Random(seed)
+        self.impact_rng = np.random.default_rng(seed)
+        self.impact_model = impact_model or IMPACT_MODEL
+        self.agents = {name: CountryAgent(name, COUNTRY_PROFILES[name], groq_client, memory_tokens, self.agent_models.get(name, model))
+                       for name in self.nations}
+        for agent in self.agents.values():
+            agent.timer = self.timer
+            agent.json_mode = response_format == "json"
+        self.metrics_initial = initial_metrics(initial_peace)
+        self.metrics = self.metrics_initial.copy()
+        self.metrics_capacity = metrics_capacity
+        self.metric_series = MetricSeries(self.metrics, metrics_capacity)
+        self.metric_series.record(0, self.metrics, turn_end=True)
+        self.log = []
+        self.agreements = []
+        self.relations = RelationshipMatrix(self.nations)
+
+    @property
+    def graph(self):
+        return self.relations.to_graph()
+
+    def restore_turn(self, turn, records):
+        # Applies a completed turn from its action event records: the recorded metrics and
+        # relationship weights are taken as they are, without drawing impacts again.
+        turn_actions = []
+        for record in records:
+            entry = ActionRecord.from_dict(record)
+            self.log.append(entry)
+            self.metrics = dict(record["metrics"])
+            self.metric_series.record(turn, self.metrics)
+            rel_target = record.get("relationship_target")
+            if rel_target:
+                self.relations.set(record["agent"], rel_target, record["relationship_weight"])
+            if entry.intent in AGREEMENT_INTENTS and rel_target:
+                self.agreements.append(entry)
+            turn_actions.append(entry)
+        self.distribute_memories(turn, turn_actions)
+        self.metric_series.record(turn, self.metrics, turn_end=True)
+        return turn_actions
+
+    @classmethod
+    def resume(cls, path, groq_client, **kwargs):
+        # Rebuilds an interrupted run from its event log. Completed turns are replayed
+        # from the recorded actions; actions already recorded for the interrupted turn
+        # are reused instead of being requested again.
+        store = kwargs.pop("event_store", None) or EventStore(path)
+        state = load_run(store.records())
+        header = state["header"]
+        kwargs.setdefault("response_format", header.get("response_format", "text"))
+        kwargs.setdefault("model", header.get("model", MODEL))
+        kwargs.setdefault("agent_models", header.get("agent_models"))
+        engine = cls(
+            groq_client, header["scenario"], header["nations"], num_turns=header["num_turns"],
+            severity=header["severity"], initial_peace=header["metrics_initial"]["Peace Index"],
+            seed=header["seed"], event_store=store, **kwargs
+        )
+        engine.metrics_initial = header["metrics_initial"]
+        engine.metrics = engine.metrics_initial.copy()
+        engine.metric_series = MetricSeries(engine.metrics, engine.metrics_capacity)
+        engine.metric_series.record(0, engine.metrics, turn_end=True)
+
+        for turn, records in groupby(state["actions"], key=lambda r: r["turn"]):
+            engine.restore_turn(turn, records)
+
+        if state["turn_end"]:
+            engine.completed_turns = state["turn_end"]["turn"]
+            engine.metrics = dict(state["turn_end"]["metrics"])
+            version, internal, gauss_next = state["turn_end"]["rng_state"]
+            engine.rng.setstate((version, tuple(internal), gauss_next))
+            if "impact_rng_state" in state["turn_end"]:
+                engine.impact_rng.bit_generator.state = state["turn_end"]["impact_rng_state"]
+        engine.prerecorded_actions = {record["agent"]: record["raw"] for record in state["partial"]
+                                      if record["turn"] == engine.completed_turns + 1}
+        for record in state["partial"]:
+            if record["agent"] in engine.prerecorded_actions:
+                engine.agents[record["agent"]].last_prompt_tokens = record.get("prompt_tokens")
+        if engine.completed_turns < engine.num_turns:
+            store.append({"type": "resume", "from_turn": engine.completed_turns + 1,
+                          "reused_actions": len(engine.prerecorded_actions)})
+        return engine
+
+    def run(self):
+        self.start()
+        for turn in range(self.completed_turns + 1, self.num_turns + 1):
+            self.run_turn(turn)
+        return self.finish()
+
+    def start(self):
+        if self.event_store is not None and not self.event_store.exists():
+            self.event_store.append({
+                "type": "run", "scenario": self.scenario, "nations": self.nations, "num_turns": self.num_turns,
+                "severity": self.severity, "seed": self.seed, "metrics_initial": self.metrics_initial,
+                "response_format": self.response_format, "model": self.model, "agent_models": self.agent_models,
+                "started_at": datetime.now().isoformat(timespec="seconds"),
+            })
+        if self.exporter is not None:
+            self.exporter.start(self)
+
+    def finish(self):
+        if self.event_store is not None:
+            self.event_store.append({"type": "run_end", "finished_at": datetime.now().isoformat(timespec="seconds")})
+            self.event_store.close()
+        if self.exporter is not None:
+            self.exporter.close()
+        return self.result()
+
+    def run_turn(self, turn):
+        with self.timer.stage("turn", turn=turn):
+            self._run_turn(turn)
+
+    def _run_turn(self, turn):
+        if self.on_turn_start:
+            self.on_turn_start(self, turn)
+
+        agent_order = self.rng.sample(list(self.agents.keys()), len(self.agents))
+
+        prerecorded, self.prerecorded_actions = self.prerecorded_actions, {}
+        pending_agents = [name for name in agent_order if name not in prerecorded]
+
+        concurrent_actions = dict(prerecorded)
+        if self.concurrent and pending_agents:
+            concurrent_actions.update(collect_turn_actions(
+                self.agents, pending_agents, self.scenario, self.scenario_details, turn, self.nations,
+                max_workers=self.max_concurrency, timeout=self.request_timeout, stream=self.stream
+            ))
+
+        turn_actions = []
+        for agent_name in agent_order:
+            if agent_name in concurrent_actions:
+                action_raw = concurrent_actions[agent_name]
+            else:
+                action_raw = self.agents[agent_name].act(
+                    self.scenario, self.scenario_details, turn, self.nations, timeout=self.request_timeout,
+                    stream=self.stream, on_token=self._token_callback(turn)
+                )
+            entry = self.apply_action(turn, agent_name, action_raw)
+            turn_actions.append(entry)
+
+        with self.timer.stage("memory", turn=turn):
+            self.distribute_memories(turn, turn_actions)
+        self.completed_turns = turn
+        self.metric_series.record(turn, self.metrics, turn_end=True)
+
+        if self.event_store is not None:
+            version, internal, gauss_next = self.rng.getstate()
+            self.event_store.append({"type": "turn_end", "turn": turn, "metrics": self.metrics,
+                                     "rng_state": [version, list(internal), gauss_next],
+                                     "impact_rng_state": self.impact_rng.bit_generator.state})
+            self.event_store.sync()
+        if self.exporter is not None:
+            self.exporter.end_turn(turn, self.relations)
+
+        if self.on_turn_end:
+            self.on_turn_end(self, turn)
+
+    def _token_callback(self, turn):
+        # Partial fields are only reported in serial mode; concurrent agents stream
+        # on worker threads that UIs such as Streamlit cannot draw from.
+        if not (self.stream and self.on_token):
+            return None
+        return lambda agent_name, fields: self.on_token(self, turn, agent_name, fields)
+
+    def apply_action(self, turn, agent_name, action_raw):
+        with self.timer.stage("parse", turn=turn, agent=agent_name):
+            action = parse_action(action_raw, self.nations)
+
+        if not action.is_complete():
+            action = Action("Decline to act", "GLOBAL", "(Parsing Error)")
+        return self.apply_parsed_action(turn, agent_name, action, action_raw)
+
+    def apply_parsed_action(self, turn, agent_name, action, action_raw=None, timestamp=None):
+        with self.timer.stage("impact", turn=turn, agent=agent_name):
+            impact_desc, rel_change, rel_target = determine_action_impact(
+                agent_name, action.intent, action.target, action.message, self.metrics, self.nations,
+                self.scenario, severity=self.severity, rng=self.impact_rng, model=self.impact_model
+            )
+            self.metric_series.record(turn, self.metrics)
+
+        entry = ActionRecord(
+            turn, timestamp or datetime.now().strftime("%H:%M:%S"), agent_name, action.intent, action.target,
+            action.message, impact_desc, self.agents[agent_name].last_prompt_tokens
+        )
+        self.log.append(entry)
+
+        new_weight = None
+        if rel_target and rel_target != agent_name:
+            new_weight = self.relations.update(agent_name, rel_target, rel_change)
+
+        agreement = entry.intent in AGREEMENT_INTENTS and bool(rel_target)
+        if agreement:
+            self.agreements.append(entry)
+        if self.exporter is not None:
+            self.exporter.add_action(entry, self.metrics, agreement)
+
+        if self.event_store is not None:
+            self.event_store.append({
+                "type": "action", **entry.as_dict(), "raw": action_raw, "metrics": self.metrics,
+                "relationship_target": rel_target if new_weight is not None else None,
+                "relationship_weight": new_weight,
+            })
+
+        if self.on_action:
+            with self.timer.stage("on_action", turn=turn, agent=agent_name):
+                self.on_action(self, entry)
+        return entry
+
+    def replay_turn(self, turn, records):
+        # Re-applies recorded actions (ActionRecord dicts) in their recorded order instead
+        # of asking the agents, so impacts, relationships and metrics are recomputed
+        # without any LLM calls. Agent memories are not rebuilt.
+        if self.on_turn_start:
+            self.on_turn_start(self, turn)
+        for record in records:
+            agent_name = record["agent"]
+            self.agents[agent_name].last_prompt_tokens = record.get("prompt_tokens")
+            action = Action(record["intent"], record["target"], record["message"])
+            self.apply_parsed_action(turn, agent_name, action, record.get("raw"), record.get("timestamp"))
+        self.completed_turns = turn
+        self.metric_series.record(turn, self.metrics, turn_end=True)
+        if self.exporter is not None:
+            self.exporter.end_turn(turn, self.relations)
+        if self.on_turn_end:
+            self.on_turn_end(self, turn)
+
+    def distribute_memories(self, turn, turn_actions):
+        for entry in turn_actions:
+            acting_agent_name, target_name = entry.agent, entry.target
+            if acting_agent_name in self.agents:
+                self.agents[acting_agent_name].remember(entry)
+            if target_name in self.agents and target_name != acting_agent_name:
+                self.agents[target_name].remember(entry, received=True)
+
+    def result(self):
+        return {
+            "scenario": self.scenario,
+            "nations": self.nations,
+            "num_turns": self.num_turns,
+            "severity": self.severity,
+            "seed": self.seed,
+            "log": self.log,
+            "agreements": self.agreements,
+            "metrics_initial": self.metrics_initial,
+            "metrics": self.metrics,
+            "metric_series": self.metric_series,
+            "relations": self.relations,
+            "relationships": self.relations.as_dict(),
+        }
+
+
+def network_summary(relations):
+    most_active, least_active = "N/A", "N/A"
+    final_density, num_components = 0.0, 0
+
+    if len(relations) > 0:
+        most_active, least_active = relations.most_and_least_active()
+        final_density = relations.density()
+        num_components = relations.component_count()
+
+    strongest_pair_text = "N/A (No positive relationships)"
+    strongest = relations.strongest_pair(threshold=0.1)
+    if strongest:
+        strongest_pair_text = f"{strongest[0]} ↔ {strongest[1]} (Weight: {strongest[2]:.2f})"
+
+    return {
+        "most_active": most_active,
+        "least_active": least_active,
+        "density": final_density,
+        "components": num_components,
+        "strongest_pair": strongest_pair_text,
+    }
+
+
+def transcript_text(result, generated_at=None):
+    generated_at = generated_at or datetime.now()
+    transcript_data = f"PoliBot Agents Simulation Transcript\nScenario: {result['scenario']}\nTurns: {result['num_turns']}\nNations: {', '.join(result['nations'])}\nDate: {generated_at.strftime('%Y-%m-%d %H:%M')}\n\n---\n\nAGENT ACTION LOG (Newest First):\n\n"
+    plain_log_entries = []
+    for entry in reversed(result["log"]):
+        plain_log_entries.append(
+            f"Turn {entry.turn} • {entry.timestamp} • {entry.agent}\n"
+            f"Intent: {entry.intent} | Target: {entry.target}\n"
+            f"Message: \"{entry.message}\"\n"
+            f"Impact: {entry.impact}"
+        )
+    transcript_data += "\n\n---\n\n".join(plain_log_entries)
+    return transcript_data
@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+
+
+class EventStore:
+    # Append-only JSONL log of a simulation run. Every record is flushed to the OS on
+    # write; fsync is batched every `fsync_every` records and forced at turn ends.
+    def __init__(self, path, fsync_every=20):
+        self.path = path
+        self.fsync_every = fsync_every
+        self._file = None
+        self._pending = 0
+
+    def _handle(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def append(self, record):
+        f = self._handle()
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave one truncated trailing line.
+                    print(f"Warning: Skipping unreadable event in {self.path}: {line[:80]}", file=sys.stderr)
+        return records
+
+
+def load_run(records):
+    # Folds the event stream into the state needed to resume: the run header, the
+    # action records of every completed turn, the last turn_end record and any actions
+    # already recorded for the turn that was interrupted. A resumed turn re-appends its
+    # actions, so only the latest record per (turn, agent) is kept, in apply order.
+    header = None
+    completed = []
+    pending = {}
+    last_turn_end = None
+    for record in records:
+        kind = record.get("type")
+        if kind == "run" and header is None:
+            header = record
+        elif kind == "action":
+            key = (record["turn"], record["agent"])
+            pending.pop(key, None)
+            pending[key] = record
+        elif kind == "turn_end":
+            completed.extend(r for (turn, _), r in pending.items() if turn == record["turn"])
+            pending = {k: r for k, r in pending.items() if k[0] > record["turn"]}
+            last_turn_end = record
+    if header is None:
+        raise ValueError("Event log has no run header.")
+    return {"header": header, "actions": completed, "turn_end": last_turn_end, "partial": list(pending.values()),
+            "finished": any(r.get("type") == "run_end" for r in records)}
+
+
+def run_status(path):
+    try:
+        state = load_run(EventStore(path).records())
+    except (ValueError, OSError):
+        return None
+    header = state["header"]
+    return {
+        "path": path,
+        "scenario": header["scenario"],
+        "nations": header["nations"],
+        "num_turns": header["num_turns"],
+        "completed_turns": state["turn_end"]["turn"] if state["turn_end"] else 0,
+        "finished": state["finished"],
+    }
@@ -0,0 +1,159 @@
+import csv
+import os
+import sys
+import uuid
+
+import numpy as np
+
+EXPORT_FORMATS = ("parquet", "csv")
+EXPORT_TABLES = ("actions", "metrics", "relations", "agreements")
+ACTION_COLUMNS = [("run_id", "string"), ("seq", "int64"), ("turn", "int32"), ("timestamp", "string"), ("agent", "string"),
+                  ("intent", "string"), ("target", "string"), ("message", "string"), ("impact", "string"), ("prompt_tokens", "int64")]
+# Followed by one float64 column per metric.
+METRIC_COLUMNS = [("run_id", "string"), ("seq", "int64"), ("turn", "int32"), ("agent", "string")]
+RELATION_COLUMNS = [("run_id", "string"), ("turn", "int32"), ("source", "string"), ("target", "string"),
+                    ("weight", "float64"), ("linked", "bool_")]
+AGREEMENT_COLUMNS = [("run_id", "string"), ("seq", "int64"), ("turn", "int32"), ("agent", "string"), ("target", "string"),
+                     ("intent", "string"), ("message", "string")]
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return False
+    return True
+
+
+class TableWriter:
+    # One table of one export session: rows are buffered column-wise and each flush()
+    # writes only the buffered rows. In Parquet every flush is a complete part file of
+    # its own, <run_id>-<turn>.parquet, written under a hidden name and renamed into
+    # place, so a killed run leaves only readable parts. CSV rows are appended to one
+    # <run_id>-<first turn>.csv file per session.
+    def __init__(self, directory, run_id, columns, fmt, first_turn=1):
+        self.directory = directory
+        self.run_id = run_id
+        self.columns = columns
+        self.format = fmt
+        self.first_turn = first_turn
+        self.buffer = {name: [] for name, _ in columns}
+        self.rows = 0
+        self.parts = 0
+        self._writer = None
+        self._file = None
+
+    def append(self, row):
+        for name, values in self.buffer.items():
+            values.append(row.get(name))
+
+    def extend(self, columns):
+        for name, values in self.buffer.items():
+            values.extend(columns[name])
+
+    def pending(self):
+        return len(next(iter(self.buffer.values())))
+
+    def flush(self, turn, force=False):
+        count = self.pending()
+        if not count and not force:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in self.columns])
+            name = f"{self.run_id}-{turn:04d}.parquet"
+            temp = os.path.join(self.directory, f".{name}.tmp")
+            pq.write_table(pa.table(self.buffer, schema=schema), temp)
+            os.replace(temp, os.path.join(self.directory, name))
+            self.parts += 1
+        else:
+            if self._file is None:
+                path = os.path.join(self.directory, f"{self.run_id}-{self.first_turn:04d}.csv")
+                self._file = open(path, "w", newline="", encoding="utf-8")
+                self._writer = csv.writer(self._file)
+                self._writer.writerow([name for name, _ in self.columns])
+            self._writer.writerows(zip(*self.buffer.values()))
+            self._file.flush()
+            self.parts = 1
+        self.rows += count
+        for values in self.buffer.values():
+            values.clear()
+
+    def discard(self):
+        for values in self.buffer.values():
+            values.clear()
+
+    def close(self):
+        # A table that never got a row is still written, with its columns only.
+        if not self.parts:
+            self.flush(self.first_turn, force=True)
+        if self._file is not None:
+            self._file.close()
+        self._writer = self._file = None
+
+
+class ResultExporter:
+    # Columnar export of a run, written while it runs. Each table goes under
+    # <directory>/<table>/ (see TableWriter for file names): actions, a metrics snapshot
+    # after every action (seq 0 is the initial state), the relationship matrix at every
+    # turn end (one row per nation pair) and agreements. Rows are buffered and written at
+    # each turn end, so exporting costs the turn's new rows rather than a re-serialisation
+    # of the whole run, and every finished turn is on disk and readable even if the run
+    # is killed. Rows of a turn that never finishes are dropped, matching what a resumed
+    # run replays; a resumed run writes new part files next to the old ones, so a table
+    # directory reads as one dataset.
+    def __init__(self, directory, fmt="parquet", run_id=None):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        if fmt == "parquet" and not parquet_available():
+            print("Warning: Parquet export requires pyarrow (pip install pyarrow); exporting CSV instead.", file=sys.stderr)
+            fmt = "csv"
+        self.directory = directory
+        self.format = fmt
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.tables = {}
+        self.seq = 0
+        self._nations = None
+        self._metric_names = None
+
+    def start(self, engine):
+        if self.tables:
+            return
+        self._nations = list(engine.nations)
+        self._metric_names = list(engine.metrics_initial)
+        columns = {"actions": ACTION_COLUMNS, "relations": RELATION_COLUMNS, "agreements": AGREEMENT_COLUMNS,
+                   "metrics": METRIC_COLUMNS + [(name, "float64") for name in self._metric_names]}
+        self.tables = {table: TableWriter(os.path.join(self.directory, table), self.run_id, columns[table], self.format,
+                                          first_turn=engine.completed_turns + 1)
+                       for table in EXPORT_TABLES}
+        self.seq = len(engine.log)
+        if not engine.completed_turns:
+            self.tables["metrics"].append({"run_id": self.run_id, "seq": 0, "turn": 0, **engine.metrics_initial})
+
+    def add_action(self, entry, metrics, agreement=False):
+        self.seq += 1
+        row = {"run_id": self.run_id, "seq": self.seq, **entry.as_dict()}
+        self.tables["actions"].append(row)
+        self.tables["metrics"].append({**row, **{name: metrics[name] for name in self._metric_names}})
+        if agreement:
+            self.tables["agreements"].append(row)
+
+    def end_turn(self, turn, relations):
+        i, j = np.triu_indices(len(self._nations), k=1)
+        names = np.array(self._nations, dtype=object)
+        self.tables["relations"].extend({
+            "run_id": [self.run_id] * len(i), "turn": [turn] * len(i), "source": names[i].tolist(),
+            "target": names[j].tolist(), "weight": relations.weights[i, j].tolist(), "linked": relations.linked[i, j].tolist(),
+        })
+        for table in self.tables.values():
+            table.flush(turn)
+
+    def close(self):
+        for table in self.tables.values():
+            table.discard()
+            table.close()
+
+    def stats(self):
+        return {table: writer.rows for table, writer in self.tables.items()}
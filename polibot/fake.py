@@ -0,0 +1,197 @@
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from .impact import VALID_INTENTS
+
+TARGETS_PATTERN = re.compile(r"Choose one specific country from: (.*)")
+
+
+class FakeGroqClient:
+    # Local stand-in for groq.Groq. Responses are either cycled from `responses` or
+    # generated from a template, deterministically from the prompt text and seed.
+    # `latency` seconds are slept per call to emulate network round-trips. Calls are
+    # numbered under a lock, so threads sharing a client take scripted responses in
+    # call order.
+    def __init__(self, latency=0.0, responses=None, seed=0, chunk_size=8):
+        self.latency = latency
+        self.responses = list(responses) if responses else None
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = self
+        self.completions = self
+        self.models = SimpleNamespace(list=lambda: [SimpleNamespace(id="fake-model")])
+
+    def respond(self, prompt, json_mode=False, call=0):
+        if self.responses:
+            return self.responses[call % len(self.responses)]
+        digest = zlib.crc32(prompt.encode("utf-8")) ^ self.seed
+        match = TARGETS_PATTERN.search(prompt)
+        targets = match.group(1).split(", ") if match else ["GLOBAL"]
+        intent = VALID_INTENTS[digest % len(VALID_INTENTS)]
+        target = targets[(digest >> 8) % len(targets)]
+        message = f"We call on {target} to act on this crisis together. Proposal ref {digest % 10000}."
+        if json_mode:
+            return json.dumps({"intent": intent, "target": target, "message": message})
+        return f"[Intent]: {intent}\n[Target]: {target}\n[Message]: {message}"
+
+    def create(self, model, messages, stream=False, **kwargs):
+        prompt = "\n".join(m["content"] for m in messages)
+        response_format = kwargs.get("response_format") or {}
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+        content = self.respond(prompt, json_mode=response_format.get("type") == "json_object", call=call)
+        if self.latency:
+            time.sleep(self.latency)
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4,
+                                total_tokens=(len(prompt) + len(content)) // 4)
+        if stream:
+            return self._stream(content)
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage, model=model)
+
+    def _stream(self, content):
+        for i in range(0, len(content), self.chunk_size):
+            delta = SimpleNamespace(content=content[i:i + self.chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+
+
+class FakeGroqServer:
+    # OpenAI-compatible HTTP endpoint (POST /openai/v1/chat/completions) backed by
+    # FakeGroqClient, for exercising the real groq SDK and the request scheduler. A
+    # seeded `error_rate` fraction of requests is answered with 429 and a Retry-After
+    # header; `latency` seconds are slept per request.
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, retry_after=1.0, seed=0, responses=None):
+        self.client = FakeGroqClient(responses=responses, seed=seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-groq-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_throttle(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            throttle = self._rng.random() < self.error_rate
+            if throttle:
+                self.stats["throttled"] += 1
+            return throttle
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=()):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "polibot"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "Not found"}})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if server.latency:
+                    time.sleep(server.latency)
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+                if server._should_throttle():
+                    self._send_json(429, {"error": {"message": "Rate limit reached (fake server).", "type": "tokens", "code": "rate_limit_exceeded"}},
+                                    headers=[("retry-after", str(server.retry_after))])
+                    return
+                with server._lock:
+                    completion = server.client.create(**request)
+                if request.get("stream"):
+                    self._send_stream(request, completion)
+                else:
+                    self._send_json(200, {
+                        "id": f"chatcmpl-fake-{server.client.calls}", "object": "chat.completion", "created": int(time.time()),
+                        "model": request.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": completion.choices[0].message.content},
+                                     "finish_reason": "stop", "logprobs": None}],
+                        "usage": vars(completion.usage),
+                    })
+
+            def _send_stream(self, request, chunks):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for chunk in chunks:
+                    payload = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                               "model": request.get("model"),
+                               "choices": [{"index": 0, "delta": {"content": chunk.choices[0].delta.content}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="polibot.fake", description="Serve a local fake Groq endpoint. Point GROQ_BASE_URL at it.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds slept per request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After value sent with each 429, in seconds.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    server = FakeGroqServer(args.host, args.port, latency=args.latency, error_rate=args.error_rate,
+                            retry_after=args.retry_after, seed=args.seed)
+    print(f"Fake Groq server listening on {server.url} (GROQ_BASE_URL={server.url})", file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
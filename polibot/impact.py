@@ -0,0 +1,288 @@
+import json
+import math
+import re
+import sys
+
+import numpy as np
+
+from .actions import Action
+
+VALID_INTENTS = ["Propose a deal", "Respond", "Comment", "Build alliances",
+                 "Request assistance", "Raise a global concern", "Decline to act"]
+
+
+def canonical_intent(intent):
+    # Models often echo the numbered menu entry, e.g. "1. Propose a deal (Offer ...)".
+    cleaned = re.sub(r"^\d+[.)]\s*", "", intent).split("(")[0].strip().rstrip(".")
+    for valid in VALID_INTENTS:
+        if cleaned.lower() == valid.lower():
+            return valid
+    return intent
+
+
+def canonical_target(target, nations):
+    cleaned = target.strip().strip("'\"*").rstrip(".").strip()
+    for name in list(nations) + ["GLOBAL"]:
+        if cleaned.lower() == name.lower():
+            return name
+    return cleaned
+
+
+def parse_json_action(action_text):
+    text = action_text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    fields = {k.lower(): v for k, v in data.items()}
+    return Action(*(str(fields[k]).strip() if fields.get(k) else None for k in ("intent", "target", "message")))
+
+
+def parse_action(action_text, nations=None):
+    action = None
+    try:
+        if action_text.lstrip().startswith(("{", "```")):
+            action = parse_json_action(action_text)
+        if action is None:
+            action = Action()
+            intent_match = re.search(r"\[Intent\]:\s*(.*)", action_text, re.IGNORECASE)
+            target_match = re.search(r"\[Target\]:\s*(.*)", action_text, re.IGNORECASE)
+            message_match = re.search(r"\[Message\]:\s*(.*)", action_text, re.IGNORECASE | re.DOTALL)
+
+            if intent_match:
+                action.intent = intent_match.group(1).strip()
+            if target_match:
+                action.target = target_match.group(1).strip()
+            if message_match:
+                action.message = message_match.group(1).strip()
+
+        if action.intent:
+            action.intent = canonical_intent(action.intent)
+        if action.target and nations is not None:
+            action.target = canonical_target(action.target, nations)
+
+        if action.intent not in VALID_INTENTS:
+             print(f"Warning: Invalid intent parsed: '{action.intent}'", file=sys.stderr)
+
+        return action
+
+    except Exception as e:
+        print(f"Error parsing action text: {e}\nRaw text: {action_text}", file=sys.stderr)
+        return Action()
+
+
+IMPACT_METRICS = ["Peace Index", "Carbon Emissions (Gt)", "Refugee Migration (M)",
+                  "Energy Stability Index", "Economic Growth (%)"]
+METRIC_DEFAULTS = [0.5, 35.0, 20, 0.6, 2.5]
+
+# Per-intent effects. "peace" and "relationship" are uniform ranges for the change of the
+# Peace Index and of the weight toward a targeted nation; the peace change is scaled by
+# the remaining headroom (1.1 - peace) or by the crisis severity (1 + severity / 10).
+# "emissions", "energy" and "growth" are fixed shifts added to those metrics' changes, and
+# "refugees" an integer range for the change in refugees (millions), doubled when peace
+# is above 0.6 ("calm") or below 0.4 ("tense").
+INTENT_EFFECTS = {
+    "Propose a deal": {"peace": (0.005, 0.015), "peace_scale": "headroom", "relationship": (0.05, 0.15),
+                       "emissions": -0.05, "energy": 0.02, "refugees": (-2, 0), "refugee_boost": "calm", "growth": 0.05},
+    "Respond": {"peace": (-0.01, 0.01), "relationship": (-0.05, 0.05), "refugees": (-1, 1)},
+    "Comment": {"peace": (-0.005, 0.005), "refugees": (-1, 1)},
+    "Build alliances": {"peace": (0.01, 0.02), "peace_scale": "headroom", "relationship": (0.1, 0.2),
+                        "emissions": -0.05, "energy": 0.02, "refugees": (-2, 0), "refugee_boost": "calm", "growth": 0.05},
+    "Request assistance": {"peace": (-0.015, -0.005), "peace_scale": "severity", "relationship": (-0.05, 0.02),
+                           "emissions": 0.05, "energy": -0.02, "refugees": (0, 1), "refugee_boost": "tense", "growth": -0.03},
+    "Raise a global concern": {"peace": (-0.02, 0.005), "peace_scale": "severity",
+                               "emissions": 0.05, "energy": -0.02, "refugees": (0, 1), "refugee_boost": "tense", "growth": -0.03},
+    "Decline to act": {"refugees": (-1, 1)},
+}
+UNKNOWN_INTENT_EFFECTS = {"peace": (-0.01, 0.01), "refugees": (-1, 1)}
+
+# How the other metrics follow the Peace Index after each action: a uniform random drift
+# plus `coupling` * (peace - pivot), kept within `bounds`. Emissions, energy and refugees
+# only move in scenarios whose name contains their keyword (the first match wins);
+# growth always moves and is also dragged down by severity.
+SCENARIO_METRICS = {"Climate": "Carbon Emissions (Gt)", "Energy": "Energy Stability Index", "Refugee": "Refugee Migration (M)"}
+METRIC_DYNAMICS = {
+    "Carbon Emissions (Gt)": {"drift": (-0.05, 0.3), "pivot": 0.55, "coupling": -0.3, "bounds": (10.0, np.inf)},
+    "Energy Stability Index": {"drift": (-0.02, 0.02), "pivot": 0.5, "coupling": 0.04, "bounds": (0.1, 0.9)},
+    "Refugee Migration (M)": {"bounds": (0.0, np.inf)},
+    "Economic Growth (%)": {"drift": (-0.08, 0.08), "pivot": 0.55, "coupling": 0.25, "severity_drag": 0.1, "bounds": (-15.0, np.inf)},
+}
+PEACE_BOUNDS = (0.05, 0.95)
+PEACE_SCALES = [None, "headroom", "severity"]
+REFUGEE_BOOSTS = [None, "calm", "tense"]
+# Uniform draws per action: peace, relationship, scenario metric, growth.
+IMPACT_DRAWS = 4
+
+IMPACT_DESCRIPTIONS = {
+    "Propose a deal": ("{agent} proposed a deal to {target}.", " Potential for mutual benefit.", " Global cooperation suggested."),
+    "Respond": ("{agent} responded regarding {target}.", " Dialogue continues.", ""),
+    "Comment": ("{agent} commented on the situation regarding {target}.", "", ""),
+    "Build alliances": ("{agent} seeks to build an alliance with {target}.", " Strengthening ties.", " Promoting general cooperation."),
+    "Request assistance": ("{agent} requested assistance from {target}.", " Seeking support.", " Highlighting global need."),
+    "Raise a global concern": ("{agent} raised a global concern.", "", ""),
+    "Decline to act": ("{agent} chose to observe this turn.", "", ""),
+}
+
+
+def scenario_kind(scenario):
+    # Index into SCENARIO_METRICS of the scenario's driven metric, or -1.
+    for i, keyword in enumerate(SCENARIO_METRICS):
+        if keyword in scenario:
+            return i
+    return -1
+
+
+def metrics_array(metrics):
+    return np.array([metrics.get(name, default) for name, default in zip(IMPACT_METRICS, METRIC_DEFAULTS)], dtype=np.float64)
+
+
+class ImpactModel:
+    # INTENT_EFFECTS and METRIC_DYNAMICS compiled to arrays, one row per intent plus a
+    # last row for unrecognised intents. step() applies one action to each of N
+    # simulations at once; apply() is the same arithmetic on plain floats for a single
+    # simulation, where NumPy's per-call overhead would dominate, and gives identical
+    # numbers for the same draws. Pass edited tables to score runs under another model.
+    def __init__(self, intent_effects=INTENT_EFFECTS, unknown_effects=UNKNOWN_INTENT_EFFECTS, dynamics=METRIC_DYNAMICS):
+        self.intents = list(intent_effects)
+        self.index = {intent: i for i, intent in enumerate(self.intents)}
+        rows = [intent_effects[intent] for intent in self.intents] + [unknown_effects]
+        self.peace = np.array([r.get("peace", (0.0, 0.0)) for r in rows], dtype=np.float64)
+        self.peace_scale = np.array([PEACE_SCALES.index(r.get("peace_scale")) for r in rows])
+        self.relationship = np.array([r.get("relationship", (0.0, 0.0)) for r in rows], dtype=np.float64)
+        self.shifts = np.array([[r.get(k, 0.0) for k in ("emissions", "energy", "growth")] for r in rows], dtype=np.float64)
+        self.refugees = np.array([r.get("refugees", (0, 0)) for r in rows], dtype=np.float64)
+        self.refugee_boost = np.array([REFUGEE_BOOSTS.index(r.get("refugee_boost")) for r in rows])
+        self.dynamics = dynamics
+        self._rows = list(zip(self.peace.tolist(), self.peace_scale.tolist(), self.relationship.tolist(),
+                              self.shifts.tolist(), self.refugees.tolist(), self.refugee_boost.tolist()))
+
+    def intent_index(self, intents):
+        unknown = len(self.intents)
+        return np.array([self.index.get(intent, unknown) for intent in intents], dtype=np.intp)
+
+    def step(self, state, intents, targeted, draws, kinds, severity):
+        # state: (N, len(IMPACT_METRICS)); intents: intent rows; targeted: the action
+        # names a nation; draws: (N, IMPACT_DRAWS) uniforms in [0, 1); kinds: scenario_kind
+        # per simulation; severity: 1-10. Returns the new state and relationship changes.
+        peace = state[:, 0]
+        severity_factor = np.asarray(severity, dtype=np.float64) / 10.0
+        low, high = self.peace[intents, 0], self.peace[intents, 1]
+        scale_kind = self.peace_scale[intents]
+        scale = np.where(scale_kind == 1, 1.1 - peace, np.where(scale_kind == 2, 1 + severity_factor, 1.0))
+        peace = np.clip(peace + (low + draws[:, 0] * (high - low)) * scale, *PEACE_BOUNDS)
+
+        low, high = self.relationship[intents, 0], self.relationship[intents, 1]
+        relationship = np.where(targeted, low + draws[:, 1] * (high - low), 0.0)
+
+        new_state = state.copy()
+        new_state[:, 0] = peace
+        shifts = self.shifts[intents]
+        for column, kind, shift in ((1, 0, shifts[:, 0]), (3, 1, shifts[:, 1])):
+            d = self.dynamics[IMPACT_METRICS[column]]
+            drift = d["drift"][0] + draws[:, 2] * (d["drift"][1] - d["drift"][0])
+            moved = np.clip(state[:, column] + drift + (peace - d["pivot"]) * d["coupling"] + shift, *d["bounds"])
+            new_state[:, column] = np.where(kinds == kind, moved, state[:, column])
+
+        low, high = self.refugees[intents, 0], self.refugees[intents, 1]
+        boost_kind = self.refugee_boost[intents]
+        boost = 1 + ((boost_kind == 1) & (peace > 0.6)) + ((boost_kind == 2) & (peace < 0.4))
+        change = np.floor(low + draws[:, 2] * (high - low + 1)) * boost
+        moved = np.clip(state[:, 2] + change, *self.dynamics["Refugee Migration (M)"]["bounds"])
+        new_state[:, 2] = np.where(kinds == 2, moved, state[:, 2])
+
+        d = self.dynamics["Economic Growth (%)"]
+        drift = d["drift"][0] + draws[:, 3] * (d["drift"][1] - d["drift"][0])
+        growth = (peace - d["pivot"]) * d["coupling"] - severity_factor * d["severity_drag"] + shifts[:, 2] + drift
+        new_state[:, 4] = np.round(np.clip(state[:, 4] + growth, *d["bounds"]), 1)
+        return new_state, relationship
+
+    def apply(self, values, intent, targeted, draws, kind, severity):
+        # step() for one simulation: `values` in IMPACT_METRICS order, `intent` a row index.
+        (low, high), scale_kind, (rel_low, rel_high), shifts, (ref_low, ref_high), boost_kind = self._rows[intent]
+        values = list(values)
+        severity_factor = severity / 10.0
+        scale = 1.1 - values[0] if scale_kind == 1 else 1 + severity_factor if scale_kind == 2 else 1.0
+        peace = min(max(values[0] + (low + draws[0] * (high - low)) * scale, PEACE_BOUNDS[0]), PEACE_BOUNDS[1])
+        relationship = rel_low + draws[1] * (rel_high - rel_low) if targeted else 0.0
+
+        if kind in (0, 1):
+            column = 1 if kind == 0 else 3
+            d = self.dynamics[IMPACT_METRICS[column]]
+            drift = d["drift"][0] + draws[2] * (d["drift"][1] - d["drift"][0])
+            moved = values[column] + drift + (peace - d["pivot"]) * d["coupling"] + shifts[kind]
+            values[column] = min(max(moved, d["bounds"][0]), d["bounds"][1])
+        elif kind == 2:
+            boost = 1 + (boost_kind == 1 and peace > 0.6) + (boost_kind == 2 and peace < 0.4)
+            change = math.floor(ref_low + draws[2] * (ref_high - ref_low + 1)) * boost
+            lower, upper = self.dynamics["Refugee Migration (M)"]["bounds"]
+            values[2] = min(max(values[2] + change, lower), upper)
+
+        d = self.dynamics["Economic Growth (%)"]
+        drift = d["drift"][0] + draws[3] * (d["drift"][1] - d["drift"][0])
+        growth = (peace - d["pivot"]) * d["coupling"] - severity_factor * d["severity_drag"] + shifts[2] + drift
+        # np.round(x, 1) is rint(x * 10) / 10.
+        values[4] = round(min(max(values[4] + growth, d["bounds"][0]), d["bounds"][1]) * 10) / 10
+        values[0] = peace
+        return values, relationship
+
+
+IMPACT_MODEL = ImpactModel()
+
+
+def load_impact_model(path):
+    # An impact model file is a JSON mapping with optional "intent_effects",
+    # "unknown_effects" and "dynamics" mappings laid out like INTENT_EFFECTS /
+    # METRIC_DYNAMICS. Each intent or metric entry given is merged over the default one,
+    # so a file only lists what it changes; a null bound means unbounded.
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("Impact model file must contain a mapping.")
+    unknown = set(data) - {"intent_effects", "unknown_effects", "dynamics"}
+    if unknown:
+        raise ValueError(f"Unknown impact model keys: {', '.join(sorted(unknown))}")
+    intent_effects = {intent: dict(effects) for intent, effects in INTENT_EFFECTS.items()}
+    for intent, effects in (data.get("intent_effects") or {}).items():
+        intent_effects.setdefault(intent, {}).update(effects)
+    unknown_effects = {**UNKNOWN_INTENT_EFFECTS, **(data.get("unknown_effects") or {})}
+    dynamics = {name: dict(d) for name, d in METRIC_DYNAMICS.items()}
+    for name, d in (data.get("dynamics") or {}).items():
+        if name not in dynamics:
+            raise ValueError(f"No dynamics for metric '{name}'; choose one of: {', '.join(dynamics)}")
+        if "bounds" in d:
+            d = {**d, "bounds": tuple(-np.inf if i == 0 and b is None else np.inf if b is None else b
+                                      for i, b in enumerate(d["bounds"]))}
+        dynamics[name].update(d)
+    for effects in [*intent_effects.values(), unknown_effects]:
+        if effects.get("peace_scale") not in PEACE_SCALES:
+            raise ValueError(f"peace_scale must be one of {PEACE_SCALES[1:]} or null.")
+        if effects.get("refugee_boost") not in REFUGEE_BOOSTS:
+            raise ValueError(f"refugee_boost must be one of {REFUGEE_BOOSTS[1:]} or null.")
+    return ImpactModel(intent_effects, unknown_effects, dynamics)
+
+
+def impact_description(agent_name, intent, target, targeted):
+    if intent not in IMPACT_DESCRIPTIONS:
+        return f"{agent_name} took an unrecognized action ({intent})."
+    text, targeted_suffix, global_suffix = IMPACT_DESCRIPTIONS[intent]
+    return text.format(agent=agent_name, target=target) + (targeted_suffix if targeted else global_suffix)
+
+
+def determine_action_impact(agent_name, intent, target, message, metrics, all_nations, scenario, severity=5, rng=None, model=IMPACT_MODEL):
+    # Applies one action to `metrics` in place. `rng` is a NumPy Generator; pass the
+    # simulation's own one for reproducible runs.
+    rng = rng if rng is not None else np.random.default_rng()
+    target_for_relation_change = target if target and target != "GLOBAL" and target in all_nations else None
+    values, relationship = model.apply(
+        [metrics.get(name, default) for name, default in zip(IMPACT_METRICS, METRIC_DEFAULTS)],
+        model.index.get(intent, len(model.intents)), target_for_relation_change is not None,
+        rng.random(IMPACT_DRAWS).tolist(), scenario_kind(scenario), severity
+    )
+    for name, value in zip(IMPACT_METRICS, values):
+        metrics[name] = int(value) if name == "Refugee Migration (M)" else value
+    return (impact_description(agent_name, intent, target, target_for_relation_change is not None),
+            relationship, target_for_relation_change)
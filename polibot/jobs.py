@@ -0,0 +1,169 @@
+import itertools
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .actions import ActionLog
+
+FINISHED_STATES = ("completed", "cancelled", "failed")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class SimulationJob:
+    # One simulation run on a JobManager worker thread. The job hooks the engine's
+    # callbacks (chaining any that were already set) to publish progress that UIs poll:
+    # status, current turn, the ActionLog and the response being streamed. Pause and
+    # cancel requests take effect between actions; `delay` seconds are waited after
+    # each action, and a cancel request interrupts the wait.
+    def __init__(self, job_id, engine, owner=None, delay=0.0):
+        self.id = job_id
+        self.engine = engine
+        self.owner = owner
+        self.delay = delay
+        self.status = "queued"
+        self.turn = engine.completed_turns
+        self.log = ActionLog(engine.log)
+        self.typing = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancel = threading.Event()
+        self._callbacks = (engine.on_turn_start, engine.on_action, engine.on_token)
+        engine.on_turn_start = self._on_turn_start
+        engine.on_action = self._on_action
+        engine.on_token = self._on_token
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def pause_requested(self):
+        return not self._resume.is_set()
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def cancel(self):
+        self._cancel.set()
+        self._resume.set()
+
+    def _checkpoint(self):
+        if not self._resume.is_set():
+            self.status = "paused"
+            self._resume.wait()
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.status = "running"
+
+    def _on_turn_start(self, engine, turn):
+        self.turn = turn
+        self._checkpoint()
+        if self._callbacks[0]:
+            self._callbacks[0](engine, turn)
+
+    def _on_action(self, engine, entry):
+        self.log.append(entry)
+        self.typing = None
+        if self._callbacks[1]:
+            self._callbacks[1](engine, entry)
+        if self.delay:
+            self._cancel.wait(self.delay)
+        self._checkpoint()
+
+    def _on_token(self, engine, turn, agent_name, fields):
+        self.typing = (turn, agent_name, dict(fields))
+        if self._callbacks[2]:
+            self._callbacks[2](engine, turn, agent_name, fields)
+
+    def run(self):
+        if self._cancel.is_set():
+            self.status = "cancelled"
+            self.finished_at = time.time()
+            return
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            self.result = self.engine.run()
+            self.status = "completed"
+        except JobCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            print(f"Error in simulation job {self.id}: {e}", file=sys.stderr)
+            traceback.print_exc()
+            self.error = e
+            self.status = "failed"
+        finally:
+            self.typing = None
+            self.finished_at = time.time()
+            # A cancelled or failed run keeps its event log open-ended, so it can be resumed.
+            if self.status != "completed" and self.engine.event_store is not None:
+                self.engine.event_store.close()
+            if self.status != "completed" and self.engine.exporter is not None:
+                self.engine.exporter.close()
+
+
+class JobManager:
+    # Worker threads shared by every session of a server process. Agent turns are
+    # dominated by waiting on the LLM, so threads are enough; jobs beyond `max_workers`
+    # wait in the pool's queue. The newest `keep_finished` finished jobs are kept for
+    # their owners to collect.
+    def __init__(self, max_workers=8, keep_finished=100):
+        self.max_workers = max_workers
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="polibot-job")
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, engine, owner=None, delay=0.0):
+        with self._lock:
+            job = SimulationJob(f"job-{next(self._ids)}", engine, owner, delay)
+            self._jobs[job.id] = job
+            finished = [j.id for j in self._jobs.values() if j.done]
+            for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+                del self._jobs[job_id]
+        self._executor.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def queue_position(self, job):
+        # 1-based position among jobs still waiting for a worker, or 0 once started.
+        if job.status != "queued":
+            return 0
+        with self._lock:
+            queued = [j for j in self._jobs.values() if j.status == "queued" and not j.cancel_requested]
+        return queued.index(job) + 1 if job in queued else 0
+
+    def stats(self):
+        counts = {}
+        for job in self.jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def shutdown(self, wait=True):
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,110 @@
+from collections import Counter, deque
+
+from .prompts import estimate_tokens
+
+LEDGER_INTENTS = [("Propose a deal", "deals"), ("Build alliances", "alliances"),
+                  ("Request assistance", "requests"), ("Respond", "responses")]
+
+
+class AgentMemory:
+    # Per-agent memory with a fixed token budget. The last `recent_size` events are kept
+    # verbatim in a ring buffer; events falling out of it are folded into a rolling
+    # summary of intent counts, and every exchange with another nation also updates a
+    # per-counterpart ledger, so long runs keep their context at a bounded prompt size.
+    def __init__(self, name, token_budget=400, recent_size=5, message_chars=160):
+        self.name = name
+        self.token_budget = token_budget
+        self.message_chars = message_chars
+        self.recent = deque(maxlen=recent_size)
+        self.summary_counts = {"sent": Counter(), "received": Counter()}
+        self.summary_turns = None
+        self.ledger = {}
+
+    def __len__(self):
+        return len(self.recent)
+
+    def record(self, entry, received=False):
+        if len(self.recent) == self.recent.maxlen:
+            self._fold(self.recent[0])
+        self.recent.append((entry, received))
+        counterpart = entry.agent if received else entry.target
+        if counterpart != self.name and counterpart != "GLOBAL":
+            ledger = self.ledger.setdefault(counterpart, {"sent": Counter(), "received": Counter(), "last_turn": None, "last": None})
+            ledger["received" if received else "sent"][entry.intent] += 1
+            ledger["last_turn"] = entry.turn
+            ledger["last"] = f"{'they' if received else 'you'}: {entry.intent}"
+
+    def _fold(self, event):
+        entry, received = event
+        self.summary_counts["received" if received else "sent"][entry.intent] += 1
+        first = self.summary_turns[0] if self.summary_turns else entry.turn
+        self.summary_turns = (first, entry.turn)
+
+    def _clip(self, message):
+        if len(message) <= self.message_chars:
+            return message
+        return message[:self.message_chars - 3].rstrip() + "..."
+
+    def event_line(self, event):
+        entry, received = event
+        message = self._clip(entry.message)
+        if received:
+            return f"Turn {entry.turn}: Received from {entry.agent} - Intent: {entry.intent}, Msg: '{message}'"
+        return f"Turn {entry.turn}: {entry.agent} - Intent: {entry.intent}, Target: {entry.target}, Msg: '{message}', Impact: {entry.impact}"
+
+    def summary_line(self):
+        if not self.summary_turns:
+            return None
+        parts = []
+        for direction in ("sent", "received"):
+            counts = self.summary_counts[direction]
+            if counts:
+                parts.append(f"{direction} " + ", ".join(f"{n}x {intent}" for intent, n in counts.most_common()))
+        first, last = self.summary_turns
+        return f"Earlier (turns {first}-{last}): " + "; ".join(parts) + "."
+
+    def ledger_lines(self):
+        lines = []
+        for counterpart, ledger in sorted(self.ledger.items(), key=lambda item: -item[1]["last_turn"]):
+            tallies = [f"{label} {ledger['sent'][intent]}/{ledger['received'][intent]}"
+                       for intent, label in LEDGER_INTENTS if ledger['sent'][intent] or ledger['received'][intent]]
+            tallies = ", ".join(tallies) + " (you/them), " if tallies else ""
+            lines.append(f"{counterpart}: {tallies}last contact turn {ledger['last_turn']} ({ledger['last']})")
+        return lines
+
+    def lines(self):
+        # The summary is small and bounded by the number of intents, so it goes first;
+        # then the newest events, then the ledger by most recent contact, each only while
+        # it still fits the budget. The newest event is always kept.
+        budget = self.token_budget
+        summary = self.summary_line()
+        if summary and estimate_tokens(summary) <= budget:
+            budget -= estimate_tokens(summary)
+        else:
+            summary = None
+
+        recent = []
+        for event in reversed(self.recent):
+            line = self.event_line(event)
+            cost = estimate_tokens(line)
+            if cost > budget and recent:
+                break
+            recent.insert(0, line)
+            budget -= cost
+
+        ledger = []
+        for line in self.ledger_lines():
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            ledger.append(line)
+            budget -= cost
+
+        lines = [summary] if summary else []
+        if ledger:
+            lines.append("Relations ledger:")
+            lines.extend(f"- {line}" for line in ledger)
+        if recent:
+            lines.append("Recent events:")
+            lines.extend(recent)
+        return lines
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class RelationshipMatrix:
+    # Symmetric nation x nation relationship weights in [-1, 1]. `linked` marks pairs
+    # that have interacted at least once, which is what the diplomatic network treats
+    # as an edge (a pair can be linked with a weight of exactly 0).
+    def __init__(self, nations):
+        self.names = list(nations)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        self.weights = np.zeros((n, n), dtype=np.float64)
+        self.linked = np.zeros((n, n), dtype=bool)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, a, b):
+        return float(self.weights[self.index[a], self.index[b]])
+
+    def update(self, a, b, delta):
+        i, j = self.index[a], self.index[b]
+        new_weight = max(-1.0, min(1.0, self.weights[i, j] + delta))
+        self.weights[i, j] = self.weights[j, i] = new_weight
+        self.linked[i, j] = self.linked[j, i] = True
+        return new_weight
+
+    def set(self, a, b, weight):
+        i, j = self.index[a], self.index[b]
+        self.weights[i, j] = self.weights[j, i] = weight
+        self.linked[i, j] = self.linked[j, i] = True
+
+    def degree(self):
+        return self.linked.sum(axis=1)
+
+    def edge_count(self):
+        return int(np.triu(self.linked, k=1).sum())
+
+    def density(self):
+        n = len(self.names)
+        if n < 2:
+            return 0.0
+        return self.edge_count() / (n * (n - 1) / 2)
+
+    def most_and_least_active(self):
+        if not self.names:
+            return None, None
+        degrees = self.degree()
+        return self.names[int(np.argmax(degrees))], self.names[int(np.argmin(degrees))]
+
+    def strongest_pair(self, threshold=0.1):
+        candidates = np.triu(self.linked & (self.weights > threshold), k=1)
+        if not candidates.any():
+            return None
+        masked = np.where(candidates, self.weights, -np.inf)
+        i, j = np.unravel_index(int(np.argmax(masked)), masked.shape)
+        return self.names[i], self.names[j], float(self.weights[i, j])
+
+    def component_count(self):
+        parent = list(range(len(self.names)))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i, j in np.argwhere(np.triu(self.linked, k=1)):
+            parent[find(i)] = find(j)
+        return len({find(i) for i in range(len(self.names))})
+
+    def as_dict(self):
+        return {a: {b: float(self.weights[i, j]) for j, b in enumerate(self.names) if j != i}
+                for i, a in enumerate(self.names)}
+
+    def edges(self):
+        return [(self.names[i], self.names[j], float(self.weights[i, j]))
+                for i, j in np.argwhere(np.triu(self.linked, k=1))]
+
+    def to_graph(self):
+        # networkx is only needed for drawing and summaries, so it is imported on first use.
+        import networkx as nx
+
+        G = nx.Graph()
+        G.add_nodes_from(self.names)
+        G.add_weighted_edges_from(self.edges())
+        return G
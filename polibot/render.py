@@ -0,0 +1,95 @@
+import io
+
+import numpy as np
+
+from .catalog import COUNTRY_PROFILES
+
+
+class NetworkRenderer:
+    # Draws a RelationshipMatrix onto one reusable figure. Frames are produced at
+    # the end of each turn, plus every `frame_interval` actions when it is > 0; only
+    # turn-end frames are titled as such.
+    # The layout is warm-started from the previous positions and a frame is skipped
+    # entirely when no edge weight changed since the last one. The networkx graph
+    # is only built when a frame is actually drawn. matplotlib and networkx take most of
+    # a second to import, so they are loaded when the first renderer is created rather
+    # than when the app starts.
+    def __init__(self, frame_interval=0, dpi=130, figsize=(10, 7)):
+        import matplotlib.pyplot as plt
+        from matplotlib.figure import Figure
+
+        self.frame_interval = frame_interval
+        self.dpi = dpi
+        with plt.style.context('seaborn-v0_8-whitegrid'):
+            self.fig = Figure(figsize=figsize)
+            self.ax = self.fig.add_subplot()
+        self.pos = None
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self._actions_since_frame = 0
+        self._last_state = None
+
+    def action_frame(self, relations, turn):
+        self._actions_since_frame += 1
+        if self.frame_interval and self._actions_since_frame >= self.frame_interval:
+            return self.render(relations, turn, turn_end=False)
+        return None
+
+    def turn_frame(self, relations, turn):
+        return self.render(relations, turn)
+
+    def render(self, relations, turn, turn_end=True, force=False):
+        self._actions_since_frame = 0
+        if not force and self._last_state is not None and self._last_state[0] == relations.names \
+                and np.array_equal(self._last_state[1], relations.linked) \
+                and np.array_equal(self._last_state[2], relations.weights):
+            self.frames_skipped += 1
+            return None
+        self._last_state = (list(relations.names), relations.linked.copy(), relations.weights.copy())
+
+        import networkx as nx
+
+        G = relations.to_graph()
+
+        initial_pos = self.pos if self.pos is not None and all(n in self.pos for n in G.nodes()) else None
+        try: self.pos = nx.kamada_kawai_layout(G, pos=initial_pos, weight='weight', scale=1.0)
+        except Exception: self.pos = nx.spring_layout(G, pos=initial_pos, seed=42, k=0.9, iterations=50)
+
+        ax = self.ax
+        ax.clear()
+
+        node_colors = [COUNTRY_PROFILES.get(n, {}).get("color", "#cccccc") for n in G.nodes()]
+        node_sizes = [1200 + G.degree(n) * 250 for n in G.nodes()]
+
+        edge_weights = [G[u][v].get('weight', 0) for u, v in G.edges()]
+        max_abs_w = max(abs(w) for w in edge_weights) if edge_weights else 1.0
+        max_abs_w = max(max_abs_w, 0.1)
+
+        edge_widths = [1 + (abs(w) / max_abs_w * 4) for w in edge_weights]
+        edge_colors = ['#2ca02c' if w > 0.1 else '#d62728' if w < -0.1 else '#aaaaaa' for w in edge_weights]
+        edge_alphas = [0.4 + (abs(w) / max_abs_w * 0.5) for w in edge_weights]
+
+        nx.draw_networkx_nodes(G, self.pos, ax=ax, node_size=node_sizes, node_color=node_colors, alpha=0.9, linewidths=1.0, edgecolors='grey')
+        if edge_weights:
+            nx.draw_networkx_edges(G, self.pos, ax=ax, width=edge_widths, edge_color=edge_colors, alpha=edge_alphas, connectionstyle='arc3,rad=0.05')
+        nx.draw_networkx_labels(G, self.pos, ax=ax, font_size=9, font_weight="bold", font_color='black')
+
+        ax.set_title(f"Diplomatic Network ({'End of ' if turn_end else ''}Turn {turn})", fontsize=16)
+        ax.axis("off")
+        self.fig.tight_layout()
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format="png", dpi=self.dpi, bbox_inches='tight')
+        self.frames_rendered += 1
+        return buf
+
+
+def format_log_entry_html(entry):
+    intent_class = f"intent-{entry.intent.lower().replace(' ', '-')}"
+    return f"""
+    <div class="log-entry {intent_class}">
+        <strong>Turn {entry.turn} • {entry.timestamp} • {entry.agent}</strong><br>
+        <strong>Intent:</strong> {entry.intent} | <strong>Target:</strong> {entry.target}<br>
+        <strong>Message:</strong> "{entry.message}"<br>
+        <em>Impact: {entry.impact}</em>
+    </div>
+    """
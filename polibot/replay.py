@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import groupby
+
+from .cli import write_output
+from .engine import SimulationEngine, network_summary
+from .events import EventStore, load_run
+from .export import EXPORT_FORMATS, ResultExporter
+from .impact import IMPACT_MODEL, load_impact_model
+from .series import MetricSeries
+
+RECORDING_FORMAT = "polibot-recording"
+RECORDING_VERSION = 1
+RECORDED = object()
+ACTION_FIELDS = ("turn", "timestamp", "agent", "intent", "target", "message", "prompt_tokens")
+
+
+def recording_from_result(result):
+    # Structured recording of a finished run: its settings, seed and every applied
+    # action in apply order, enough to replay it without the agents.
+    return {
+        "format": RECORDING_FORMAT, "version": RECORDING_VERSION,
+        "scenario": result["scenario"], "nations": result["nations"], "num_turns": result["num_turns"],
+        "severity": result["severity"], "seed": result["seed"], "metrics_initial": result["metrics_initial"],
+        "metrics": result["metrics"],
+        "actions": [{k: v for k, v in (entry if isinstance(entry, dict) else entry.as_dict()).items() if k in ACTION_FIELDS}
+                    for entry in result["log"]],
+    }
+
+
+def recording_from_events(records):
+    # Only completed turns are kept; the recorded raw responses are carried along.
+    state = load_run(records)
+    header = state["header"]
+    return {
+        "format": RECORDING_FORMAT, "version": RECORDING_VERSION,
+        "scenario": header["scenario"], "nations": header["nations"], "num_turns": header["num_turns"],
+        "severity": header["severity"], "seed": header["seed"], "metrics_initial": header["metrics_initial"],
+        "metrics": state["turn_end"]["metrics"] if state["turn_end"] else header["metrics_initial"],
+        "actions": [{**{k: r.get(k) for k in ACTION_FIELDS}, "raw": r.get("raw")} for r in state["actions"]],
+    }
+
+
+def load_recording(path):
+    # Accepts a recording, a result file written by `python -m polibot -o` or an event log.
+    if path.endswith(".jsonl"):
+        return recording_from_events(EventStore(path).records())
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("Recording must contain a mapping.")
+    if data.get("format") == RECORDING_FORMAT:
+        if data.get("version") != RECORDING_VERSION:
+            raise ValueError(f"Unsupported recording version {data.get('version')!r} (expected {RECORDING_VERSION}).")
+        return data
+    if "log" in data and "scenario" in data:
+        return recording_from_result(data)
+    raise ValueError("Not a recording, result file or event log.")
+
+
+def replay(recording, impact_model=None, severity=None, initial_peace=None, seed=RECORDED, **kwargs):
+    # Re-runs a recording through a fresh engine: every recorded action is applied again in
+    # its recorded order, so impacts, relationships and metrics follow the given impact
+    # model and severity. With the recorded seed and model, a run recorded with a seed is
+    # reproduced exactly. Returns the engine; engine.result() gives the usual result.
+    metrics_initial = dict(recording["metrics_initial"])
+    if initial_peace is not None:
+        metrics_initial["Peace Index"] = initial_peace
+    engine = SimulationEngine(
+        None, recording["scenario"], recording["nations"], num_turns=recording["num_turns"],
+        severity=recording["severity"] if severity is None else severity,
+        initial_peace=metrics_initial["Peace Index"], seed=recording["seed"] if seed is RECORDED else seed,
+        impact_model=impact_model, **kwargs
+    )
+    engine.metrics_initial = metrics_initial
+    engine.metrics = metrics_initial.copy()
+    engine.metric_series = MetricSeries(engine.metrics, engine.metrics_capacity)
+    engine.metric_series.record(0, engine.metrics, turn_end=True)
+    unknown = {r["agent"] for r in recording["actions"]} - set(engine.nations)
+    if unknown:
+        raise ValueError(f"Recording has actions by nations outside the run: {', '.join(sorted(unknown))}")
+    engine.start()
+    for turn, records in groupby(recording["actions"], key=lambda r: r["turn"]):
+        engine.replay_turn(turn, records)
+    if engine.exporter is not None:
+        engine.exporter.close()
+    return engine
+
+
+def replay_summary(path, recording, engine):
+    return {
+        "path": path, "scenario": engine.scenario, "nations": engine.nations, "severity": engine.severity,
+        "seed": engine.seed, "turns": engine.completed_turns, "actions": len(engine.log),
+        "metrics_recorded": recording["metrics"], "metrics": engine.metrics,
+        "agreements": len(engine.agreements), "summary": network_summary(engine.relations),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="polibot.replay",
+                                     description="Re-score recorded runs under another impact model or severity, without LLM calls.")
+    parser.add_argument("recordings", nargs="+",
+                        help="Recordings (.json), result files from `python -m polibot -o`, event logs (.jsonl) or directories of them.")
+    parser.add_argument("--impact-model", default=None, metavar="PATH", help="JSON file of impact table overrides.")
+    parser.add_argument("--severity", type=int, default=None, help="Severity to replay with (default: as recorded).")
+    parser.add_argument("--initial-peace", type=float, default=None, help="Initial Peace Index (default: as recorded).")
+    parser.add_argument("--seed", type=int, default=None, help="Impact seed for runs recorded without one.")
+    parser.add_argument("--export", default=None, metavar="DIR",
+                        help="Write each replayed run's actions, metric snapshots, relationship snapshots and agreements as tables under DIR.")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, default="parquet",
+                        help="Table format for --export; Parquet needs pyarrow and falls back to CSV without it.")
+    parser.add_argument("--save-recordings", default=None, metavar="DIR", help="Also write each input as a recording file here.")
+    parser.add_argument("--output", "-o", default="-", help="Path for the JSON summary ('-' for stdout).")
+    return parser
+
+
+def recording_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, n) for n in os.listdir(path) if n.endswith((".json", ".jsonl")))
+        else:
+            yield path
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        impact_model = load_impact_model(args.impact_model) if args.impact_model else IMPACT_MODEL
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Error: Cannot load impact model: {e}", file=sys.stderr)
+        return 2
+
+    runs = []
+    started = time.perf_counter()
+    for path in recording_paths(args.recordings):
+        try:
+            recording = load_recording(path)
+            seed = recording["seed"] if recording["seed"] is not None or args.seed is None else args.seed
+            run_id = os.path.splitext(os.path.basename(path))[0]
+            exporter = ResultExporter(args.export, args.export_format, run_id=run_id) if args.export else None
+            engine = replay(recording, impact_model, severity=args.severity, initial_peace=args.initial_peace, seed=seed,
+                            exporter=exporter)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Skipping {path}: {e}", file=sys.stderr)
+            continue
+        if recording["seed"] is None and args.seed is None:
+            print(f"Warning: {path} was recorded without a seed; its impacts are redrawn at random.", file=sys.stderr)
+        if args.save_recordings:
+            os.makedirs(args.save_recordings, exist_ok=True)
+            name = os.path.splitext(os.path.basename(path))[0] + ".recording.json"
+            with open(os.path.join(args.save_recordings, name), "w", encoding="utf-8") as f:
+                json.dump(recording, f, ensure_ascii=False)
+        runs.append(replay_summary(path, recording, engine))
+    elapsed = time.perf_counter() - started
+    actions = sum(run["actions"] for run in runs)
+    print(f"Replayed {len(runs)} runs ({actions} actions) in {elapsed:.2f}s.", file=sys.stderr)
+    if not runs:
+        return 1
+    write_output({"impact_model": args.impact_model, "severity": args.severity, "runs": runs}, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
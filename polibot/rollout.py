@@ -0,0 +1,163 @@
+import argparse
+import itertools
+import sys
+import time
+
+import numpy as np
+
+from .catalog import COUNTRY_PROFILES
+from .cli import resolve_scenario, write_output
+from .engine import initial_metrics
+from .impact import IMPACT_DRAWS, IMPACT_METRICS, IMPACT_MODEL, VALID_INTENTS, metrics_array, scenario_kind
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+class ImpactBatch:
+    # N simulations of one scenario stepped together without any LLM: metric states are
+    # an (N, metrics) array and relationships an (N, nations, nations) array, and each
+    # step applies one action per simulation through ImpactModel.step. Simulation i
+    # draws from its own Generator seeded with seeds[i] (pre-drawn in blocks), so it
+    # gets the same impacts as a SimulationEngine with that seed taking the same
+    # actions, whatever else is in the batch.
+    def __init__(self, scenario, nations, seeds, severity=5, initial_peace=0.5, model=IMPACT_MODEL, block=256):
+        self.scenario = scenario
+        self.nations = list(nations)
+        self.model = model
+        self.block = block
+        n = len(seeds)
+        self.severity = np.broadcast_to(np.asarray(severity, dtype=np.float64), (n,)).copy()
+        self.state = np.tile(metrics_array(initial_metrics()), (n, 1))
+        self.state[:, 0] = np.broadcast_to(np.asarray(initial_peace, dtype=np.float64), (n,))
+        self.initial_state = self.state.copy()
+        self.kinds = np.full(n, scenario_kind(scenario))
+        self.weights = np.zeros((n, len(self.nations), len(self.nations)), dtype=np.float64)
+        self.linked = np.zeros_like(self.weights, dtype=bool)
+        self.steps = 0
+        self._generators = [np.random.default_rng(seed) for seed in seeds]
+        self._draws = None
+        self._position = block
+
+    def __len__(self):
+        return len(self.state)
+
+    def _next_draws(self):
+        if self._position == self.block:
+            self._draws = np.stack([g.random((self.block, IMPACT_DRAWS)) for g in self._generators], axis=1)
+            self._position = 0
+        draws = self._draws[self._position]
+        self._position += 1
+        return draws
+
+    def step(self, agents, intents, targets):
+        # agents / targets: nation indexes (target -1 for GLOBAL); intents: model rows
+        # (see ImpactModel.intent_index). Scalars apply to every simulation.
+        n = len(self)
+        agents = np.broadcast_to(agents, (n,))
+        intents = np.broadcast_to(intents, (n,))
+        targets = np.broadcast_to(targets, (n,))
+        targeted = targets >= 0
+        self.state, relationship = self.model.step(self.state, intents, targeted, self._next_draws(), self.kinds, self.severity)
+        rows = np.flatnonzero(targeted & (targets != agents))
+        a, t = agents[rows], targets[rows]
+        weights = np.clip(self.weights[rows, a, t] + relationship[rows], -1.0, 1.0)
+        self.weights[rows, a, t] = self.weights[rows, t, a] = weights
+        self.linked[rows, a, t] = self.linked[rows, t, a] = True
+        self.steps += 1
+
+    def metrics(self):
+        return {name: self.state[:, i] for i, name in enumerate(IMPACT_METRICS)}
+
+    def density(self):
+        n = len(self.nations)
+        return np.triu(self.linked, k=1).sum(axis=(1, 2)) / (n * (n - 1) / 2)
+
+
+def random_policy(rng, rollouts, turns, num_nations, intent_weights, global_share=0.2):
+    # Agent order, intents and targets for every action of every rollout, shape
+    # (rollouts, turns * num_nations). Targets are another nation or -1 for GLOBAL.
+    order = np.argsort(rng.random((rollouts, turns, num_nations)), axis=2).reshape(rollouts, -1)
+    size = order.shape
+    intents = rng.choice(len(intent_weights), size=size, p=np.asarray(intent_weights) / np.sum(intent_weights))
+    offset = rng.integers(1, num_nations, size=size)
+    targets = np.where(rng.random(size) < global_share, -1, (order + offset) % num_nations)
+    return order, intents, targets
+
+
+def sensitivity_summary(batch, groups, labels):
+    summary = []
+    metrics = batch.metrics()
+    density = batch.density()
+    for label, rows in zip(labels, groups):
+        stats = {}
+        for name, values in metrics.items():
+            values = values[rows]
+            stats[name] = {"mean": float(values.mean()),
+                           **{f"p{pct}": float(v) for pct, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}}
+        summary.append({**label, "rollouts": len(rows), "metrics": stats, "mean_density": float(density[rows].mean())})
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="polibot.rollout",
+                                     description="Sensitivity analysis of the impact model over many LLM-free rollouts with random actions.")
+    parser.add_argument("--scenario", required=True, help="Scenario name or a unique substring of it.")
+    parser.add_argument("--nations", nargs="+", default=["USA", "China", "India", "EU", "Pakistan"])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--rollouts", type=int, default=1000, help="Rollouts per severity / initial peace combination.")
+    parser.add_argument("--severity", type=int, nargs="+", default=[5], help="Severity values to compare.")
+    parser.add_argument("--initial-peace", type=float, nargs="+", default=[0.5], help="Initial Peace Index values to compare.")
+    parser.add_argument("--intent-weight", action="append", default=[], metavar="INTENT=WEIGHT",
+                        help="Relative frequency of an intent in the random policy (default: all equal).")
+    parser.add_argument("--global-share", type=float, default=0.2, help="Share of actions targeting GLOBAL.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random policy and the rollouts.")
+    parser.add_argument("--output", "-o", default="-", help="Path for the JSON summary ('-' for stdout).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        scenario = resolve_scenario(args.scenario)
+        unknown = [n for n in args.nations if n not in COUNTRY_PROFILES]
+        if unknown or len(args.nations) < 2:
+            raise ValueError(f"Unknown nations: {', '.join(unknown)}" if unknown else "At least two nations are required.")
+        weights = dict.fromkeys(VALID_INTENTS, 1.0 if not args.intent_weight else 0.0)
+        for spec in args.intent_weight:
+            intent, sep, weight = spec.partition("=")
+            if not sep or intent.strip() not in weights:
+                raise ValueError(f"--intent-weight expects INTENT=WEIGHT with one of: {', '.join(VALID_INTENTS)}")
+            weights[intent.strip()] = float(weight)
+        if not sum(weights.values()) > 0:
+            raise ValueError("At least one intent needs a positive weight.")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    # Every combination reuses the same rollout seeds and random actions (common random
+    # numbers), so differences between combinations come from the parameters, not noise.
+    combos = list(itertools.product(args.severity, args.initial_peace))
+    seeds = [args.seed + r for r in range(args.rollouts)] * len(combos)
+    batch = ImpactBatch(scenario, args.nations, seeds,
+                        severity=np.repeat([c[0] for c in combos], args.rollouts),
+                        initial_peace=np.repeat([c[1] for c in combos], args.rollouts))
+    order, intents, targets = random_policy(np.random.default_rng([args.seed, len(args.nations)]), args.rollouts, args.turns,
+                                            len(args.nations), list(weights.values()), args.global_share)
+    intents = IMPACT_MODEL.intent_index(list(weights))[intents]
+    started = time.perf_counter()
+    for step in range(order.shape[1]):
+        batch.step(np.tile(order[:, step], len(combos)), np.tile(intents[:, step], len(combos)), np.tile(targets[:, step], len(combos)))
+    elapsed = time.perf_counter() - started
+    print(f"{len(batch)} rollouts x {batch.steps} actions in {elapsed:.2f}s "
+          f"({len(batch) * batch.steps / max(elapsed, 1e-9):,.0f} actions/s).", file=sys.stderr)
+
+    groups = [np.arange(i * args.rollouts, (i + 1) * args.rollouts) for i in range(len(combos))]
+    labels = [{"severity": severity, "initial_peace": peace} for severity, peace in combos]
+    data = {"scenario": scenario, "nations": args.nations, "turns": args.turns,
+            "intent_weights": weights, "summary": sensitivity_summary(batch, groups, labels)}
+    write_output(data, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
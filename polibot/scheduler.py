@@ -0,0 +1,210 @@
+import random
+import sys
+import threading
+import time
+
+from .prompts import estimate_tokens
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    # Refills continuously at `per_minute` units per minute up to `capacity` (one
+    # minute's worth by default). acquire() blocks until enough units are available.
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity or per_minute)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        # Requests larger than the bucket would never fit, so they wait for a full one.
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+    def refund(self, amount):
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            pass
+    return None
+
+
+def is_retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Timeouts and dropped connections (groq.APITimeoutError / APIConnectionError,
+    # or the builtin equivalents from other clients) carry no status code.
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in name or "Connection" in name
+
+
+class RequestScheduler:
+    # Central admission control for LLM calls: token buckets for requests and tokens per
+    # minute, a cap on requests in flight, and retries with exponential backoff and full
+    # jitter. A 429 with Retry-After pauses every caller until the server's deadline
+    # instead of letting the other threads hit the same limit.
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_in_flight=4, max_retries=4,
+                 base_delay=1.0, max_delay=30.0, seed=None, clock=time.monotonic, sleep=time.sleep):
+        self.request_bucket = TokenBucket(requests_per_minute, clock=clock, sleep=sleep) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute, clock=clock, sleep=sleep) if tokens_per_minute else None
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.stats = {"requests": 0, "succeeded": 0, "retries": 0, "throttled": 0, "failed": 0,
+                      "wait_s": 0.0, "max_in_flight": 0}
+        self._in_flight = 0
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def backoff_delay(self, attempt, retry_after=None):
+        delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = retry_after + delay * 0.1
+        return delay
+
+    def _admit(self, estimated_tokens):
+        waited = 0.0
+        with self._lock:
+            pause = self._paused_until - self.clock()
+        if pause > 0:
+            self.sleep(pause)
+            waited += pause
+        if self.request_bucket:
+            waited += self.request_bucket.acquire(1)
+        if self.token_bucket:
+            waited += self.token_bucket.acquire(estimated_tokens)
+        if waited:
+            self._count("wait_s", waited)
+
+    def _enter(self):
+        if self._slots:
+            self._slots.acquire()
+        with self._lock:
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots:
+            self._slots.release()
+
+    def submit(self, call, estimated_tokens=0, stream=False):
+        # Runs call() under the limits. A streaming response keeps its in-flight slot
+        # until the stream is exhausted or closed.
+        self._count("requests")
+        for attempt in range(self.max_retries + 1):
+            self._admit(estimated_tokens)
+            self._enter()
+            try:
+                response = call()
+            except Exception as e:
+                self._leave()
+                if getattr(e, "status_code", None) == 429:
+                    self._count("throttled")
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._count("failed")
+                    raise
+                retry_after = retry_after_seconds(e)
+                delay = self.backoff_delay(attempt, retry_after)
+                if retry_after is not None:
+                    with self._lock:
+                        self._paused_until = max(self._paused_until, self.clock() + retry_after)
+                print(f"Warning: LLM request failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{self.max_retries})", file=sys.stderr)
+                self._count("retries")
+                self.sleep(delay)
+                continue
+            self._count("succeeded")
+            if stream:
+                return GuardedStream(response, self._leave)
+            self._leave()
+            self._settle_tokens(estimated_tokens, getattr(response, "usage", None))
+            return response
+
+    def _settle_tokens(self, estimated_tokens, usage):
+        total = getattr(usage, "total_tokens", None)
+        if self.token_bucket and total is not None and total < estimated_tokens:
+            self.token_bucket.refund(estimated_tokens - total)
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+class GuardedStream:
+    # Holds a scheduler slot for the lifetime of a streaming response and releases it
+    # exactly once, when the stream is exhausted or closed.
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._response
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is None:
+            return
+        release()
+        close = getattr(self._response, "close", None)
+        if close:
+            close()
+
+
+class ScheduledClient:
+    # Routes client.chat.completions.create through a RequestScheduler.
+    def __init__(self, client, scheduler):
+        self._client = client
+        self.scheduler = scheduler
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        prompt = "".join(m["content"] for m in kwargs.get("messages", []))
+        estimated = estimate_tokens(prompt) + (kwargs.get("max_tokens") or 0)
+        return self.scheduler.submit(lambda: self._client.chat.completions.create(**kwargs), estimated,
+                                     stream=kwargs.get("stream", False))
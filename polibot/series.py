@@ -0,0 +1,95 @@
+import csv
+
+import numpy as np
+
+
+class MetricSeries:
+    # Fixed-capacity history of the metrics dict, one row per applied action plus one
+    # per turn end (turn 0 is the initial state). Values live in a preallocated float
+    # array, so recording is a single row write. When the buffer is full, every other
+    # action row is dropped and later actions are sampled at twice the interval (turn-end
+    # rows are thinned the same way once they make up most of the buffer), so memory
+    # stays bounded while the whole run keeps its shape at an even resolution.
+    def __init__(self, names, capacity=1024):
+        self.names = list(names)
+        self.capacity = capacity
+        self.values = np.zeros((capacity, len(self.names)), dtype=np.float64)
+        self.turns = np.zeros(capacity, dtype=np.int32)
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.turn_end = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.stride = 1
+        self.turn_stride = 1
+        self.actions_seen = 0
+        self.compactions = 0
+
+    def __len__(self):
+        return self.size
+
+    def record(self, turn, metrics, turn_end=False):
+        if not turn_end:
+            self.actions_seen += 1
+        if not self._sampled(turn, turn_end):
+            return
+        if self.size == self.capacity:
+            self._compact()
+            if not self._sampled(turn, turn_end):
+                return
+        row = self.size
+        self.values[row] = [metrics[name] for name in self.names]
+        self.turns[row] = turn
+        self.steps[row] = self.actions_seen
+        self.turn_end[row] = turn_end
+        self.size += 1
+
+    def _sampled(self, turn, turn_end):
+        if turn_end:
+            return turn % self.turn_stride == 0
+        return self.actions_seen % self.stride == 0
+
+    def _compact(self):
+        turn_end = self.turn_end[:self.size]
+        if (~turn_end).sum() > self.capacity // 4:
+            self.stride *= 2
+            keep = turn_end | (self.steps[:self.size] % self.stride == 0)
+        else:
+            self.turn_stride *= 2
+            keep = ~turn_end | (self.turns[:self.size] % self.turn_stride == 0)
+        rows = np.flatnonzero(keep)
+        for array in (self.values, self.turns, self.steps, self.turn_end):
+            array[:len(rows)] = array[rows]
+        self.size = len(rows)
+        self.compactions += 1
+
+    def columns(self, turn_end=None):
+        # Copies of the recorded rows; turn_end=True / False selects only those rows.
+        rows = slice(0, self.size)
+        if turn_end is not None:
+            rows = np.flatnonzero(self.turn_end[:self.size] == turn_end)
+        data = {"turn": self.turns[rows].copy(), "step": self.steps[rows].copy(), "turn_end": self.turn_end[rows].copy()}
+        for i, name in enumerate(self.names):
+            data[name] = self.values[rows, i].copy()
+        return data
+
+    def as_records(self):
+        columns = self.columns()
+        return [{name: values[i].item() for name, values in columns.items()} for i in range(self.size)]
+
+    def to_csv(self, target):
+        # `target` is a path or an open text file.
+        if isinstance(target, str):
+            with open(target, "w", newline="", encoding="utf-8") as f:
+                return self.to_csv(f)
+        columns = self.columns()
+        writer = csv.writer(target)
+        writer.writerow(list(columns))
+        writer.writerows(zip(*(values.tolist() for values in columns.values())))
+
+    def to_parquet(self, target):
+        # `target` is a path or a binary file. Requires pyarrow.
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow); use CSV instead.") from e
+        pq.write_table(pa.table(self.columns()), target)
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+from .agents import failed_action
+from .backends import create_groq_client
+from .batch import OutcomeAggregator, build_jobs, run_outcome
+from .catalog import SCENARIO_DETAILS
+from .cli import resolve_scenario, write_output
+from .engine import SimulationEngine
+from .events import EventStore
+from .fake import FakeGroqClient
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_batch_file(path, requests):
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests:
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body},
+                               ensure_ascii=False) + "\n")
+
+
+def read_batch_output(path):
+    # Maps custom_id -> {"content", "usage", "error"} from a provider-format output file.
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            body = response.get("body") or {}
+            error = record.get("error")
+            if not error and response.get("status_code", 200) != 200:
+                error = body.get("error") or f"HTTP {response.get('status_code')}"
+            content = None
+            if not error:
+                try:
+                    content = body["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError):
+                    error = "Response has no message content."
+            results[record["custom_id"]] = {"content": content, "usage": body.get("usage"), "error": error}
+    return results
+
+
+class LocalBatchBackend:
+    # Stand-in for a provider batch API. Runs every request of a job file through
+    # `client` (FakeGroqClient by default) and writes an output file in the provider's
+    # format, so sweeps can be tested end to end offline.
+    def __init__(self, client=None, max_workers=8):
+        self.client = client or FakeGroqClient()
+        self.max_workers = max_workers
+
+    def _execute(self, line):
+        request = json.loads(line)
+        try:
+            completion = self.client.chat.completions.create(**request["body"])
+            message = completion.choices[0].message
+            usage = getattr(completion, "usage", None)
+            body = {"object": "chat.completion", "model": request["body"].get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": message.content}, "finish_reason": "stop"}],
+                    "usage": vars(usage) if usage is not None else None}
+            return {"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+        except Exception as e:
+            return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+
+    def run(self, input_path, output_path):
+        with open(input_path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            records = list(executor.map(self._execute, lines))
+        with open(output_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class GroqBatchBackend:
+    # Submits a job file to the Groq Batch API and polls until it finishes. Failed
+    # requests from the error file are appended to the output so every custom_id is
+    # accounted for.
+    def __init__(self, client, completion_window="24h", poll_interval=30.0):
+        self.client = client
+        self.completion_window = completion_window
+        self.poll_interval = poll_interval
+
+    def run(self, input_path, output_path):
+        with open(input_path, "rb") as f:
+            upload = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=upload.id, endpoint=BATCH_ENDPOINT,
+                                           completion_window=self.completion_window)
+        print(f"Submitted batch {batch.id} ({os.path.basename(input_path)})", file=sys.stderr)
+        while batch.status not in TERMINAL_STATUSES:
+            time.sleep(self.poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'.")
+        with open(output_path, "wb") as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    f.write(self.client.files.content(file_id).read())
+
+
+def run_sweep(engines, backend, workdir, on_turn=None):
+    # Turn-synchronous: every agent prompt of every active simulation for a turn goes
+    # into one job file, the backend completes it, and the responses are applied to each
+    # engine as pre-recorded actions, so impact and memory run exactly as in a live turn.
+    os.makedirs(workdir, exist_ok=True)
+    for engine in engines:
+        engine.start()
+    for turn in range(1, max(engine.num_turns for engine in engines) + 1):
+        active = [(i, engine) for i, engine in enumerate(engines) if engine.completed_turns < turn <= engine.num_turns]
+        if not active:
+            continue
+        requests, owners = [], {}
+        for i, engine in active:
+            for name, agent in engine.agents.items():
+                custom_id = f"sim{i}-turn{turn}-{name.replace(' ', '_')}"
+                owners[custom_id] = (engine, name)
+                requests.append((custom_id, agent.batch_request(engine.scenario, engine.scenario_details, turn, engine.nations)))
+
+        input_path = os.path.join(workdir, f"turn-{turn:03d}-input.jsonl")
+        output_path = os.path.join(workdir, f"turn-{turn:03d}-output.jsonl")
+        write_batch_file(input_path, requests)
+        backend.run(input_path, output_path)
+        results = read_batch_output(output_path)
+
+        actions = {}
+        for custom_id, (engine, name) in owners.items():
+            agent = engine.agents[name]
+            result = results.get(custom_id) or {"error": "Missing from batch output."}
+            if result["error"]:
+                print(f"Error in batch request {custom_id}: {result['error']}", file=sys.stderr)
+                action = failed_action(result["error"])
+            else:
+                if result["usage"]:
+                    agent.record_usage(SimpleNamespace(**result["usage"]))
+                action = agent.accept_response(result["content"])
+            actions.setdefault(id(engine), {})[name] = action
+        for _, engine in active:
+            engine.prerecorded_actions = actions[id(engine)]
+            engine.run_turn(turn)
+        if on_turn:
+            on_turn(turn, len(active), len(requests))
+    return [engine.finish() for engine in engines]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="polibot.sweep", description="Run scenario sweeps with one batch LLM job per turn across all simulations.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIO_DETAILS),
+                        help="Scenario names or unique substrings. Defaults to every scenario.")
+    parser.add_argument("--nation-set", action="append", dest="nation_sets", metavar="NATIONS",
+                        help="Comma-separated nation set, e.g. 'USA,China,EU'. Repeat for several sets.")
+    parser.add_argument("--runs", type=int, default=1, help="Number of seeds per scenario and nation set.")
+    parser.add_argument("--seed-start", type=int, default=0)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--severity", type=int, default=5, choices=range(1, 11), metavar="1-10")
+    parser.add_argument("--initial-peace", type=float, default=0.5)
+    parser.add_argument("--json-mode", action="store_true", help="Ask the model for JSON actions instead of the bracketed text format.")
+    parser.add_argument("--backend", choices=["local", "groq"], default="local",
+                        help="'groq' submits to the Groq Batch API; 'local' completes jobs with the fake client.")
+    parser.add_argument("--completion-window", default="24h", help="Groq batch completion window.")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Seconds between batch status checks.")
+    parser.add_argument("--workdir", default=None, help="Directory for job files and per-simulation event logs.")
+    parser.add_argument("--output", "-o", default="-", help="Path for the JSON summary ('-' for stdout).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        scenarios = [resolve_scenario(s) for s in args.scenarios]
+        backend = (GroqBatchBackend(create_groq_client(), args.completion_window, args.poll_interval)
+                   if args.backend == "groq" else LocalBatchBackend())
+        nation_sets = [[n.strip() for n in s.split(",") if n.strip()] for s in (args.nation_sets or ["USA,China,India,EU,Pakistan"])]
+        seeds = range(args.seed_start, args.seed_start + args.runs)
+        jobs = build_jobs(scenarios, nation_sets, seeds, args.turns, args.severity, args.initial_peace)
+        workdir = args.workdir or os.path.join("sweeps", datetime.now().strftime("%Y%m%d-%H%M%S"))
+        engines = [
+            SimulationEngine(
+                None, job["scenario"], job["nations"], num_turns=job["num_turns"], severity=job["severity"],
+                initial_peace=job["initial_peace"], seed=job["seed"], response_format="json" if args.json_mode else "text",
+                event_store=EventStore(os.path.join(workdir, f"sim{i}.jsonl")),
+            )
+            for i, job in enumerate(jobs)
+        ]
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    def report(turn, simulations, requests):
+        print(f"Turn {turn}/{args.turns}: {requests} requests for {simulations} simulations in one batch.", file=sys.stderr)
+
+    results = run_sweep(engines, backend, workdir, on_turn=report)
+    aggregator = OutcomeAggregator()
+    for job, result in zip(jobs, results):
+        aggregator.add(run_outcome(job, result))
+    data = {"summary": aggregator.summary(), "workdir": workdir}
+    write_output(data, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+class StageTimer:
+    # Collects wall-clock durations (seconds) per named stage of the turn loop, plus
+    # running totals for counters such as token usage and retries.
+    def __init__(self):
+        self.durations = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.durations.setdefault(name, []).append(seconds)
+
+    def count(self, name, value=1, **args):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        stages = {}
+        for name, values in list(self.durations.items()):
+            ordered = sorted(values)
+            stages[name] = {
+                "count": len(ordered),
+                "total_ms": sum(ordered) * 1000,
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p95_ms": percentile(ordered, 95) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return stages
+
+
+class Tracer(StageTimer):
+    # StageTimer that also keeps every span and counter sample with its thread and
+    # arguments (turn, agent, ...), exportable as a Chrome trace (chrome://tracing,
+    # Perfetto) or as plain JSON.
+    def __init__(self):
+        super().__init__()
+        self.events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextmanager
+    def stage(self, name, **args):
+        start = time.perf_counter()
+        start_us = self._now_us()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(name, elapsed)
+            event = {"name": name, "ph": "X", "ts": start_us, "dur": elapsed * 1e6,
+                     "pid": os.getpid(), "tid": threading.get_ident(), "args": args}
+            with self._lock:
+                self.events.append(event)
+
+    def count(self, name, value=1, **args):
+        with self._lock:
+            super().count(name, value)
+            self.events.append({"name": name, "ph": "C", "ts": self._now_us(), "pid": os.getpid(),
+                                "tid": threading.get_ident(), "args": {name: self.counters[name]}})
+
+    def chrome_trace(self):
+        with self._lock:
+            events = list(self.events)
+        main_tid = threading.main_thread().ident
+        tids = sorted({e["tid"] for e in events}, key=lambda tid: tid != main_tid)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                     "args": {"name": "main" if tid == main_tid else f"worker-{n}"}}
+                    for n, tid in enumerate(tids)]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def to_json(self):
+        with self._lock:
+            spans = [{k: e[k] for k in ("name", "ts", "dur", "tid", "args")} for e in self.events if e["ph"] == "X"]
+        return {"stages": self.summary(), "counters": dict(self.counters), "spans": spans}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+
+class NullTimer:
+    @contextmanager
+    def stage(self, name, **args):
+        yield
+
+    def count(self, name, value=1, **args):
+        pass
+
+
+NULL_TIMER = NullTimer()
@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+from .backends import BACKENDS, LOCAL_MODEL, create_client
+from .broker import BrokerEventStore, JobLost, open_broker, spec_engine
+from .cache import SQLiteCache
+from .cli import result_to_json
+from .engine import SimulationEngine
+from .jobs import JobCancelled
+from .scheduler import RequestScheduler
+
+
+class QueueWorker:
+    # Stateless worker for a shared job queue. A run's settings come from its job spec
+    # and every action is written back to the broker as an event record, so nothing is
+    # kept on the worker: app replicas display runs from the broker, and a run whose
+    # worker stopped heartbeating is resumed from its records by the next worker to
+    # claim it. Pause and cancel requests are checked between actions.
+    def __init__(self, broker, client_factory, worker_id=None, poll_interval=1.0, requests_per_minute=None, cache=None, default_model=None):
+        self.broker = broker
+        self.client_factory = client_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.poll_interval = poll_interval
+        self.requests_per_minute = requests_per_minute
+        self.cache = cache
+        self.default_model = default_model
+        self.jobs_done = 0
+
+    def _check(self, job_id, turn):
+        control = self.broker.heartbeat(job_id, self.worker_id, turn=turn)
+        if control == "pause":
+            self.broker.heartbeat(job_id, self.worker_id, status="paused")
+            while control == "pause":
+                time.sleep(self.poll_interval)
+                control = self.broker.heartbeat(job_id, self.worker_id)
+            if control is None:
+                self.broker.heartbeat(job_id, self.worker_id, status="running")
+        if control == "lost":
+            raise JobLost(job_id)
+        if control == "cancel":
+            raise JobCancelled()
+
+    def _beat(self, job_id, stop):
+        # Keeps the lease alive through long LLM calls and retries.
+        while not stop.wait(self.broker.lease / 4):
+            self.broker.heartbeat(job_id, self.worker_id)
+
+    def run_job(self, job):
+        spec = job["spec"]
+        store = BrokerEventStore(self.broker, job["id"], self.worker_id)
+        options = dict(scheduler=RequestScheduler(self.requests_per_minute, max_in_flight=spec["settings"].get("max_concurrency")),
+                       cache=self.cache)
+
+        def on_action(engine, entry):
+            if spec.get("delay"):
+                time.sleep(spec["delay"])
+            self._check(job["id"], entry.turn)
+
+        stop = threading.Event()
+        threading.Thread(target=self._beat, args=(job["id"], stop), daemon=True).start()
+        try:
+            client = self.client_factory()
+            if store.exists():
+                engine = SimulationEngine.resume(job["id"], client, event_store=store, **spec["settings"], **options)
+            elif self.default_model and not spec.get("model"):
+                engine = spec_engine(spec, client, event_store=store, model=self.default_model, **options)
+            else:
+                engine = spec_engine(spec, client, event_store=store, **options)
+            engine.on_turn_start = lambda engine, turn: self._check(job["id"], turn)
+            engine.on_action = on_action
+            result = engine.run()
+            data = result_to_json(result)
+            data["llm_calls"] = engine.scheduler.summary()
+            self.broker.finish(job["id"], self.worker_id, "completed", result=data)
+        except JobCancelled:
+            self.broker.finish(job["id"], self.worker_id, "cancelled")
+        except JobLost:
+            print(f"Warning: Job {job['id']} was handed to another worker; stopping.", file=sys.stderr)
+        except Exception as e:
+            print(f"Error in queued job {job['id']}: {e}", file=sys.stderr)
+            traceback.print_exc()
+            self.broker.finish(job["id"], self.worker_id, "failed", error=str(e))
+        finally:
+            stop.set()
+        self.jobs_done += 1
+
+    def run(self, max_jobs=None, exit_when_idle=False, stop=None):
+        stop = stop or threading.Event()
+        while not stop.is_set() and (max_jobs is None or self.jobs_done < max_jobs):
+            job = self.broker.claim(self.worker_id)
+            if job is None:
+                if exit_when_idle:
+                    break
+                stop.wait(self.poll_interval)
+                continue
+            print(f"[{self.worker_id}] Running job {job['id']}: {job['spec']['scenario']} "
+                  f"({', '.join(job['spec']['nations'])})", file=sys.stderr)
+            self.run_job(job)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="polibot.worker", description="Run simulations from a shared PoliBot job queue.")
+    parser.add_argument("--broker", default=os.environ.get("POLIBOT_BROKER"),
+                        help="Queue URL: sqlite:///path.db or redis://host:6379/0 (default $POLIBOT_BROKER).")
+    parser.add_argument("--backend", choices=BACKENDS, default="groq", help="LLM backend used for every job this worker runs.")
+    parser.add_argument("--base-url", default=None, help="Server URL for --backend openai.")
+    parser.add_argument("--model-path", default=None, help="GGUF model file for --backend llamacpp.")
+    parser.add_argument("--model", default=None, help="Model for jobs that do not name one (defaults to the backend's model).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker threads in this process.")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute limit per worker thread.")
+    parser.add_argument("--cache", default=None, metavar="PATH", help="SQLite file used to cache agent completions.")
+    parser.add_argument("--lease", type=float, default=120.0, help="Seconds without a heartbeat before a running job is reassigned.")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between queue polls when idle.")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Exit after each worker thread has run this many jobs.")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit once the queue is empty.")
+    parser.add_argument("--stats", action="store_true", help="Print queue metrics as JSON and exit.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if not args.broker:
+            raise ValueError("--broker (or POLIBOT_BROKER) is required.")
+        broker = open_broker(args.broker, lease=args.lease)
+        if args.stats:
+            json.dump(broker.stats(), sys.stdout, indent=2)
+            print()
+            return 0
+        cache = SQLiteCache(args.cache) if args.cache else None
+        default_model = args.model or (LOCAL_MODEL if args.backend != "groq" else None)
+        # One client for all worker threads, so a GGUF model is loaded once.
+        client = create_client(args.backend, base_url=args.base_url, model_path=args.model_path)
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    workers = [QueueWorker(broker, lambda: client, poll_interval=args.poll_interval, requests_per_minute=args.rpm,
+                           cache=cache, default_model=default_model) for _ in range(args.workers)]
+    stop = threading.Event()
+    threads = [threading.Thread(target=worker.run, args=(args.max_jobs, args.exit_when_idle, stop), daemon=True)
+               for worker in workers]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        # Running jobs keep their event records and are resumed by another worker once
+        # their lease expires.
+        stop.set()
+    print(f"Jobs run: {sum(worker.jobs_done for worker in workers)}. Queue: {json.dumps(broker.stats())}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
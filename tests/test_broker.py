@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from polibot.broker import BrokerEventStore, JobLost, RemoteJob, SQLiteBroker, job_spec, open_broker, spec_engine
+from polibot.cli import resolve_scenario
+from polibot.fake import FakeGroqClient
+
+
+def test_stale_worker_cannot_append_after_job_is_reassigned(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "queue.db"), lease=0.05)
+    job_id = broker.enqueue(job_spec("Climate", ["USA", "China"], num_turns=1))
+    assert broker.claim("a")["id"] == job_id
+    stale = BrokerEventStore(broker, job_id, "a")
+    stale.append({"type": "run"})
+    time.sleep(0.1)
+    assert broker.claim("b")["id"] == job_id
+    with pytest.raises(JobLost):
+        stale.append({"type": "action", "agent": "USA"})
+    BrokerEventStore(broker, job_id, "b").append({"type": "resume"})
+    assert [r["type"] for r in broker.events(job_id)] == ["run", "resume"]
+    assert broker.events(job_id, since=1) == [{"type": "resume"}]
+
+
+def test_remote_job_folds_new_events_once_per_turn(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "queue.db"))
+    spec = job_spec(resolve_scenario("Climate"), ["USA", "China", "EU"], num_turns=3, seed=4)
+    job_id = broker.enqueue(spec)
+    broker.claim("a")
+    engine = spec_engine(spec, FakeGroqClient(), event_store=BrokerEventStore(broker, job_id, "a"))
+    fetched = []
+    events = broker.events
+    broker.events = lambda job_id, since=0: fetched.extend(events(job_id, since)) or events(job_id, since)
+
+    remote = RemoteJob(broker, job_id)
+    engine.start()
+    for turn in range(1, 4):
+        engine.run_turn(turn)
+        remote.refresh()
+        assert remote.engine.completed_turns == turn
+        assert remote.engine.metrics == engine.metrics
+        assert [e.as_dict() for e in remote.log.entries] == [e.as_dict() for e in engine.log]
+    assert remote.engine.relations.as_dict() == engine.relations.as_dict()
+    assert len(fetched) == broker.event_count(job_id)
+
+
+def test_open_broker_rejects_private_memory_queue():
+    with pytest.raises(ValueError):
+        open_broker("memory://")
@@ -0,0 +1,32 @@
+from polibot.agents import CountryAgent, MALFORMED_ACTION
+from polibot.cache import CachedClient, MemoryCache
+from polibot.catalog import COUNTRY_PROFILES, SCENARIO_DETAILS
+from polibot.cli import resolve_scenario
+from polibot.fake import FakeGroqClient
+
+VALID = "[Intent]: Form Alliance\n[Target]: China\n[Message]: Let us work together."
+
+
+def make_agent(responses, cache):
+    client = FakeGroqClient(responses=responses)
+    return client, CountryAgent("USA", COUNTRY_PROFILES["USA"], CachedClient(client, cache))
+
+
+def test_streaming_retry_asks_the_model_again_after_a_malformed_completion():
+    cache = MemoryCache()
+    client, agent = make_agent(["[Intent]: Form Alliance", VALID], cache)
+    scenario = resolve_scenario("Climate")
+    action = agent.act(scenario, SCENARIO_DETAILS[scenario], 1, ["USA", "China"], stream=True)
+    assert action == VALID
+    assert client.calls == 2
+    assert list(cache._data.values()) == [VALID]
+
+
+def test_malformed_completion_is_not_served_from_the_cache():
+    cache = MemoryCache()
+    client, agent = make_agent(["not an action", VALID], cache)
+    scenario = resolve_scenario("Climate")
+    assert agent.act(scenario, SCENARIO_DETAILS[scenario], 1, ["USA", "China"]) == MALFORMED_ACTION
+    assert len(cache) == 0
+    assert agent.act(scenario, SCENARIO_DETAILS[scenario], 1, ["USA", "China"]) == VALID
+    assert client.calls == 2
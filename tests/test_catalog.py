@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from polibot import catalog
+from polibot.catalog import Catalog, parse_catalog_file
+
+COUNTRY = {"region": "Europe", "blocs": ["EU"], "strengths": ["Trade"], "weaknesses": ["Energy"],
+           "interests": ["Stability"], "color": "#112233"}
+SCENARIO = {"description": "A crisis.", "key_issues": ["Water"], "historical": "None."}
+
+
+def write(path, countries=None, scenarios=None, version=1):
+    data = {"version": version}
+    if countries is not None:
+        data["countries"] = countries
+    if scenarios is not None:
+        data["scenarios"] = scenarios
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture
+def catalog_dir(tmp_path):
+    write(tmp_path / "countries.json", countries={"France": COUNTRY, "Germany": COUNTRY})
+    write(tmp_path / "scenarios.json", scenarios={"Drought": SCENARIO})
+    return tmp_path
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"version": 2}, "Unsupported catalog version"),
+    ({"version": 1, "countries": {"France": "Paris"}}, "must be a mapping"),
+    ({"version": 1, "countries": {"France": {**COUNTRY, "color": "blue"}}}, "color must look like"),
+    ({"version": 1, "countries": {"France": {**COUNTRY, "blocs": ["EU", 3]}}}, "'blocs' must be a list of strings"),
+    ({"version": 1, "scenarios": {"Drought": {**SCENARIO, "historical": None}}}, "'historical' must be a string"),
+])
+def test_invalid_files_are_rejected(tmp_path, data, message):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    with pytest.raises(ValueError, match=message):
+        parse_catalog_file(str(path))
+
+
+def test_bad_file_keeps_its_last_good_version(catalog_dir):
+    cat = Catalog(str(catalog_dir))
+    path = catalog_dir / "countries.json"
+    write(path, countries={"France": {**COUNTRY, "color": "blue"}, "Spain": COUNTRY})
+    assert cat.refresh()
+    assert set(cat.countries) == {"France", "Germany"}
+    assert str(path) in cat.errors
+
+    write(path, countries={"France": COUNTRY, "Spain": COUNTRY})
+    assert cat.refresh()
+    assert set(cat.countries) == {"France", "Spain"}
+    assert cat.errors == {}
+    assert cat.by_bloc == {"EU": ["France", "Spain"]}
+
+
+def test_catalog_without_scenarios_is_rejected(tmp_path):
+    write(tmp_path / "countries.json", countries={"France": COUNTRY})
+    with pytest.raises(ValueError, match="defines no scenarios"):
+        Catalog(str(tmp_path))
+
+
+def test_refresh_parses_only_changed_files(catalog_dir, monkeypatch):
+    cat = Catalog(str(catalog_dir))
+    parsed = []
+    parse = catalog.parse_catalog_file
+    monkeypatch.setattr(catalog, "parse_catalog_file", lambda path: parsed.append(path) or parse(path))
+
+    assert not cat.refresh()
+    assert parsed == []
+    write(catalog_dir / "scenarios.json", scenarios={"Drought": SCENARIO, "Flood": SCENARIO})
+    assert cat.refresh()
+    assert parsed == [str(catalog_dir / "scenarios.json")]
+    assert set(cat.scenarios) == {"Drought", "Flood"}
+
+    write(catalog_dir / "extra.json", countries={"Italy": COUNTRY})
+    (catalog_dir / "scenarios.json").unlink()
+    revision = cat.revision
+    assert cat.refresh()
+    assert parsed[1:] == [str(catalog_dir / "extra.json")]
+    # Without any scenario left the previous catalog stays in place.
+    assert cat.revision == revision and set(cat.scenarios) == {"Drought", "Flood"}
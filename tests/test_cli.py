@@ -0,0 +1,42 @@
+import json
+
+from polibot import batch, bench, cli
+from polibot.fake import FakeGroqClient, FakeGroqServer
+
+
+def test_retried_run_writes_parseable_json(capsys):
+    with FakeGroqServer(error_rate=0.3, retry_after=0.01, seed=0) as server:
+        code = cli.main([
+            "--backend", "openai", "--base-url", f"{server.url}/openai/v1", "--scenario", "Climate",
+            "--nations", "USA", "China", "--turns", "2", "--seed", "1", "--max-retries", "10",
+        ])
+    assert code == 0
+    assert server.stats["throttled"] > 0
+    out, err = capsys.readouterr()
+    assert "retrying" in err
+    result = json.loads(out)
+    assert len(result["log"]) == 4
+
+
+def test_malformed_responses_keep_stdout_parseable(capsys, monkeypatch):
+    monkeypatch.setattr(cli, "create_client", lambda *args, **kwargs: FakeGroqClient(responses=["not an action"]))
+    code = cli.main(["--backend", "fake", "--scenario", "Climate", "--nations", "USA", "China", "--turns", "1", "--seed", "1"])
+    assert code == 0
+    out, err = capsys.readouterr()
+    assert "Malformed response" in err
+    result = json.loads(out)
+    assert [entry["intent"] for entry in result["log"]] == ["Decline to act", "Decline to act"]
+
+
+def test_batch_runs_on_the_chosen_backend(capsys):
+    code = batch.main(["--backend", "fake", "--scenarios", "Climate", "--nation-set", "USA,China", "--runs", "2",
+                       "--turns", "1", "--rpm", "0", "--workers", "1"])
+    assert code == 0
+    data = json.loads(capsys.readouterr().out)
+    assert data["failures"] == []
+    assert data["summary"][0]["runs"] == 2
+
+
+def test_bench_rejects_unknown_scenario(capsys):
+    assert bench.main(["--scenario", "No such crisis", "--nations", "2", "--turns", "1"]) == 2
+    assert capsys.readouterr().err.startswith("Error: Scenario")
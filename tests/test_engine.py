@@ -0,0 +1,47 @@
+import json
+
+from polibot.cli import resolve_scenario
+from polibot.engine import SimulationEngine
+from polibot.events import EventStore
+from polibot.fake import FakeGroqClient
+
+NATIONS = ["USA", "China", "India"]
+
+
+def make_engine(client, **kwargs):
+    return SimulationEngine(client, resolve_scenario("Climate"), NATIONS, num_turns=3, seed=7, **kwargs)
+
+
+def rows(entries):
+    # Timestamps are wall-clock times, everything else must match.
+    return [{k: v for k, v in entry.as_dict().items() if k != "timestamp"} for entry in entries]
+
+
+def test_concurrent_run_matches_serial_run():
+    serial = make_engine(FakeGroqClient()).run()
+    concurrent = make_engine(FakeGroqClient(), concurrent=True, max_concurrency=3).run()
+    assert rows(concurrent["log"]) == rows(serial["log"])
+    assert concurrent["metrics"] == serial["metrics"]
+    assert concurrent["relationships"] == serial["relationships"]
+
+
+def test_resume_from_log_cut_mid_turn_matches_uninterrupted_run(tmp_path):
+    full_path = tmp_path / "full.jsonl"
+    expected = make_engine(FakeGroqClient(), event_store=EventStore(str(full_path))).run()
+
+    records = [json.loads(line) for line in full_path.read_text(encoding="utf-8").splitlines()]
+    first_turn_end = next(i for i, r in enumerate(records) if r["type"] == "turn_end")
+    # Keep turn 1 and the first action of turn 2.
+    cut = records[:first_turn_end + 2]
+    assert cut[-1]["type"] == "action" and cut[-1]["turn"] == 2
+    cut_path = tmp_path / "cut.jsonl"
+    cut_path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in cut), encoding="utf-8")
+
+    client = FakeGroqClient()
+    resumed = SimulationEngine.resume(str(cut_path), client).run()
+    recorded_actions = sum(r["type"] == "action" for r in cut)
+    assert client.calls == len(expected["log"]) - recorded_actions
+    assert rows(resumed["log"]) == rows(expected["log"])
+    assert resumed["metrics"] == expected["metrics"]
+    assert resumed["relationships"] == expected["relationships"]
+    assert rows(resumed["agreements"]) == rows(expected["agreements"])
@@ -0,0 +1,65 @@
+import csv
+import os
+
+import pytest
+
+from polibot.cli import resolve_scenario
+from polibot.engine import SimulationEngine
+from polibot.events import EventStore
+from polibot.export import EXPORT_TABLES, ResultExporter, parquet_available
+from polibot.fake import FakeGroqClient
+
+NATIONS = ["USA", "China", "India"]
+FORMATS = [pytest.param("parquet", marks=pytest.mark.skipif(not parquet_available(), reason="needs pyarrow")), "csv"]
+
+
+class Crash(Exception):
+    pass
+
+
+def read_table(directory, table):
+    # Rows of every part file, as strings so Parquet and CSV compare alike.
+    path = os.path.join(directory, table)
+    rows = []
+    for name in sorted(os.listdir(path)):
+        if name.startswith("."):
+            continue
+        if name.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            part = pq.read_table(os.path.join(path, name)).to_pylist()
+        else:
+            with open(os.path.join(path, name), newline="", encoding="utf-8") as f:
+                part = list(csv.DictReader(f))
+        rows.extend({k: str(v) for k, v in row.items() if k not in ("run_id", "timestamp")} for row in part)
+    return rows
+
+
+def make_engine(directory, fmt, run_id, events, **kwargs):
+    return SimulationEngine(FakeGroqClient(), resolve_scenario("Climate"), NATIONS, num_turns=4, seed=3,
+                            exporter=ResultExporter(str(directory), fmt, run_id=run_id), event_store=EventStore(str(events)),
+                            **kwargs)
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_killed_and_resumed_run_exports_readable_tables(tmp_path, fmt):
+    make_engine(tmp_path / "full", fmt, "run", tmp_path / "full.jsonl").run()
+    expected = {table: read_table(tmp_path / "full", table) for table in EXPORT_TABLES}
+
+    def crash(engine, entry):
+        if entry.turn == 3 and len(engine.log) == 2 * len(NATIONS) + 2:
+            raise Crash()
+    with pytest.raises(Crash):
+        make_engine(tmp_path / "crashed", fmt, "run", tmp_path / "crashed.jsonl", on_action=crash).run()
+
+    # Turns 1 and 2 are readable without close(); nothing of turn 3 was written.
+    actions = read_table(tmp_path / "crashed", "actions")
+    assert actions == expected["actions"][:2 * len(NATIONS)]
+    assert read_table(tmp_path / "crashed", "metrics") == expected["metrics"][:1 + 2 * len(NATIONS)]
+    assert {row["turn"] for row in read_table(tmp_path / "crashed", "relations")} == {"1", "2"}
+    if fmt == "parquet":
+        assert sorted(os.listdir(tmp_path / "crashed" / "actions")) == ["run-0001.parquet", "run-0002.parquet"]
+
+    SimulationEngine.resume(str(tmp_path / "crashed.jsonl"), FakeGroqClient(),
+                            exporter=ResultExporter(str(tmp_path / "crashed"), fmt, run_id="run")).run()
+    for table in EXPORT_TABLES:
+        assert read_table(tmp_path / "crashed", table) == expected[table], table
@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from polibot.fake import FakeGroqClient
+
+MESSAGES = [{"role": "user", "content": "Choose one specific country from: USA, China"}]
+
+
+def test_shared_client_hands_out_each_scripted_response_once():
+    responses = [f"response {i}" for i in range(400)]
+    client = FakeGroqClient(responses=responses)
+
+    def call(_):
+        return client.create(model="fake-model", messages=MESSAGES).choices[0].message.content
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        contents = list(executor.map(call, range(len(responses))))
+    assert client.calls == len(responses)
+    assert sorted(contents) == sorted(responses)
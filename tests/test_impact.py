@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from polibot.catalog import SCENARIO_DETAILS
+from polibot.engine import initial_metrics
+from polibot.impact import (IMPACT_DRAWS, IMPACT_METRICS, IMPACT_MODEL, PEACE_BOUNDS, VALID_INTENTS,
+                            determine_action_impact, metrics_array)
+from polibot.relations import RelationshipMatrix
+from polibot.rollout import ImpactBatch, random_policy
+
+NATIONS = ["USA", "China", "India", "EU"]
+
+
+def test_step_matches_apply_row_by_row():
+    rng = np.random.default_rng(0)
+    n = 500
+    state = np.tile(metrics_array(initial_metrics()), (n, 1))
+    state[:, 0] = rng.uniform(*PEACE_BOUNDS, n)
+    state[:, 2] = rng.integers(0, 5, n)
+    # Every intent row, including the one for unrecognised intents.
+    intents = rng.integers(0, len(IMPACT_MODEL.intents) + 1, n)
+    targeted = rng.random(n) < 0.5
+    draws = rng.random((n, IMPACT_DRAWS))
+    kinds = rng.integers(-1, 3, n)
+    severity = rng.integers(1, 11, n).astype(np.float64)
+
+    new_state, relationship = IMPACT_MODEL.step(state, intents, targeted, draws, kinds, severity)
+    for i in range(n):
+        values, change = IMPACT_MODEL.apply(state[i].tolist(), int(intents[i]), bool(targeted[i]), draws[i].tolist(),
+                                            int(kinds[i]), float(severity[i]))
+        assert values == new_state[i].tolist()
+        assert change == relationship[i]
+
+
+@pytest.mark.parametrize("scenario", list(SCENARIO_DETAILS))
+def test_batch_rows_match_single_simulations(scenario):
+    seeds = list(range(8))
+    severity = np.array([seed % 10 + 1 for seed in seeds])
+    batch = ImpactBatch(scenario, NATIONS, seeds, severity=severity, block=5)
+    order, intents, targets = random_policy(np.random.default_rng(1), len(seeds), 3, len(NATIONS), [1.0] * len(VALID_INTENTS))
+    intents = IMPACT_MODEL.intent_index(VALID_INTENTS)[intents]
+    for step in range(order.shape[1]):
+        batch.step(order[:, step], intents[:, step], targets[:, step])
+
+    for i, seed in enumerate(seeds):
+        metrics = initial_metrics()
+        relations = RelationshipMatrix(NATIONS)
+        rng = np.random.default_rng(seed)
+        for step in range(order.shape[1]):
+            agent = NATIONS[order[i, step]]
+            target = NATIONS[targets[i, step]] if targets[i, step] >= 0 else "GLOBAL"
+            _, change, rel_target = determine_action_impact(agent, IMPACT_MODEL.intents[intents[i, step]], target, "",
+                                                            metrics, NATIONS, scenario, severity=int(severity[i]), rng=rng)
+            if rel_target and rel_target != agent:
+                relations.update(agent, rel_target, change)
+        assert batch.state[i].tolist() == [metrics[name] for name in IMPACT_METRICS]
+        assert batch.weights[i].tolist() == relations.weights.tolist()
+        assert batch.linked[i].tolist() == relations.linked.tolist()
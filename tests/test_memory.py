@@ -0,0 +1,46 @@
+from polibot.actions import ActionRecord
+from polibot.memory import AgentMemory
+from polibot.prompts import estimate_tokens
+
+NATIONS = ["USA", "China", "India", "EU"]
+INTENTS = ["Propose a deal", "Build alliances", "Respond", "Request assistance"]
+
+
+def record_turns(memory, turns):
+    # Each turn, USA acts towards one nation and every other nation acts towards USA.
+    recorded = 0
+    for turn in range(1, turns + 1):
+        others = NATIONS[1:]
+        for i, agent in enumerate(NATIONS):
+            target = others[turn % len(others)] if agent == "USA" else "USA"
+            entry = ActionRecord(turn, "00:00:00", agent, INTENTS[(turn + i) % len(INTENTS)], target,
+                                 f"Turn {turn} message from {agent}. " * 12, "Some impact.")
+            memory.record(entry, received=agent != "USA")
+            recorded += 1
+    return recorded
+
+
+def test_block_stays_within_budget_on_long_runs():
+    memory = AgentMemory("USA", token_budget=400)
+    recorded = record_turns(memory, 30)
+    lines = memory.lines()
+    assert estimate_tokens("\n".join(lines)) <= memory.token_budget
+
+    # Everything that left the recent buffer is counted in the summary, which comes first.
+    folded = sum(sum(counts.values()) for counts in memory.summary_counts.values())
+    assert folded == recorded - len(memory.recent)
+    assert memory.summary_turns[0] == 1
+    assert lines[0].startswith("Earlier (turns 1-")
+    assert lines[-1].startswith("Turn 30: ")
+
+
+def test_ledger_lists_most_recent_contact_first():
+    memory = AgentMemory("USA", token_budget=2000)
+    for turn, agent in enumerate(["China", "India", "EU", "China"], start=1):
+        memory.record(ActionRecord(turn, "00:00:00", agent, "Propose a deal", "USA", "Let us talk.", "Some impact."),
+                      received=True)
+    memory.record(ActionRecord(5, "00:00:00", "USA", "Respond", "India", "Agreed.", "Some impact."))
+    ledger = [line for line in memory.lines() if line.startswith("- ")]
+    assert [line[2:].split(":")[0] for line in ledger] == ["India", "China", "EU"]
+    assert ledger[0].endswith("last contact turn 5 (you: Respond)")
+    assert "deals 0/2" in ledger[1]
@@ -0,0 +1,18 @@
+import pytest
+
+from polibot.relations import RelationshipMatrix
+from polibot.render import NetworkRenderer
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("networkx")
+
+
+def test_only_turn_end_frames_are_titled_as_turn_ends():
+    relations = RelationshipMatrix(["USA", "China", "India"])
+    renderer = NetworkRenderer(frame_interval=1)
+    relations.update("USA", "China", 0.2)
+    assert renderer.action_frame(relations, 2) is not None
+    assert renderer.ax.get_title() == "Diplomatic Network (Turn 2)"
+    relations.update("China", "India", -0.2)
+    assert renderer.turn_frame(relations, 2) is not None
+    assert renderer.ax.get_title() == "Diplomatic Network (End of Turn 2)"
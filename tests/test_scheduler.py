@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+from polibot.backends import BackendHTTPError, OpenAICompatibleClient
+from polibot.fake import FakeGroqServer
+from polibot.scheduler import RequestScheduler
+
+MESSAGES = [{"role": "user", "content": "Choose one specific country from: USA, China"}]
+
+
+class FakeClock:
+    # Sleeping only moves the clock forward, so retries and pauses cost no real time.
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def completion_call(server, **kwargs):
+    client = OpenAICompatibleClient(f"{server.url}/openai/v1")
+    return lambda: client.chat.completions.create(model="fake-model", messages=MESSAGES, **kwargs)
+
+
+def test_retries_stop_at_max_retries():
+    clock = FakeClock()
+    scheduler = RequestScheduler(max_retries=2, base_delay=0.01, clock=clock.time, sleep=clock.sleep)
+    with FakeGroqServer(error_rate=1.0, retry_after=0.5) as server:
+        with pytest.raises(BackendHTTPError) as error:
+            scheduler.submit(completion_call(server))
+    assert error.value.status_code == 429
+    assert server.stats["requests"] == 3
+    assert scheduler.summary() == {"requests": 1, "succeeded": 0, "retries": 2, "throttled": 3,
+                                                      "failed": 1, "wait_s": 0.0, "max_in_flight": 1}
+
+
+def test_counters_match_the_server():
+    clock = FakeClock()
+    scheduler = RequestScheduler(max_retries=10, base_delay=0.01, seed=0, clock=clock.time, sleep=clock.sleep)
+    with FakeGroqServer(error_rate=0.5, retry_after=0.5, seed=3) as server:
+        for _ in range(10):
+            scheduler.submit(completion_call(server))
+    stats = scheduler.summary()
+    assert server.stats["throttled"] > 0
+    assert stats["requests"] == stats["succeeded"] == 10
+    assert stats["throttled"] == stats["retries"] == server.stats["throttled"]
+    assert stats["failed"] == 0
+    assert server.stats["requests"] == 10 + server.stats["throttled"]
+
+
+def test_retry_after_pauses_other_callers():
+    clock = FakeClock()
+    scheduler = RequestScheduler(max_retries=1, base_delay=0.0, clock=clock.time, sleep=clock.sleep)
+    started = []
+
+    def backoff(seconds):
+        # While the throttled caller backs off, a second caller arrives at t=0.
+        scheduler.sleep = clock.sleep
+        scheduler.submit(lambda: started.append(clock.now))
+        clock.sleep(seconds)
+    scheduler.sleep = backoff
+
+    with FakeGroqServer(error_rate=1.0, retry_after=5) as server:
+        with pytest.raises(BackendHTTPError):
+            scheduler.submit(completion_call(server))
+    assert started == [5.0]
+
+
+def test_max_in_flight_caps_concurrent_requests():
+    scheduler = RequestScheduler(max_in_flight=2)
+    with FakeGroqServer(latency=0.05) as server:
+        call = completion_call(server)
+        threads = [threading.Thread(target=scheduler.submit, args=(call,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert scheduler.summary()["max_in_flight"] == 2
+    assert server.stats["requests"] == 6
+
+
+def test_stream_holds_its_slot_until_closed():
+    scheduler = RequestScheduler(max_in_flight=1)
+    with FakeGroqServer() as server:
+        stream = scheduler.submit(completion_call(server, stream=True), stream=True)
+        chunks = iter(stream)
+        next(chunks)
+        waiting = threading.Thread(target=scheduler.submit, args=(completion_call(server),))
+        waiting.start()
+        waiting.join(0.2)
+        assert waiting.is_alive()
+        # The bounded slot semaphore raises if a second close() released it again.
+        stream.close()
+        stream.close()
+        waiting.join(5)
+        assert not waiting.is_alive()
+
+        # An exhausted stream gives its slot back as well, and only once.
+        stream = scheduler.submit(completion_call(server, stream=True), stream=True)
+        assert list(stream)
+        stream.close()
+        scheduler.submit(completion_call(server))
+    assert scheduler.summary()["max_in_flight"] == 1
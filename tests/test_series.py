@@ -0,0 +1,64 @@
+import csv
+import io
+
+from polibot.series import MetricSeries
+
+NAMES = ["Peace Index", "Economic Growth (%)"]
+
+
+def metrics_at(step):
+    return {"Peace Index": step / 1000, "Economic Growth (%)": -step / 10}
+
+
+def fill(series, turns, actions_per_turn):
+    series.record(0, metrics_at(0), turn_end=True)
+    step = 0
+    for turn in range(1, turns + 1):
+        for _ in range(actions_per_turn):
+            step += 1
+            series.record(turn, metrics_at(step))
+        series.record(turn, metrics_at(step), turn_end=True)
+
+
+def test_full_buffer_doubles_action_stride_and_keeps_turn_ends():
+    series = MetricSeries(NAMES, capacity=64)
+    values = series.values
+    fill(series, turns=10, actions_per_turn=20)
+
+    assert series.compactions > 0 and series.stride == 4 and series.turn_stride == 1
+    assert series.values is values and values.shape == (64, len(NAMES))
+    assert series.size <= series.capacity
+    assert series.columns(turn_end=True)["turn"].tolist() == list(range(11))
+    actions = series.columns(turn_end=False)
+    assert actions["step"].tolist() == list(range(series.stride, 201, series.stride))
+    # Every kept row still holds the metrics recorded at its step.
+    for record in series.as_records():
+        assert [record[name] for name in NAMES] == list(metrics_at(record["step"]).values())
+
+
+def test_turn_ends_are_thinned_once_they_fill_the_buffer():
+    series = MetricSeries(NAMES, capacity=64)
+    fill(series, turns=300, actions_per_turn=1)
+    turns = series.columns(turn_end=True)["turn"].tolist()
+    assert series.turn_stride > 1
+    assert turns == sorted(turns) and all(turn % series.turn_stride == 0 for turn in turns)
+    assert turns[-1] == 300 - 300 % series.turn_stride
+    assert series.size <= series.capacity
+
+
+def test_records_round_trip_through_csv(tmp_path):
+    series = MetricSeries(NAMES, capacity=16)
+    fill(series, turns=5, actions_per_turn=4)
+    records = series.as_records()
+    assert len(records) == len(series)
+
+    buffer = io.StringIO()
+    series.to_csv(buffer)
+    path = tmp_path / "series.csv"
+    series.to_csv(str(path))
+    assert path.read_bytes().decode("utf-8") == buffer.getvalue()
+
+    rows = list(csv.DictReader(io.StringIO(buffer.getvalue())))
+    assert list(rows[0]) == ["turn", "step", "turn_end", *NAMES]
+    assert [{**{k: float(v) for k, v in row.items() if k != "turn_end"}, "turn_end": row["turn_end"] == "True"}
+            for row in rows] == records
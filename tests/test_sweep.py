@@ -0,0 +1,30 @@
+from polibot.cli import resolve_scenario
+from polibot.engine import SimulationEngine
+from polibot.fake import FakeGroqClient
+from polibot.sweep import LocalBatchBackend, run_sweep
+
+SIMULATIONS = [("Climate", ["USA", "China"], 2, 1), ("Refugee", ["USA", "EU", "India"], 3, 2)]
+
+
+def make_engines(client):
+    return [SimulationEngine(client, resolve_scenario(scenario), nations, num_turns=turns, seed=seed)
+            for scenario, nations, turns, seed in SIMULATIONS]
+
+
+def rows(result):
+    return [{k: v for k, v in entry.as_dict().items() if k != "timestamp"} for entry in result["log"]]
+
+
+def test_lockstep_sweep_matches_individual_runs(tmp_path):
+    turns = []
+    results = run_sweep(make_engines(None), LocalBatchBackend(FakeGroqClient()), str(tmp_path),
+                        on_turn=lambda turn, simulations, requests: turns.append((turn, simulations, requests)))
+    expected = [engine.run() for engine in make_engines(FakeGroqClient())]
+
+    # Turn 3 only has the longer simulation left.
+    assert turns == [(1, 2, 5), (2, 2, 5), (3, 1, 3)]
+    assert sorted(p.name for p in tmp_path.iterdir())[:2] == ["turn-001-input.jsonl", "turn-001-output.jsonl"]
+    for result, single in zip(results, expected):
+        assert rows(result) == rows(single)
+        assert result["metrics"] == single["metrics"]
+        assert result["relationships"] == single["relationships"]